@@ -0,0 +1,64 @@
+from typing import Optional
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from models.video import PlatformType
+
+# Unique key of archives written before entries were scoped per subscription
+LEGACY_KEY_INDEX = "platform_1_video_id_1"
+
+class DownloadArchiveRepository:
+    """Cluster-wide equivalent of yt-dlp's --download-archive, keyed by
+    (scope, platform, video_id) where the scope is the subscription that claimed the video"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.download_archive
+    
+    async def ensure_indexes(self):
+        """Create the unique archive key index"""
+        if LEGACY_KEY_INDEX in await self.collection.index_information():
+            await self.collection.drop_index(LEGACY_KEY_INDEX)
+        await self.collection.create_index(
+            [("scope", 1), ("platform", 1), ("video_id", 1)],
+            unique=True
+        )
+        await self.collection.create_index("download_id")
+    
+    async def contains(self, scope: Optional[str], platform: PlatformType, video_id: str) -> bool:
+        """Check whether a video is archived or already being downloaded for this scope"""
+        doc = await self.collection.find_one(
+            # Entries from before scoping carry no scope and count for every subscription
+            {"scope": {"$in": [scope, None]}, "platform": platform, "video_id": video_id},
+            projection={"_id": 1}
+        )
+        return doc is not None
+    
+    async def add_pending(self, scope: Optional[str], platform: PlatformType, video_id: str, download_id: str) -> bool:
+        """Claim a video for download; returns False if another sync already has it"""
+        try:
+            await self.collection.insert_one({
+                "scope": scope,
+                "platform": platform,
+                "video_id": video_id,
+                "download_id": download_id,
+                "completed": False,
+                "created_at": datetime.utcnow()
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+    
+    async def mark_completed(self, download_id: str) -> bool:
+        """Record a claimed download as finished; downloads nobody claimed are not archived"""
+        result = await self.collection.update_one(
+            {"download_id": download_id, "completed": False},
+            {"$set": {"completed": True, "completed_at": datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+    
+    async def release_pending(self, download_id: str) -> bool:
+        """Drop an unfinished claim so the next sync retries the video"""
+        result = await self.collection.delete_one({"download_id": download_id, "completed": False})
+        return result.deleted_count > 0
@@ -0,0 +1,41 @@
+from typing import Optional
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.video import BatchDownload
+
+class BatchRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.download_batches
+    
+    async def create_batch(self, batch: BatchDownload) -> BatchDownload:
+        """Create a new batch record"""
+        batch_dict = batch.model_dump()
+        batch_dict['created_at'] = datetime.utcnow()
+        
+        result = await self.collection.insert_one(batch_dict)
+        batch.id = str(result.inserted_id)
+        return batch
+    
+    async def get_batch_by_id(self, batch_id: str) -> Optional[BatchDownload]:
+        """Get batch by ID"""
+        doc = await self.collection.find_one({"batch_id": batch_id})
+        if doc:
+            doc['id'] = str(doc.pop('_id'))
+            return BatchDownload(**doc)
+        return None
+    
+    async def increment_total(self, batch_id: str, count: int = 1):
+        """Record newly discovered batch items"""
+        await self.collection.update_one(
+            {"batch_id": batch_id},
+            {"$inc": {"total": count}}
+        )
+    
+    async def finish_expansion(self, batch_id: str, error: Optional[str] = None):
+        """Mark a playlist batch as fully enumerated"""
+        await self.collection.update_one(
+            {"batch_id": batch_id},
+            {"$set": {"expanding": False, "expansion_error": error}}
+        )
@@ -0,0 +1,39 @@
+from typing import Dict, Set
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+class NodeRepository:
+    """Heartbeats of running API nodes, used to split cluster-wide limits between them
+    and to tell which nodes' unfinished jobs need recovering"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.cluster_nodes
+
+    async def heartbeat(self, node_id: str, bandwidth_demand: float):
+        """Record that this node is alive and how much bandwidth weight it is serving"""
+        await self.collection.update_one(
+            {"node_id": node_id},
+            {
+                "$set": {"bandwidth_demand": bandwidth_demand, "last_seen": datetime.utcnow()},
+                "$setOnInsert": {"started_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    async def get_bandwidth_demands(self, max_age_seconds: float) -> Dict[str, float]:
+        """Bandwidth demand of every node seen within max_age_seconds"""
+        since = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+        docs = await self.collection.find(
+            {"last_seen": {"$gte": since}},
+            projection={"node_id": 1, "bandwidth_demand": 1}
+        ).to_list(length=None)
+        return {doc["node_id"]: doc.get("bandwidth_demand", 0.0) for doc in docs}
+
+    async def get_live_node_ids(self, max_age_seconds: float) -> Set[str]:
+        """Nodes that have sent a heartbeat within max_age_seconds"""
+        return set(await self.get_bandwidth_demands(max_age_seconds))
+
+    async def remove_node(self, node_id: str):
+        """Drop this node's heartbeat on shutdown so its share is released at once"""
+        await self.collection.delete_one({"node_id": node_id})
@@ -0,0 +1,101 @@
+from typing import List, Optional
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from models.video import Subscription
+
+class SubscriptionRepository:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.subscriptions
+    
+    async def create_subscription(self, subscription: Subscription) -> Subscription:
+        """Create a new subscription"""
+        subscription_dict = subscription.model_dump()
+        subscription_dict['created_at'] = datetime.utcnow()
+        
+        result = await self.collection.insert_one(subscription_dict)
+        subscription.id = str(result.inserted_id)
+        return subscription
+    
+    async def get_subscription_by_id(self, subscription_id: str) -> Optional[Subscription]:
+        """Get subscription by ID"""
+        doc = await self.collection.find_one({"subscription_id": subscription_id})
+        if doc:
+            doc['id'] = str(doc.pop('_id'))
+            return Subscription(**doc)
+        return None
+    
+    async def get_subscriptions(self, user_id: Optional[str] = None) -> List[Subscription]:
+        """List subscriptions, optionally for a single user"""
+        query = {}
+        if user_id:
+            query["user_id"] = user_id
+        
+        docs = await self.collection.find(query).sort("created_at", -1).to_list(length=None)
+        
+        subscriptions = []
+        for doc in docs:
+            doc['id'] = str(doc.pop('_id'))
+            subscriptions.append(Subscription(**doc))
+        
+        return subscriptions
+    
+    async def delete_subscription(self, subscription_id: str) -> bool:
+        """Delete subscription"""
+        result = await self.collection.delete_one({"subscription_id": subscription_id})
+        return result.deleted_count > 0
+    
+    async def claim_due_subscription(self, now: datetime, stale_before: datetime) -> Optional[Subscription]:
+        """Atomically take one due subscription that is not being synced, push its next
+        sync time forward and mark it syncing, so only one node syncs it"""
+        doc = await self.collection.find_one_and_update(
+            {
+                "sync_interval_minutes": {"$ne": None},
+                "$and": [
+                    {"$or": [{"next_sync_at": None}, {"next_sync_at": {"$lte": now}}]},
+                    {"$or": [{"sync_started_at": None}, {"sync_started_at": {"$lte": stale_before}}]}
+                ]
+            },
+            [{
+                "$set": {
+                    "next_sync_at": {
+                        "$add": [now, {"$multiply": ["$sync_interval_minutes", 60000]}]
+                    },
+                    "sync_started_at": now
+                }
+            }],
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            doc['id'] = str(doc.pop('_id'))
+            return Subscription(**doc)
+        return None
+    
+    async def begin_sync(self, subscription_id: str, now: datetime, stale_before: datetime) -> Optional[Subscription]:
+        """Mark a subscription syncing unless a sync started after stale_before is still running"""
+        doc = await self.collection.find_one_and_update(
+            {
+                "subscription_id": subscription_id,
+                "$or": [{"sync_started_at": None}, {"sync_started_at": {"$lte": stale_before}}]
+            },
+            {"$set": {"sync_started_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            doc['id'] = str(doc.pop('_id'))
+            return Subscription(**doc)
+        return None
+    
+    async def record_sync(self, subscription_id: str, batch_id: str, new_items: int):
+        """Store the outcome of a sync and let the next one start"""
+        await self.collection.update_one(
+            {"subscription_id": subscription_id},
+            {"$set": {
+                "last_synced_at": datetime.utcnow(),
+                "last_batch_id": batch_id,
+                "last_sync_new_items": new_items,
+                "sync_started_at": None
+            }}
+        )
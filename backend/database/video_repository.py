@@ -1,10 +1,16 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import UpdateOne
 
 from models.video import VideoDownload, DownloadStatus, PlatformType
+from services.metrics import timed_methods
 
+# Statuses a job can be left in when its node stops
+UNFINISHED_STATUSES = [DownloadStatus.PENDING, DownloadStatus.DOWNLOADING, DownloadStatus.PROCESSING]
+
+@timed_methods("video")
 class VideoRepository:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
@@ -20,6 +26,36 @@ class VideoRepository:
         download.id = str(result.inserted_id)
         return download
     
+    async def create_downloads(self, downloads: List[VideoDownload]) -> List[VideoDownload]:
+        """Create many download records in a single round trip"""
+        if not downloads:
+            return downloads
+        
+        now = datetime.utcnow()
+        download_dicts = []
+        for download in downloads:
+            download_dict = download.model_dump()
+            download_dict['created_at'] = now
+            download_dict['updated_at'] = now
+            download_dicts.append(download_dict)
+        
+        result = await self.collection.insert_many(download_dicts, ordered=False)
+        for download, inserted_id in zip(downloads, result.inserted_ids):
+            download.id = str(inserted_id)
+        return downloads
+    
+    async def get_batch_downloads(self, batch_id: str) -> List[VideoDownload]:
+        """Get all downloads belonging to a batch"""
+        cursor = self.collection.find({"batch_id": batch_id}).sort("created_at", 1)
+        docs = await cursor.to_list(length=None)
+        
+        downloads = []
+        for doc in docs:
+            doc['id'] = str(doc.pop('_id'))
+            downloads.append(VideoDownload(**doc))
+        
+        return downloads
+    
     async def get_download_by_id(self, download_id: str) -> Optional[VideoDownload]:
         """Get download by ID"""
         doc = await self.collection.find_one({"download_id": download_id})
@@ -51,6 +87,46 @@ class VideoRepository:
         )
         return download
     
+    async def save_checkpoints(self, checkpoints: Dict[str, Tuple[int, Optional[int]]]):
+        """Persist (downloaded, total) bytes of running jobs in one round trip"""
+        if not checkpoints:
+            return
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"download_id": download_id},
+                {"$set": {"downloaded_bytes": downloaded, "total_bytes": total, "updated_at": now}}
+            )
+            for download_id, (downloaded, total) in checkpoints.items()
+        ], ordered=False)
+    
+    async def get_interrupted_downloads(self, live_node_ids: List[str]) -> List[VideoDownload]:
+        """Unfinished downloads owned by no live node"""
+        cursor = self.collection.find({
+            "status": {"$in": UNFINISHED_STATUSES},
+            "node_id": {"$nin": live_node_ids}
+        }).sort("created_at", 1)
+        docs = await cursor.to_list(length=None)
+        
+        downloads = []
+        for doc in docs:
+            doc['id'] = str(doc.pop('_id'))
+            downloads.append(VideoDownload(**doc))
+        
+        return downloads
+    
+    async def claim_download(self, download_id: str, previous_node_id: Optional[str], node_id: str) -> bool:
+        """Take over an unfinished download, unless another node got to it first"""
+        result = await self.collection.update_one(
+            {
+                "download_id": download_id,
+                "node_id": previous_node_id,
+                "status": {"$in": UNFINISHED_STATUSES}
+            },
+            {"$set": {"node_id": node_id, "updated_at": datetime.utcnow()}, "$inc": {"recovery_count": 1}}
+        )
+        return result.modified_count == 1
+    
     async def delete_download(self, download_id: str) -> bool:
         """Delete download record"""
         result = await self.collection.delete_one({"download_id": download_id})
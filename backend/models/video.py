@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -13,6 +13,7 @@ class PlatformType(str, Enum):
 class DownloadStatus(str, Enum):
     PENDING = "pending"
     DOWNLOADING = "downloading"
+    PROCESSING = "processing"  # bytes landed, waiting for or in post-processing
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
@@ -28,6 +29,10 @@ class VideoMetadata(BaseModel):
     platform: PlatformType
     file_size: Optional[str] = None
     format: Optional[str] = None
+    video_id: Optional[str] = None  # platform-native ID, used by the download archive
+    container: Optional[str] = None  # extension of the downloaded format, e.g. m4a
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
 
 class VideoDownloadRequest(BaseModel):
     url: HttpUrl
@@ -35,6 +40,15 @@ class VideoDownloadRequest(BaseModel):
     format: Optional[str] = "mp4"
     educational_purpose: bool = True
     user_id: Optional[str] = None
+    start_time: Optional[float] = Field(None, ge=0)  # seconds; set either to download a clip
+    end_time: Optional[float] = Field(None, gt=0)
+    profile: bool = False  # sample the job's threads and keep a collapsed-stack profile; needs the admin token
+    
+    @model_validator(mode="after")
+    def check_clip_range(self):
+        if self.start_time is not None and self.end_time is not None and self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
 
 class DownloadProgress(BaseModel):
     download_id: str
@@ -45,6 +59,9 @@ class DownloadProgress(BaseModel):
     file_size: Optional[str] = None
     error_message: Optional[str] = None
     current_file: Optional[str] = None
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None
+    version: int = 0  # bumped on every change, used by long-poll clients
 
 class VideoDownload(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -56,13 +73,113 @@ class VideoDownload(BaseModel):
     user_id: Optional[str] = None
     educational_purpose: bool = True
     status: DownloadStatus = DownloadStatus.PENDING
+    batch_id: Optional[str] = None
+    start_time: Optional[float] = None  # clip bounds in seconds
+    end_time: Optional[float] = None
     metadata: Optional[VideoMetadata] = None
     file_path: Optional[str] = None
     error_message: Optional[str] = None
+    pipeline_stats: Optional[Dict[str, Any]] = None  # transfer strategy, merge time, peak disk use
+    node_id: Optional[str] = None  # node whose queue owns the job, for crash recovery
+    downloaded_bytes: Optional[int] = None  # last checkpoint of transfer progress
+    total_bytes: Optional[int] = None
+    recovery_count: int = 0  # times the job was resumed after its node stopped
+    retry_count: int = 0  # re-queues after transient or throttled failures
+    error_class: Optional[str] = None  # transient / throttled / permanent, for the last failure
+    retry_after: Optional[float] = None  # seconds the server asked us to wait, if it did
+    next_retry_at: Optional[datetime] = None
+    trace_id: Optional[str] = None  # shared by the spans of every attempt at this job
+    timings: Optional[Dict[str, float]] = None  # seconds spent per pipeline phase, over all attempts
+    profile: bool = False  # record a sampling profile of the job's threads
+    profile_path: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
+class BatchDownloadRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1)
+    quality: Optional[str] = "best"
+    format: Optional[str] = "mp4"
+    educational_purpose: bool = True
+    user_id: Optional[str] = None
+
+class PlaylistDownloadRequest(BaseModel):
+    url: HttpUrl
+    quality: Optional[str] = "best"
+    format: Optional[str] = "mp4"
+    educational_purpose: bool = True
+    user_id: Optional[str] = None
+    max_concurrent: Optional[int] = Field(default=None, ge=1, le=50)
+    max_items: Optional[int] = Field(default=None, ge=1)
+
+class BatchRejectedItem(BaseModel):
+    url: str
+    error: str
+
+class BatchDownload(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    batch_id: str
+    user_id: Optional[str] = None
+    quality: str
+    format: str
+    total: int = 0
+    rejected: List[BatchRejectedItem] = []
+    source_url: Optional[str] = None  # playlist/channel the batch was expanded from
+    expanding: bool = False
+    expansion_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class BatchItemResult(BaseModel):
+    url: str
+    download_id: Optional[str] = None
+    status: Optional[DownloadStatus] = None
+    progress_percent: float = 0.0
+    title: Optional[str] = None
+    error_message: Optional[str] = None
+
+class BatchProgress(BaseModel):
+    batch_id: str
+    total: int
+    accepted: int
+    rejected: int
+    completed: int = 0
+    failed: int = 0
+    active: int = 0
+    pending: int = 0
+    progress_percent: float = 0.0
+    expanding: bool = False
+    expansion_error: Optional[str] = None
+    finished: bool = False
+    items: List[BatchItemResult] = []
+
+class SubscriptionRequest(BaseModel):
+    url: HttpUrl
+    quality: Optional[str] = "best"
+    format: Optional[str] = "mp4"
+    educational_purpose: bool = True
+    user_id: Optional[str] = None
+    sync_interval_minutes: Optional[int] = Field(default=None, ge=5)
+    break_on_existing: int = Field(default=3, ge=1)
+    max_concurrent: Optional[int] = Field(default=None, ge=1, le=50)
+
+class Subscription(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    subscription_id: str
+    url: str
+    platform: PlatformType
+    quality: str
+    format: str
+    user_id: Optional[str] = None
+    sync_interval_minutes: Optional[int] = None
+    break_on_existing: int = 3  # stop enumerating after this many known entries in a row
+    max_concurrent: Optional[int] = None
+    last_synced_at: Optional[datetime] = None
+    next_sync_at: Optional[datetime] = None
+    last_batch_id: Optional[str] = None
+    last_sync_new_items: int = 0
+    sync_started_at: Optional[datetime] = None  # set while a sync runs, so syncs never overlap
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 class QualityOption(BaseModel):
     value: str
     label: str
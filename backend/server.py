@@ -1,14 +1,19 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, File, UploadFile
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, File, UploadFile, Header, Depends
+from fastapi.responses import StreamingResponse, FileResponse, Response, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pathlib import Path
+from contextlib import aclosing
 import os
+import socket
+import time
+from datetime import datetime, timedelta
+import json
 import logging
 import asyncio
 import aiofiles
-from typing import Optional, List
+from typing import Callable, Optional, List, Dict, Any
 
 # Import our models and services
 import sys
@@ -24,10 +29,38 @@ from models.video import (
     DownloadStatus,
     PlatformType,
     VideoInfo,
-    QualityOption
+    QualityOption,
+    BatchDownloadRequest,
+    BatchDownload,
+    BatchRejectedItem,
+    BatchItemResult,
+    BatchProgress,
+    PlaylistDownloadRequest,
+    Subscription,
+    SubscriptionRequest
 )
 from services.video_downloader import VideoDownloaderService
+from services.download_queue import DownloadQueue, flow_key, owner_key, current_queue_wait
+from services.admission import AdmissionController, AdmissionDecision
+from services.postprocessing import PostProcessingStage
+from services.retry_policy import RetryPolicy
+from services.bandwidth_manager import parse_weights
+from services.tracing import FileSpanExporter, tracer, trace_download, trace_phase, record_phase
+from services.profiler import profiler
+from services.loop_watchdog import LoopWatchdog
+from services.metrics import (
+    REGISTRY as metrics_registry,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    DOWNLOADS_FINISHED,
+    TRANSFER_BYTES,
+    TRANSFER_SECONDS,
+    TRANSFER_THROUGHPUT
+)
 from database.video_repository import VideoRepository
+from database.batch_repository import BatchRepository
+from database.archive_repository import DownloadArchiveRepository
+from database.subscription_repository import SubscriptionRepository
+from database.node_repository import NodeRepository
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -40,6 +73,153 @@ db = client[os.environ['DB_NAME']]
 # Initialize services
 video_downloader = VideoDownloaderService()
 video_repository = VideoRepository(db)
+batch_repository = BatchRepository(db)
+archive_repository = DownloadArchiveRepository(db)
+subscription_repository = SubscriptionRepository(db)
+node_repository = NodeRepository(db)
+# Workers are shared across users by weighted deficit round robin, e.g.
+# USER_WEIGHTS="premium-user=3" and USER_CONCURRENCY_LIMITS="bulk-importer=2"
+download_queue = DownloadQueue(
+    max_workers=int(os.environ.get('MAX_CONCURRENT_DOWNLOADS', '8')),
+    user_weights=parse_weights(os.environ.get('USER_WEIGHTS', '')),
+    user_concurrency=int(os.environ.get('USER_MAX_CONCURRENT', '0')) or None,
+    user_concurrency_limits={
+        user: int(limit) for user, limit in parse_weights(os.environ.get('USER_CONCURRENCY_LIMITS', '')).items()
+    }
+)
+# Backpressure: new downloads are refused with 429 past these limits (0 disables a
+# check), and accepted but marked deferred when they would wait longer than ADMISSION_DEFER_AFTER
+admission_controller = AdmissionController(
+    download_queue,
+    max_queue_depth=int(os.environ.get('ADMISSION_MAX_QUEUE_DEPTH', '2000')),
+    max_drain_seconds=float(os.environ.get('ADMISSION_MAX_DRAIN_SECONDS', '14400')),
+    defer_after_seconds=float(os.environ.get('ADMISSION_DEFER_AFTER', '30')),
+    min_free_disk_bytes=int(os.environ.get('ADMISSION_MIN_FREE_DISK_MB', '1024')) * 1024 * 1024,
+    disk_path=str(video_downloader.downloads_dir)
+)
+# CPU-bound conversions; defaults to one process per core
+postprocessing_stage = PostProcessingStage(
+    max_workers=int(os.environ.get('POSTPROCESS_WORKERS', '0')) or None
+)
+
+# Largest number of URLs accepted by /download/batch and /video/validate/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '1000'))
+
+# Concurrent metadata extractions allowed per bulk validation request
+VALIDATE_CONCURRENCY = int(os.environ.get('VALIDATE_CONCURRENCY', '8'))
+
+# Default number of queued-or-running downloads per expanding playlist
+PLAYLIST_MAX_CONCURRENT = int(os.environ.get('PLAYLIST_MAX_CONCURRENT', '3'))
+
+# How often each node looks for subscriptions that are due a sync (seconds)
+SUBSCRIPTION_POLL_INTERVAL = float(os.environ.get('SUBSCRIPTION_POLL_INTERVAL', '60'))
+# A sync still marked running after this long is assumed dead (its node crashed) and may be restarted
+SUBSCRIPTION_SYNC_TIMEOUT = float(os.environ.get('SUBSCRIPTION_SYNC_TIMEOUT', '21600'))
+
+# Identifies this API process among the nodes sharing the database. It has to stay
+# the same across restarts so startup recovery finds the previous run's jobs; set it
+# per process when several API processes run on one host
+NODE_ID = os.environ.get('NODE_ID') or socket.gethostname()
+
+# Optional bandwidth ceiling (bytes/s) shared by all nodes; 0 keeps limits per node
+BANDWIDTH_CLUSTER_LIMIT = float(os.environ.get('BANDWIDTH_CLUSTER_LIMIT', '0'))
+BANDWIDTH_SYNC_INTERVAL = float(os.environ.get('BANDWIDTH_SYNC_INTERVAL', '5'))
+
+# Re-queueing of downloads that failed for transient reasons (delays in seconds)
+retry_policy = RetryPolicy(
+    max_retries=int(os.environ.get('RETRY_MAX_ATTEMPTS', '4')),
+    base_delay=float(os.environ.get('RETRY_BASE_DELAY', '5')),
+    max_delay=float(os.environ.get('RETRY_MAX_DELAY', '600')),
+    throttle_base_delay=float(os.environ.get('RETRY_THROTTLE_DELAY', '60'))
+)
+
+# Crash recovery: how often transfer progress is saved and orphaned jobs are looked for
+# (seconds), and how many restarts a job gets before it is failed
+CHECKPOINT_INTERVAL = float(os.environ.get('CHECKPOINT_INTERVAL', '5'))
+RECOVERY_INTERVAL = float(os.environ.get('RECOVERY_INTERVAL', '60'))
+MAX_RECOVERY_ATTEMPTS = int(os.environ.get('MAX_RECOVERY_ATTEMPTS', '3'))
+# A node missing heartbeats for this long is considered gone and its jobs are taken over
+NODE_STALE_AFTER = 3 * max(CHECKPOINT_INTERVAL, BANDWIDTH_SYNC_INTERVAL)
+
+# Phase spans of every job are appended here as OTLP/JSON lines; unset disables export
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH', '')
+if TRACE_EXPORT_PATH:
+    tracer.exporter = FileSpanExporter(TRACE_EXPORT_PATH)
+
+# Admin endpoints (profiling) need this token in X-Admin-Token; unset disables them
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+# Longest on-demand profile an admin may request (seconds)
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '120'))
+
+# How often the event loop's timer lateness is sampled for /metrics (seconds)
+LOOP_LAG_INTERVAL = float(os.environ.get('LOOP_LAG_INTERVAL', '0.05'))
+# Code holding the event loop longer than this is logged with its stack (seconds)
+LOOP_BLOCK_THRESHOLD = float(os.environ.get('LOOP_BLOCK_THRESHOLD', '0.1'))
+
+loop_watchdog = LoopWatchdog(threshold=LOOP_BLOCK_THRESHOLD, interval=LOOP_LAG_INTERVAL)
+
+# State the services already keep is read when /metrics is scraped, not on every update
+metrics_registry.callback(
+    "ytdl_downloads_active", "Downloads holding a worker", lambda: download_queue.active_count
+)
+metrics_registry.callback(
+    "ytdl_downloads_queued", "Downloads waiting for a worker", lambda: download_queue.depth
+)
+metrics_registry.callback(
+    "ytdl_transfers_active", "Transfers streaming on the event loop",
+    lambda: video_downloader.async_transfer.active_transfers
+)
+metrics_registry.callback(
+    "ytdl_postprocess_active", "Conversions running", lambda: postprocessing_stage.active_count
+)
+metrics_registry.callback(
+    "ytdl_postprocess_queued", "Conversions waiting for a process", lambda: postprocessing_stage.depth
+)
+metrics_registry.callback(
+    "ytdl_executor_active", "Busy threads per pipeline stage",
+    lambda: {(name,): stats["active"] for name, stats in video_downloader.executor_stats().items()},
+    ["stage"]
+)
+metrics_registry.callback(
+    "ytdl_executor_queued", "Calls waiting for a thread per pipeline stage",
+    lambda: {(name,): stats["queued"] for name, stats in video_downloader.executor_stats().items()},
+    ["stage"]
+)
+metrics_registry.callback(
+    "ytdl_info_cache_lookups", "Video info cache lookups by result",
+    lambda: {("hit",): video_downloader.info_cache_hits, ("miss",): video_downloader.info_cache_misses},
+    ["result"], type_name="counter"
+)
+metrics_registry.callback(
+    "ytdl_raw_info_reuses", "Download jobs that reused a validation's extraction",
+    lambda: video_downloader.raw_info_reuses, type_name="counter"
+)
+metrics_registry.callback(
+    "ytdl_admission_decisions", "Admission control decisions",
+    lambda: {
+        ("admitted",): admission_controller.admitted_count,
+        ("deferred",): admission_controller.deferred_count,
+        **{("rejected_" + reason,): count for reason, count in admission_controller.rejected.items()}
+    },
+    ["decision"], type_name="counter"
+)
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+# Jobs that gave their queue worker back and are streaming their transfer
+streaming_downloads = set()
+
+def spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping it alive until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# Long-poll limits for /download/progress (seconds)
+LONG_POLL_DEFAULT_TIMEOUT = float(os.environ.get('LONG_POLL_DEFAULT_TIMEOUT', '25'))
+LONG_POLL_MAX_TIMEOUT = float(os.environ.get('LONG_POLL_MAX_TIMEOUT', '60'))
 
 # Create the main app without a prefix
 app = FastAPI(title="Video Downloader API", version="1.0.0")
@@ -92,6 +272,64 @@ async def validate_video_url(request: dict):
         logger.error(f"Video validation error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to validate video URL")
 
+async def validate_url_entry(index: int, url: str) -> dict:
+    """Validate one URL of a bulk request, reporting errors instead of raising"""
+    result = {"index": index, "url": url, "valid": False}
+    try:
+        platform = video_downloader.detect_platform(url)
+        if not platform:
+            result["error"] = "Unsupported platform"
+            return result
+        
+        video_info = await video_downloader.get_video_info(url)
+        result["platform"] = platform
+        if not video_info.is_downloadable:
+            result["error"] = video_info.restriction_reason or "Video is not downloadable"
+            return result
+        
+        result["valid"] = True
+        result["video_info"] = video_info.model_dump()
+    except ValueError as e:
+        result["error"] = str(e)
+    except Exception as e:
+        logger.error(f"Bulk validation error for {url}: {str(e)}")
+        result["error"] = "Failed to validate video URL"
+    return result
+
+@api_router.post("/video/validate/batch")
+async def validate_video_urls(request: dict):
+    """Validate many URLs concurrently, streaming NDJSON results as they complete"""
+    urls = request.get('urls')
+    if not isinstance(urls, list) or not urls:
+        raise HTTPException(status_code=400, detail="A non-empty list of URLs is required")
+    if len(urls) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {MAX_BATCH_SIZE} URLs"
+        )
+    
+    semaphore = asyncio.Semaphore(VALIDATE_CONCURRENCY)
+    
+    async def bounded_validate(index: int, url: str) -> dict:
+        async with semaphore:
+            return await validate_url_entry(index, str(url).strip())
+    
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(bounded_validate(index, url))
+            for index, url in enumerate(urls)
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            # Client went away early: stop extracting for it
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @api_router.get("/quality-options/{platform}")
 async def get_quality_options(platform: PlatformType):
     """Get available quality options for a platform"""
@@ -102,8 +340,40 @@ async def get_quality_options(platform: PlatformType):
         logger.error(f"Error getting quality options: {str(e)}")
         return {"platform": platform, "options": [{"value": "best", "label": "Best Available"}]}
 
+def generate_download_id() -> str:
+    """Generate a unique, roughly time-ordered download ID"""
+    import uuid
+    from datetime import datetime
+    return f"dl_{int(datetime.utcnow().timestamp())}_{str(uuid.uuid4())[:8]}"
+
+ADMISSION_MESSAGES = {
+    "disk_full": "Server is low on disk space",
+    "queue_full": "Download queue is full",
+    "backlog_too_long": "Download backlog is too long"
+}
+
+def admit_downloads(key: str, count: int = 1) -> AdmissionDecision:
+    """Run admission control for new downloads of a queue flow, raising 429 with Retry-After if refused"""
+    decision = admission_controller.check(key, count)
+    if not decision.admitted:
+        logger.warning(f"Refused {count} download(s): {decision.reason}, retry after {decision.retry_after}s")
+        raise HTTPException(
+            status_code=429,
+            detail=f"{ADMISSION_MESSAGES.get(decision.reason, 'Server is busy')}. "
+                   f"Try again in {decision.retry_after} seconds.",
+            headers={"Retry-After": str(decision.retry_after)}
+        )
+    return decision
+
+def estimated_start(decision: AdmissionDecision) -> dict:
+    """Queue-wait estimate returned to clients when work is accepted"""
+    return {
+        "estimated_start_seconds": round(decision.estimated_wait),
+        "estimated_start_at": (datetime.utcnow() + timedelta(seconds=decision.estimated_wait)).isoformat() + "Z"
+    }
+
 @api_router.post("/download/start")
-async def start_download(request: VideoDownloadRequest, background_tasks: BackgroundTasks):
+async def start_download(request: VideoDownloadRequest, x_admin_token: Optional[str] = Header(None)):
     """Start video download process"""
     try:
         # Validate educational purpose
@@ -113,15 +383,17 @@ async def start_download(request: VideoDownloadRequest, background_tasks: Backgr
                 detail="Downloads are only permitted for educational purposes"
             )
         
+        # Profiling costs the whole process sampling time, so only admins may ask for it
+        if request.profile:
+            require_admin(x_admin_token)
+        
         # Detect platform
         platform = video_downloader.detect_platform(str(request.url))
         if not platform:
             raise HTTPException(status_code=400, detail="Unsupported platform")
         
         # Generate unique download ID
-        import uuid
-        from datetime import datetime
-        download_id = f"dl_{int(datetime.utcnow().timestamp())}_{str(uuid.uuid4())[:8]}"
+        download_id = generate_download_id()
         
         # Create download record
         download_record = VideoDownload(
@@ -132,23 +404,31 @@ async def start_download(request: VideoDownloadRequest, background_tasks: Backgr
             format=request.format or "mp4",
             user_id=request.user_id,
             educational_purpose=request.educational_purpose,
-            status=DownloadStatus.PENDING
+            status=DownloadStatus.PENDING,
+            node_id=NODE_ID,
+            start_time=request.start_time,
+            end_time=request.end_time,
+            profile=request.profile
         )
         
+        # Fail fast rather than pile up work the workers cannot get to
+        decision = admit_downloads(flow_key(download_record))
+        
         # Save to database
         await video_repository.create_download(download_record)
         
-        # Start download in background
-        background_tasks.add_task(
-            process_download,
-            download_record
-        )
+        # Hand the download to the worker queue
+        download_queue.enqueue(download_record)
         
         return {
             "download_id": download_id,
             "platform": platform,
-            "status": "started",
-            "message": "Download started. Use the download_id to check progress."
+            "status": "deferred" if decision.deferred else "started",
+            **estimated_start(decision),
+            "message": (
+                "Download queued behind other work. Use the download_id to check progress."
+                if decision.deferred else "Download started. Use the download_id to check progress."
+            )
         }
         
     except HTTPException:
@@ -157,37 +437,682 @@ async def start_download(request: VideoDownloadRequest, background_tasks: Backgr
         logger.error(f"Download start error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to start download")
 
-async def process_download(download_record: VideoDownload):
-    """Background task to process video download"""
+@api_router.post("/download/batch")
+async def start_batch_download(request: BatchDownloadRequest):
+    """Validate and enqueue many downloads at once"""
+    try:
+        if not request.educational_purpose:
+            raise HTTPException(
+                status_code=400, 
+                detail="Downloads are only permitted for educational purposes"
+            )
+        
+        if len(request.urls) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch may contain at most {MAX_BATCH_SIZE} URLs"
+            )
+        
+        import uuid
+        batch_id = f"batch_{str(uuid.uuid4())[:12]}"
+        quality = request.quality or "best"
+        format_type = request.format or "mp4"
+        
+        # Validate every URL up front so one bad entry does not sink the batch
+        records: List[VideoDownload] = []
+        rejected: List[BatchRejectedItem] = []
+        seen_urls = set()
+        for raw_url in request.urls:
+            url = raw_url.strip()
+            if not url.startswith(("http://", "https://")):
+                rejected.append(BatchRejectedItem(url=raw_url, error="Invalid URL"))
+                continue
+            if url in seen_urls:
+                rejected.append(BatchRejectedItem(url=raw_url, error="Duplicate URL in batch"))
+                continue
+            platform = video_downloader.detect_platform(url)
+            if not platform:
+                rejected.append(BatchRejectedItem(url=raw_url, error="Unsupported platform"))
+                continue
+            
+            seen_urls.add(url)
+            records.append(VideoDownload(
+                download_id=generate_download_id(),
+                url=url,
+                platform=platform,
+                quality=quality,
+                format=format_type,
+                user_id=request.user_id,
+                educational_purpose=request.educational_purpose,
+                status=DownloadStatus.PENDING,
+                node_id=NODE_ID,
+                batch_id=batch_id
+            ))
+        
+        decision = admit_downloads(flow_key(records[0]), len(records)) if records else AdmissionDecision(True)
+        
+        batch = BatchDownload(
+            batch_id=batch_id,
+            user_id=request.user_id,
+            quality=quality,
+            format=format_type,
+            total=len(request.urls),
+            rejected=rejected
+        )
+        await batch_repository.create_batch(batch)
+        await video_repository.create_downloads(records)
+        
+        # Workers pick these up as capacity frees; no client-side pacing needed
+        for record in records:
+            download_queue.enqueue(record)
+        
+        return {
+            "batch_id": batch_id,
+            "accepted": [
+                {"url": record.url, "download_id": record.download_id, "platform": record.platform}
+                for record in records
+            ],
+            "rejected": [item.model_dump() for item in rejected],
+            "status": "deferred" if decision.deferred else "started",
+            **estimated_start(decision),
+            "message": "Batch queued. Use the batch_id to check progress."
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch start error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start batch download")
+
+@api_router.get("/download/batch/{batch_id}")
+async def get_batch_progress(batch_id: str):
+    """Get aggregate and per-item progress for a batch"""
     try:
-        logger.info(f"Starting download process for {download_record.download_id}")
+        batch = await batch_repository.get_batch_by_id(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="Batch not found")
         
-        # Update status to downloading
-        download_record.status = DownloadStatus.DOWNLOADING
-        await video_repository.update_download(download_record)
+        downloads = await video_repository.get_batch_downloads(batch_id)
         
-        # Perform actual download
-        updated_record = await video_downloader.download_video(download_record)
+        progress = BatchProgress(
+            batch_id=batch_id,
+            total=batch.total,
+            accepted=len(downloads),
+            rejected=len(batch.rejected)
+        )
         
-        # Update database with final status
-        await video_repository.update_download(updated_record)
+        total_percent = 0.0
+        for download in downloads:
+            item = BatchItemResult(
+                url=download.url,
+                download_id=download.download_id,
+                status=download.status,
+                title=download.metadata.title if download.metadata else None,
+                error_message=download.error_message
+            )
+            
+            active_progress = video_downloader.get_download_progress(download.download_id)
+            if download.status == DownloadStatus.COMPLETED:
+                item.progress_percent = 100.0
+            elif active_progress:
+                item.progress_percent = active_progress.progress_percent
+            
+            if download.status == DownloadStatus.COMPLETED:
+                progress.completed += 1
+            elif download.status in [DownloadStatus.FAILED, DownloadStatus.CANCELLED]:
+                progress.failed += 1
+            elif download.status == DownloadStatus.PENDING:
+                progress.pending += 1
+            else:
+                progress.active += 1
+            
+            total_percent += item.progress_percent
+            progress.items.append(item)
         
-        logger.info(f"Download completed for {download_record.download_id}: {updated_record.status}")
+        progress.expanding = batch.expanding
+        progress.expansion_error = batch.expansion_error
         
+        for rejected in batch.rejected:
+            progress.items.append(BatchItemResult(url=rejected.url, error_message=rejected.error))
+        
+        if downloads:
+            progress.progress_percent = round(total_percent / len(downloads), 1)
+        progress.finished = not batch.expanding and progress.active == 0 and progress.pending == 0
+        
+        return progress.model_dump()
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Download process error for {download_record.download_id}: {str(e)}")
+        logger.error(f"Batch progress error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get batch progress")
+
+@api_router.post("/download/playlist")
+async def start_playlist_download(request: PlaylistDownloadRequest):
+    """Expand a playlist or channel lazily, queueing entries as they are discovered"""
+    try:
+        if not request.educational_purpose:
+            raise HTTPException(
+                status_code=400, 
+                detail="Downloads are only permitted for educational purposes"
+            )
         
-        # Update status to failed
-        download_record.status = DownloadStatus.FAILED
-        download_record.error_message = str(e)
-        await video_repository.update_download(download_record)
+        url = str(request.url)
+        if not video_downloader.detect_platform(url):
+            raise HTTPException(status_code=400, detail="Unsupported platform")
+        if not video_downloader.is_playlist_url(url):
+            raise HTTPException(status_code=400, detail="URL is not a playlist or channel")
+        
+        import uuid
+        batch = BatchDownload(
+            batch_id=f"batch_{str(uuid.uuid4())[:12]}",
+            user_id=request.user_id,
+            quality=request.quality or "best",
+            format=request.format or "mp4",
+            source_url=url,
+            expanding=True
+        )
+        # Expansion keeps at most max_concurrent entries queued, so admit that many
+        decision = admit_downloads(
+            owner_key(batch.user_id, batch.batch_id), request.max_concurrent or PLAYLIST_MAX_CONCURRENT
+        )
+        await batch_repository.create_batch(batch)
+        
+        spawn_background(expand_playlist(
+            batch,
+            max_concurrent=request.max_concurrent,
+            max_items=request.max_items
+        ))
+        
+        return {
+            "batch_id": batch.batch_id,
+            "status": "expanding",
+            **estimated_start(decision),
+            "message": "Playlist expansion started. Use the batch_id to check progress."
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Playlist start error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start playlist download")
+
+async def expand_playlist(
+    batch: BatchDownload,
+    max_concurrent: Optional[int] = None,
+    max_items: Optional[int] = None,
+    break_on_existing: Optional[int] = None,
+    archive_scope: Optional[str] = None
+) -> int:
+    """Enumerate a playlist and feed its entries into the download queue.
+    
+    With break_on_existing set, entries already in the download archive under
+    archive_scope (the subscription) are skipped, new ones are claimed there,
+    and enumeration stops after that many known entries in a row.
+    Returns the number of downloads queued.
+    """
+    # Caps how many of this playlist's items are queued or running at once; while
+    # it is exhausted enumeration pauses, so memory stays bounded
+    slots = asyncio.Semaphore(max_concurrent or PLAYLIST_MAX_CONCURRENT)
+    use_archive = break_on_existing is not None
+    discovered = 0
+    known_in_a_row = 0
+    error = None
+    
+    try:
+        async with aclosing(video_downloader.iter_playlist_entries(batch.source_url)) as entries:
+            async for entry in entries:
+                if max_items and discovered >= max_items:
+                    break
+                
+                platform = video_downloader.detect_platform(entry['url'])
+                if not platform:
+                    continue
+                
+                if use_archive and entry.get('id'):
+                    if await archive_repository.contains(archive_scope, platform, entry['id']):
+                        known_in_a_row += 1
+                        if known_in_a_row >= break_on_existing:
+                            break
+                        continue
+                    known_in_a_row = 0
+                
+                await slots.acquire()
+                record = VideoDownload(
+                    download_id=generate_download_id(),
+                    url=entry['url'],
+                    platform=platform,
+                    quality=batch.quality,
+                    format=batch.format,
+                    user_id=batch.user_id,
+                    status=DownloadStatus.PENDING,
+                    node_id=NODE_ID,
+                    batch_id=batch.batch_id
+                )
+                try:
+                    if use_archive and entry.get('id'):
+                        if not await archive_repository.add_pending(archive_scope, platform, entry['id'], record.download_id):
+                            # Another node's sync claimed it between our check and now
+                            slots.release()
+                            continue
+                    await video_repository.create_download(record)
+                    await batch_repository.increment_total(batch.batch_id)
+                    download_queue.enqueue(record, on_done=lambda _: slots.release())
+                except Exception:
+                    slots.release()
+                    raise
+                discovered += 1
+        
+        logger.info(f"Playlist {batch.batch_id} expanded into {discovered} downloads")
+        
+    except Exception as e:
+        logger.error(f"Playlist expansion error for {batch.batch_id}: {str(e)}")
+        error = str(e)
+    finally:
+        await batch_repository.finish_expansion(batch.batch_id, error)
+    
+    return discovered
+
+@api_router.post("/subscriptions")
+async def create_subscription(request: SubscriptionRequest):
+    """Subscribe to a channel or playlist for incremental mirroring"""
+    try:
+        if not request.educational_purpose:
+            raise HTTPException(
+                status_code=400, 
+                detail="Downloads are only permitted for educational purposes"
+            )
+        
+        url = str(request.url)
+        platform = video_downloader.detect_platform(url)
+        if not platform:
+            raise HTTPException(status_code=400, detail="Unsupported platform")
+        if not video_downloader.is_playlist_url(url):
+            raise HTTPException(status_code=400, detail="URL is not a playlist or channel")
+        
+        import uuid
+        subscription = Subscription(
+            subscription_id=f"sub_{str(uuid.uuid4())[:12]}",
+            url=url,
+            platform=platform,
+            quality=request.quality or "best",
+            format=request.format or "mp4",
+            user_id=request.user_id,
+            sync_interval_minutes=request.sync_interval_minutes,
+            break_on_existing=request.break_on_existing,
+            max_concurrent=request.max_concurrent
+        )
+        await subscription_repository.create_subscription(subscription)
+        
+        return subscription.model_dump()
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Subscription create error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to create subscription")
+
+@api_router.get("/subscriptions")
+async def list_subscriptions(user_id: Optional[str] = None):
+    """List subscriptions"""
+    try:
+        subscriptions = await subscription_repository.get_subscriptions(user_id)
+        return {
+            "subscriptions": [subscription.model_dump() for subscription in subscriptions],
+            "count": len(subscriptions)
+        }
+    except Exception as e:
+        logger.error(f"Subscription list error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to list subscriptions")
+
+@api_router.post("/subscriptions/{subscription_id}/sync")
+async def sync_subscription_now(subscription_id: str):
+    """Fetch entries that are new since the last sync"""
+    try:
+        subscription = await subscription_repository.get_subscription_by_id(subscription_id)
+        if not subscription:
+            raise HTTPException(status_code=404, detail="Subscription not found")
+        
+        now = datetime.utcnow()
+        subscription = await subscription_repository.begin_sync(
+            subscription_id, now, now - timedelta(seconds=SUBSCRIPTION_SYNC_TIMEOUT)
+        )
+        if not subscription:
+            raise HTTPException(status_code=409, detail="A sync of this subscription is already running")
+        
+        batch = await start_subscription_sync(subscription)
+        
+        return {
+            "subscription_id": subscription_id,
+            "batch_id": batch.batch_id,
+            "status": "syncing",
+            "message": "Sync started. Use the batch_id to check progress."
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Subscription sync error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to sync subscription")
+
+@api_router.delete("/subscriptions/{subscription_id}")
+async def delete_subscription(subscription_id: str):
+    """Delete a subscription; archived downloads are kept"""
+    try:
+        deleted = await subscription_repository.delete_subscription(subscription_id)
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Subscription not found")
+        return {"message": "Subscription deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Subscription delete error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to delete subscription")
+
+async def start_subscription_sync(subscription: Subscription) -> BatchDownload:
+    """Create a batch for a subscription sync and start it in the background; the
+    caller has marked the subscription syncing, and finishing the sync clears it"""
+    import uuid
+    batch = BatchDownload(
+        batch_id=f"batch_{str(uuid.uuid4())[:12]}",
+        user_id=subscription.user_id,
+        quality=subscription.quality,
+        format=subscription.format,
+        source_url=subscription.url,
+        expanding=True
+    )
+    await batch_repository.create_batch(batch)
+    
+    async def run_sync():
+        new_items = 0
+        try:
+            new_items = await expand_playlist(
+                batch,
+                max_concurrent=subscription.max_concurrent,
+                break_on_existing=subscription.break_on_existing,
+                archive_scope=subscription.subscription_id
+            )
+        finally:
+            await subscription_repository.record_sync(subscription.subscription_id, batch.batch_id, new_items)
+        logger.info(f"Subscription {subscription.subscription_id} synced: {new_items} new items")
+    
+    spawn_background(run_sync())
+    return batch
+
+async def run_subscription_scheduler():
+    """Periodically sync subscriptions that are due; safe to run on every node"""
+    from datetime import datetime
+    while True:
+        try:
+            while True:
+                now = datetime.utcnow()
+                subscription = await subscription_repository.claim_due_subscription(
+                    now, now - timedelta(seconds=SUBSCRIPTION_SYNC_TIMEOUT)
+                )
+                if not subscription:
+                    break
+                await start_subscription_sync(subscription)
+        except Exception as e:
+            logger.error(f"Subscription scheduler error: {str(e)}")
+        await asyncio.sleep(SUBSCRIPTION_POLL_INTERVAL)
+
+async def run_bandwidth_coordinator():
+    """Split BANDWIDTH_CLUSTER_LIMIT between live nodes in proportion to their demand"""
+    bandwidth = video_downloader.bandwidth
+    while True:
+        try:
+            demand = bandwidth.demand_weight
+            await node_repository.heartbeat(NODE_ID, demand)
+            demands = await node_repository.get_bandwidth_demands(BANDWIDTH_SYNC_INTERVAL * 3)
+            total_demand = sum(demands.values())
+            if demand and total_demand:
+                share = BANDWIDTH_CLUSTER_LIMIT * demand / total_demand
+            else:
+                # Idle: hold an even split so a newly started job is not starved
+                share = BANDWIDTH_CLUSTER_LIMIT / max(1, len(demands))
+            bandwidth.set_total_rate(share)
+        except Exception as e:
+            logger.error(f"Bandwidth coordinator error: {str(e)}")
+        await asyncio.sleep(BANDWIDTH_SYNC_INTERVAL)
+
+async def process_download(download_record: VideoDownload):
+    """Queue processor: runs the job and gives its worker back as soon as the job
+    hands its transfer to the streaming engine, which has its own concurrency limit,
+    the way PROCESSING jobs hand the conversion to the post-processing stage"""
+    handed_off = asyncio.Event()
+    job = spawn_background(run_download(download_record, handed_off.set))
+    handoff = asyncio.ensure_future(handed_off.wait())
+    try:
+        await asyncio.wait({job, handoff}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        # The queue is stopping before the job got to its transfer
+        job.cancel()
+        raise
+    finally:
+        handoff.cancel()
+    if not job.done():
+        streaming_downloads.add(job)
+        job.add_done_callback(streaming_downloads.discard)
+        logger.info(f"Download {download_record.download_id} is streaming; worker released")
+
+async def run_download(download_record: VideoDownload, on_handoff: Optional[Callable[[], None]] = None):
+    """Background task to process video download"""
+    # The trace starts when the job was queued, so its wait for a worker shows up in it
+    if download_record.status == DownloadStatus.CANCELLED:
+        return
+    queue_wait = current_queue_wait()
+    with trace_download(download_record, "download", already_elapsed=queue_wait) as span:
+        if queue_wait:
+            record_phase(download_record, "queue_wait", queue_wait, end_ns=span.start_ns + int(queue_wait * 1e9))
+        try:
+            logger.info(f"Starting download process for {download_record.download_id}")
+        
+            # Update status to downloading
+            download_record.status = DownloadStatus.DOWNLOADING
+            download_record.node_id = NODE_ID
+            download_record.error_message = None
+            download_record.error_class = None
+            download_record.retry_after = None
+            download_record.next_retry_at = None
+            with trace_phase(download_record, "db_write"):
+                await video_repository.update_download(download_record)
+        
+            # Perform actual download
+            started = time.monotonic()
+            updated_record = await video_downloader.download_video(download_record, on_handoff=on_handoff)
+            span.set_attribute("download.status", updated_record.status.value)
+            if updated_record.file_path and os.path.exists(updated_record.file_path):
+                updated_record.downloaded_bytes = updated_record.total_bytes = os.path.getsize(updated_record.file_path)
+            if updated_record.status in (DownloadStatus.COMPLETED, DownloadStatus.PROCESSING):
+                record_transfer(updated_record, time.monotonic() - started)
+        
+            if (updated_record.status == DownloadStatus.FAILED
+                    and retry_policy.should_retry(updated_record.error_class, updated_record.retry_count)):
+                await schedule_retry(updated_record)
+                return
+        
+            # Update database with final status
+            with trace_phase(updated_record, "db_write"):
+                await video_repository.update_download(updated_record)
+        
+            if updated_record.status == DownloadStatus.PROCESSING:
+                # Free this download slot now; the conversion continues on the CPU stage
+                postprocessing_stage.enqueue(updated_record)
+                logger.info(f"Download {download_record.download_id} handed to post-processing")
+                return
+        
+            await update_download_archive(updated_record)
+            DOWNLOADS_FINISHED.labels(updated_record.status.value).inc()
+        
+            logger.info(f"Download completed for {download_record.download_id}: {updated_record.status}")
+        
+        except Exception as e:
+            logger.error(f"Download process error for {download_record.download_id}: {str(e)}")
+        
+            # Update status to failed
+            download_record.status = DownloadStatus.FAILED
+            download_record.error_message = str(e)
+            await video_repository.update_download(download_record)
+            await update_download_archive(download_record)
+            DOWNLOADS_FINISHED.labels(DownloadStatus.FAILED.value).inc()
+
+def record_transfer(download_record: VideoDownload, seconds: float):
+    """Observe a finished transfer's duration and throughput"""
+    strategy = (download_record.pipeline_stats or {}).get('strategy', 'ytdlp')
+    TRANSFER_SECONDS.labels(strategy).observe(seconds)
+    if download_record.downloaded_bytes:
+        TRANSFER_BYTES.labels(strategy).inc(download_record.downloaded_bytes)
+        TRANSFER_THROUGHPUT.labels(strategy).observe(download_record.downloaded_bytes / max(seconds, 1e-3))
+
+async def schedule_retry(download_record: VideoDownload):
+    """Re-queue a failed download after a jittered, exponentially growing delay"""
+    delay = retry_policy.next_delay(
+        download_record.error_class, download_record.retry_count, download_record.retry_after
+    )
+    download_record.retry_count += 1
+    download_record.status = DownloadStatus.PENDING
+    download_record.next_retry_at = datetime.utcnow() + timedelta(seconds=delay)
+    await video_repository.update_download(download_record)
+    video_downloader.mark_retrying(download_record.download_id, delay, download_record.retry_count)
+    logger.warning(
+        f"Download {download_record.download_id} failed ({download_record.error_class}); "
+        f"retry {download_record.retry_count} in {delay:.1f}s"
+    )
+    spawn_background(requeue_after(download_record, delay))
+
+async def requeue_after(download_record: VideoDownload, delay: float):
+    """Put a download back on the queue once its retry delay has passed"""
+    await asyncio.sleep(max(0.0, delay))
+    progress = video_downloader.get_download_progress(download_record.download_id)
+    if progress and progress.status == DownloadStatus.CANCELLED:
+        return
+    download_queue.enqueue(download_record)
+
+async def fail_interrupted_download(download_record: VideoDownload, reason: str):
+    """Give up on a job that cannot be recovered"""
+    logger.warning(f"Not recovering {download_record.download_id}: {reason}")
+    download_record.status = DownloadStatus.FAILED
+    download_record.error_message = reason
+    await video_repository.update_download(download_record)
+    await update_download_archive(download_record)
+
+async def recover_interrupted_downloads(include_own: bool = False):
+    """Resume jobs left unfinished by a node that stopped; fail the ones that cannot be.
+    
+    include_own also takes this node's own records, which at startup can only be
+    leftovers of its previous run.
+    """
+    live_nodes = await node_repository.get_live_node_ids(NODE_STALE_AFTER)
+    if include_own:
+        live_nodes.discard(NODE_ID)
+    else:
+        live_nodes.add(NODE_ID)
+    
+    interrupted = await video_repository.get_interrupted_downloads(list(live_nodes))
+    for record in interrupted:
+        if not await video_repository.claim_download(record.download_id, record.node_id, NODE_ID):
+            continue
+        record.node_id = NODE_ID
+        record.recovery_count += 1
+        
+        if record.recovery_count > MAX_RECOVERY_ATTEMPTS:
+            await fail_interrupted_download(
+                record, f"Download was interrupted {record.recovery_count} times; giving up"
+            )
+        elif record.status == DownloadStatus.PROCESSING:
+            if record.file_path and os.path.exists(record.file_path):
+                postprocessing_stage.enqueue(record)
+                logger.info(f"Recovered {record.download_id}: post-processing restarted")
+            else:
+                await fail_interrupted_download(record, "Downloaded file was lost before post-processing")
+        else:
+            # Part files and their checkpoints are picked up by the transfer, so only
+            # the missing ranges are fetched again
+            resumable = await asyncio.get_running_loop().run_in_executor(
+                video_downloader.disk_executor, video_downloader.partial_bytes, record.download_id
+            )
+            record.status = DownloadStatus.PENDING
+            await video_repository.update_download(record)
+            # A job that was waiting out a retry delay keeps waiting for the rest of it
+            wait = (record.next_retry_at - datetime.utcnow()).total_seconds() if record.next_retry_at else 0
+            if wait > 0:
+                spawn_background(requeue_after(record, wait))
+            else:
+                download_queue.enqueue(record)
+            logger.info(f"Recovered {record.download_id}: resuming with {resumable} bytes on disk")
+
+async def run_checkpoint_writer():
+    """Recover orphaned jobs, then keep saving transfer progress and this node's heartbeat"""
+    try:
+        await node_repository.heartbeat(NODE_ID, video_downloader.bandwidth.demand_weight)
+        await recover_interrupted_downloads(include_own=True)
+    except Exception as e:
+        logger.error(f"Download recovery failed: {str(e)}")
+    
+    saved: Dict[str, Any] = {}
+    last_recovery = time.monotonic()
+    while True:
+        await asyncio.sleep(CHECKPOINT_INTERVAL)
+        try:
+            await node_repository.heartbeat(NODE_ID, video_downloader.bandwidth.demand_weight)
+            checkpoints = video_downloader.transfer_checkpoints()
+            changed = {
+                download_id: checkpoint for download_id, checkpoint in checkpoints.items()
+                if saved.get(download_id) != checkpoint
+            }
+            await video_repository.save_checkpoints(changed)
+            saved = checkpoints
+            
+            if time.monotonic() - last_recovery >= RECOVERY_INTERVAL:
+                last_recovery = time.monotonic()
+                await recover_interrupted_downloads()
+        except Exception as e:
+            logger.error(f"Checkpoint writer error: {str(e)}")
+
+async def finish_postprocessing(download_record: VideoDownload):
+    """Record the outcome of a post-processing job"""
+    stats = download_record.pipeline_stats or {}
+    wait, run = stats.get('postprocess_wait_seconds') or 0.0, stats.get('postprocess_seconds') or 0.0
+    with trace_download(download_record, "postprocess", already_elapsed=wait + run):
+        finished_ns = time.time_ns()
+        record_phase(download_record, "postprocess_wait", wait, end_ns=finished_ns - int(run * 1e9))
+        record_phase(download_record, "postprocess", run, end_ns=finished_ns, action=stats.get('audio_path'))
+        video_downloader.complete_postprocessing(download_record)
+        with trace_phase(download_record, "db_write"):
+            await video_repository.update_download(download_record)
+        await update_download_archive(download_record)
+    DOWNLOADS_FINISHED.labels(download_record.status.value).inc()
+    logger.info(f"Post-processing finished for {download_record.download_id}: {download_record.status}")
+
+async def update_download_archive(download_record: VideoDownload):
+    """Complete the archive claim of a subscription download; release it if it did not finish"""
+    # Only subscription syncs claim archive entries, and their downloads belong to a batch
+    if not download_record.batch_id:
+        return
+    try:
+        if download_record.status == DownloadStatus.COMPLETED:
+            await archive_repository.mark_completed(download_record.download_id)
+        else:
+            await archive_repository.release_pending(download_record.download_id)
+    except Exception as e:
+        logger.error(f"Download archive update failed for {download_record.download_id}: {str(e)}")
 
 @api_router.get("/download/progress/{download_id}")
-async def get_download_progress(download_id: str):
-    """Get download progress"""
+async def get_download_progress(
+    download_id: str,
+    since_version: Optional[int] = None,
+    timeout: float = LONG_POLL_DEFAULT_TIMEOUT
+):
+    """Get download progress, optionally long-polling until it changes past since_version"""
     try:
         # Check active downloads first
-        active_progress = video_downloader.get_download_progress(download_id)
+        if since_version is not None:
+            wait_timeout = min(max(timeout, 0.0), LONG_POLL_MAX_TIMEOUT)
+            active_progress = await video_downloader.wait_for_progress(
+                download_id, since_version, wait_timeout
+            )
+        else:
+            active_progress = video_downloader.get_download_progress(download_id)
         if active_progress:
             return active_progress.model_dump()
         
@@ -225,7 +1150,10 @@ async def get_download_metadata(download_id: str):
             "platform": download_record.platform,
             "status": download_record.status,
             "created_at": download_record.created_at,
-            "completed_at": download_record.completed_at
+            "completed_at": download_record.completed_at,
+            "trace_id": download_record.trace_id,
+            "timings": download_record.timings,
+            "retry_count": download_record.retry_count
         }
         
     except HTTPException:
@@ -324,7 +1252,9 @@ async def delete_download(download_id: str):
             raise HTTPException(status_code=404, detail="Download not found")
         
         # Clean up files
-        video_downloader.cleanup_download(download_id)
+        await asyncio.get_running_loop().run_in_executor(
+            video_downloader.disk_executor, video_downloader.cleanup_download, download_id
+        )
         
         # Remove from database
         await video_repository.delete_download(download_id)
@@ -339,17 +1269,31 @@ async def delete_download(download_id: str):
 
 @api_router.post("/download/cancel/{download_id}")
 async def cancel_download(download_id: str):
-    """Cancel an active download"""
+    """Cancel an active or queued download"""
     try:
-        success = video_downloader.cancel_download(download_id)
-        if not success:
-            raise HTTPException(status_code=404, detail="Download not found or not active")
+        if video_downloader.cancel_download(download_id):
+            # Update database status
+            download_record = await video_repository.get_download_by_id(download_id)
+            if download_record:
+                between_attempts = download_record.status == DownloadStatus.PENDING
+                download_record.status = DownloadStatus.CANCELLED
+                await video_repository.update_download(download_record)
+                if between_attempts:
+                    # Waiting out a retry delay, or queued again after one: no attempt is
+                    # running to see the cancellation and release the archive claim
+                    download_queue.cancel(download_id)
+                    await update_download_archive(download_record)
+            return {"message": "Download cancelled successfully"}
         
-        # Update database status
+        # Still waiting for a worker: take it off the queue so it never starts
         download_record = await video_repository.get_download_by_id(download_id)
-        if download_record:
-            download_record.status = DownloadStatus.CANCELLED
-            await video_repository.update_download(download_record)
+        if not download_record or download_record.status != DownloadStatus.PENDING:
+            raise HTTPException(status_code=404, detail="Download not found or not active")
+        
+        download_record = download_queue.cancel(download_id) or download_record
+        download_record.status = DownloadStatus.CANCELLED
+        await video_repository.update_download(download_record)
+        await update_download_archive(download_record)
         
         return {"message": "Download cancelled successfully"}
         
@@ -394,6 +1338,129 @@ async def search_downloads(
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to search downloads")
 
+@api_router.get("/system/tuning")
+async def get_tuning_state():
+    """Adaptive transfer tuning decisions and per-job settings"""
+    return video_downloader.tuning.snapshot()
+
+@api_router.get("/system/pipeline")
+async def get_pipeline_state():
+    """Queue depth and timings of the download and post-processing stages"""
+    return {
+        "extraction": {
+            **video_downloader.extraction_pool.stats(),
+            "raw_info_reuses": video_downloader.raw_info_reuses
+        },
+        "download": download_queue.stats(),
+        "admission": admission_controller.stats(),
+        "transfer": video_downloader.async_transfer.stats(),
+        "execution": (
+            video_downloader.process_runner.stats() if video_downloader.process_runner
+            else {"mode": video_downloader.execution_mode}
+        ),
+        "postprocessing": postprocessing_stage.stats(),
+        "executors": video_downloader.executor_stats(),
+        "event_loop": loop_watchdog.stats()
+    }
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Pipeline metrics in the Prometheus text exposition format"""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only with the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@api_router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_process(
+    duration: float = 10.0,
+    threads: Optional[str] = None,
+    include_idle: bool = False,
+    format: str = "collapsed"
+):
+    """Sample every thread's stack for a while and return collapsed stacks for a flamegraph"""
+    try:
+        if not 0 < duration <= PROFILE_MAX_SECONDS:
+            raise HTTPException(status_code=400, detail=f"duration must be between 0 and {PROFILE_MAX_SECONDS} seconds")
+        if format not in ("collapsed", "json"):
+            raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+        
+        # Optional comma-separated thread name prefixes, e.g. "MainThread,transfer"
+        prefixes = tuple(prefix.strip() for prefix in threads.split(",") if prefix.strip()) if threads else None
+        session = profiler.start_session(
+            f"admin:{datetime.utcnow().isoformat()}",
+            duration,
+            thread_filter=(lambda ident, name: name.startswith(prefixes)) if prefixes else None,
+            include_idle=include_idle
+        )
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.stop_session(session)
+        
+        if format == "json":
+            return {
+                "duration": round(session.elapsed, 3),
+                "samples": session.samples,
+                "interval": profiler.interval,
+                "top_functions": session.top_functions(),
+                "collapsed": session.collapsed()
+            }
+        filename = f"profile-{NODE_ID}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.collapsed"
+        return PlainTextResponse(
+            session.collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Profiling error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to profile process")
+
+@api_router.get("/admin/profile/{download_id}", dependencies=[Depends(require_admin)])
+async def get_job_profile(download_id: str):
+    """Collapsed stacks recorded for a download started with profile=true"""
+    try:
+        download_record = await video_repository.get_download_by_id(download_id)
+        if not download_record:
+            raise HTTPException(status_code=404, detail="Download not found")
+        if not download_record.profile_path or not os.path.exists(download_record.profile_path):
+            raise HTTPException(status_code=404, detail="No profile recorded for this download")
+        
+        return FileResponse(
+            download_record.profile_path,
+            media_type="text/plain",
+            filename=f"{download_id}.collapsed"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Job profile error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get job profile")
+
+@api_router.get("/admin/event-loop", dependencies=[Depends(require_admin)])
+async def get_event_loop_blocking(limit: int = 20):
+    """Code that blocked the event loop past the threshold, worst first, with stacks"""
+    return {
+        **loop_watchdog.stats(),
+        "offenders": loop_watchdog.worst_offenders(max(1, min(limit, 100)))
+    }
+
+@api_router.get("/system/bandwidth")
+async def get_bandwidth_state():
+    """Bandwidth ceilings and the current per-job shares"""
+    return {
+        "node_id": NODE_ID,
+        "cluster_limit": BANDWIDTH_CLUSTER_LIMIT or None,
+        **video_downloader.bandwidth.snapshot()
+    }
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -403,8 +1470,44 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+@app.on_event("startup")
+async def start_download_queue():
+    download_queue.start(process_download)
+    postprocessing_stage.start(finish_postprocessing)
+    # Build one extraction instance per platform off the event loop
+    asyncio.get_running_loop().run_in_executor(
+        video_downloader.extraction_executor, video_downloader.extraction_pool.warm, [platform.value for platform in PlatformType]
+    )
+    try:
+        await archive_repository.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create download archive indexes: {str(e)}")
+    spawn_background(run_subscription_scheduler())
+    spawn_background(run_checkpoint_writer())
+    spawn_background(loop_watchdog.run())
+    if BANDWIDTH_CLUSTER_LIMIT > 0:
+        spawn_background(run_bandwidth_coordinator())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await download_queue.stop()
+    # Like the queue's own jobs, streaming ones stop here and are recovered on restart
+    for job in list(streaming_downloads):
+        job.cancel()
+    await asyncio.gather(*streaming_downloads, return_exceptions=True)
+    await postprocessing_stage.stop()
+    video_downloader.extraction_pool.close()
+    video_downloader.shutdown_executors()
+    tracer.flush()
+    await video_downloader.async_transfer.aclose()
+    if video_downloader.process_runner:
+        video_downloader.process_runner.stop()
+    if BANDWIDTH_CLUSTER_LIMIT > 0:
+        try:
+            await node_repository.remove_node(NODE_ID)
+        except Exception as e:
+            logger.error(f"Failed to remove node heartbeat: {str(e)}")
     client.close()
\ No newline at end of file
@@ -0,0 +1,225 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class JobTuning:
+    """Current transfer settings and throughput history for one download"""
+    job_id: str
+    platform: str
+    concurrency: int
+    chunk_size: int
+    throughput: float = 0.0  # bytes/s over the last full window
+    best_throughput: float = 0.0
+    last_decision: str = "start"
+    decisions: int = 0
+    _window_started_at: float = field(default=0.0, repr=False)
+    _window_bytes: int = field(default=0, repr=False)
+    _last_bytes: int = field(default=0, repr=False)
+    _probing: bool = field(default=True, repr=False)  # last change was an increase
+    _holds: int = field(default=0, repr=False)  # consecutive windows without a change
+
+class AdaptiveTuningController:
+    """AIMD control of per-job parallelism and chunk size under a global connection budget.
+
+    Each job starts from the settings last learned for its platform. Every window the
+    measured throughput decides the next step: additive increase while throughput keeps
+    improving, hold on a plateau, multiplicative decrease on a sharp drop or a throttling
+    signal (429/503) from the CDN.
+    """
+
+    def __init__(
+        self,
+        connection_budget: int = 64,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        initial_chunk_size: int = 10 * 1024 * 1024,
+        min_chunk_size: int = 1024 * 1024,
+        max_chunk_size: int = 32 * 1024 * 1024,
+        chunk_step: int = 2 * 1024 * 1024,
+        window_seconds: float = 2.0,
+        gain_threshold: float = 0.05,
+        drop_threshold: float = 0.30,
+        decrease_factor: float = 0.5,
+        probe_after_holds: int = 5
+    ):
+        self.connection_budget = connection_budget
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.initial_chunk_size = initial_chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.chunk_step = chunk_step
+        self.window_seconds = window_seconds
+        self.gain_threshold = gain_threshold
+        self.drop_threshold = drop_threshold
+        self.decrease_factor = decrease_factor
+        self.probe_after_holds = probe_after_holds
+
+        self.jobs: Dict[str, JobTuning] = {}
+        self.platform_settings: Dict[str, Dict[str, int]] = {}
+        self.decision_counts: Dict[str, int] = {"increase": 0, "hold": 0, "decrease": 0, "throttle": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def connections_in_use(self) -> int:
+        return sum(job.concurrency for job in self.jobs.values())
+
+    def start_job(self, job_id: str, platform: str, now: Optional[float] = None) -> JobTuning:
+        """Register a job and hand out its starting settings"""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            learned = self.platform_settings.get(platform, {})
+            available = self.connection_budget - self.connections_in_use
+            concurrency = learned.get("concurrency", self.initial_concurrency)
+            # Every job gets at least one connection, even when the budget is spent
+            concurrency = max(self.min_concurrency, min(concurrency, available))
+
+            job = JobTuning(
+                job_id=job_id,
+                platform=platform,
+                concurrency=concurrency,
+                chunk_size=learned.get("chunk_size", self.initial_chunk_size),
+                _window_started_at=now
+            )
+            self.jobs[job_id] = job
+            return job
+
+    def get_job(self, job_id: str) -> Optional[JobTuning]:
+        return self.jobs.get(job_id)
+
+    def get_concurrency(self, job_id: str) -> int:
+        job = self.jobs.get(job_id)
+        return job.concurrency if job else self.initial_concurrency
+
+    def record_progress(self, job_id: str, downloaded_bytes: int, now: Optional[float] = None) -> bool:
+        """Feed a cumulative byte count; returns True when the job's settings changed"""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return False
+
+            delta = downloaded_bytes - job._last_bytes
+            job._last_bytes = downloaded_bytes
+            if delta < 0:
+                # A new file started (e.g. audio after video); restart the window
+                job._window_started_at = now
+                job._window_bytes = 0
+                return False
+
+            job._window_bytes += delta
+            elapsed = now - job._window_started_at
+            if elapsed < self.window_seconds:
+                return False
+
+            throughput = job._window_bytes / elapsed
+            job._window_started_at = now
+            job._window_bytes = 0
+            return self._decide(job, throughput)
+
+    def record_throttle(self, job_id: str) -> bool:
+        """The CDN pushed back (429/503): back off immediately"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                return False
+            self._decrease(job, "throttle")
+            return True
+
+    def finish_job(self, job_id: str):
+        """Release the job's connections and remember what worked for its platform"""
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+            if not job or job.decisions == 0:
+                return
+            learned = self.platform_settings.setdefault(job.platform, {
+                "concurrency": job.concurrency,
+                "chunk_size": job.chunk_size
+            })
+            # Smooth across jobs so a single outlier does not swing the next start
+            learned["concurrency"] = max(
+                self.min_concurrency, round((learned["concurrency"] + job.concurrency) / 2)
+            )
+            learned["chunk_size"] = (learned["chunk_size"] + job.chunk_size) // 2
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current decisions and settings, for metrics and debugging"""
+        with self._lock:
+            return {
+                "connection_budget": self.connection_budget,
+                "connections_in_use": self.connections_in_use,
+                "decisions": dict(self.decision_counts),
+                "platform_settings": {key: dict(value) for key, value in self.platform_settings.items()},
+                "jobs": [
+                    {
+                        key: value for key, value in asdict(job).items()
+                        if not key.startswith("_")
+                    }
+                    for job in self.jobs.values()
+                ]
+            }
+
+    def _decide(self, job: JobTuning, throughput: float) -> bool:
+        """One AIMD step; caller holds the lock"""
+        previous = job.throughput
+        job.throughput = throughput
+        job.best_throughput = max(job.best_throughput, throughput)
+
+        if previous and throughput < previous * (1 - self.drop_threshold):
+            self._decrease(job, "decrease")
+            return True
+
+        improved = not previous or throughput > previous * (1 + self.gain_threshold)
+        if improved and job._probing:
+            return self._increase(job)
+
+        if not improved and job._probing:
+            # The last step up did not pay off: stay here
+            job._probing = False
+            self._record(job, "hold")
+            return False
+
+        # On a plateau, occasionally probe upward again in case conditions improved
+        if job._holds >= self.probe_after_holds:
+            return self._increase(job)
+        self._record(job, "hold")
+        return False
+
+    def _increase(self, job: JobTuning) -> bool:
+        """Additive increase: one more connection if the budget allows, otherwise bigger chunks"""
+        spare = self.connection_budget - self.connections_in_use
+        if job.concurrency < self.max_concurrency and spare > 0:
+            job.concurrency += 1
+        elif job.chunk_size < self.max_chunk_size:
+            job.chunk_size = min(self.max_chunk_size, job.chunk_size + self.chunk_step)
+        else:
+            self._record(job, "hold")
+            return False
+        job._probing = True
+        self._record(job, "increase")
+        return True
+
+    def _decrease(self, job: JobTuning, decision: str):
+        """Multiplicative decrease of both knobs"""
+        job.concurrency = max(self.min_concurrency, int(job.concurrency * self.decrease_factor))
+        job.chunk_size = max(self.min_chunk_size, int(job.chunk_size * self.decrease_factor))
+        job._probing = False
+        self._record(job, decision)
+
+    def _record(self, job: JobTuning, decision: str):
+        job.last_decision = decision
+        job.decisions += 1
+        job._holds = job._holds + 1 if decision == "hold" else 0
+        self.decision_counts[decision] = self.decision_counts.get(decision, 0) + 1
+        if decision != "hold":
+            logger.debug(
+                f"Tuning {job.job_id}: {decision} -> {job.concurrency} connections, "
+                f"{job.chunk_size // (1024 * 1024)} MB chunks"
+            )
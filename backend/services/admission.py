@@ -0,0 +1,108 @@
+import math
+import shutil
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from services.download_queue import DownloadQueue
+
+logger = logging.getLogger(__name__)
+
+# How long a client is told to wait when the disk is too full to take more work;
+# space only comes back as files are cleaned up, so there is no drain to estimate
+DISK_RETRY_AFTER = 300
+
+@dataclass
+class AdmissionDecision:
+    admitted: bool
+    deferred: bool = False
+    estimated_wait: float = 0.0  # seconds until the last admitted job should start
+    retry_after: Optional[int] = None  # seconds the client should wait when rejected
+    reason: Optional[str] = None
+
+class AdmissionController:
+    """Decides whether new downloads are taken on, before they are queued.
+
+    Work is rejected, with a Retry-After computed from the drain rate, when the
+    queue is deeper than ``max_queue_depth``, would take longer than
+    ``max_drain_seconds`` to drain, or the download disk is nearly full. Work that
+    fits but will not start for ``defer_after_seconds`` is accepted as deferred,
+    with an estimated start. A threshold of 0 disables that check.
+    """
+
+    def __init__(
+        self,
+        queue: DownloadQueue,
+        max_queue_depth: int = 0,
+        max_drain_seconds: float = 0,
+        defer_after_seconds: float = 0,
+        min_free_disk_bytes: int = 0,
+        disk_path: str = "downloads"
+    ):
+        self.queue = queue
+        self.max_queue_depth = max_queue_depth
+        self.max_drain_seconds = max_drain_seconds
+        self.defer_after_seconds = defer_after_seconds
+        self.min_free_disk_bytes = min_free_disk_bytes
+        self.disk_path = Path(disk_path)
+        self.admitted_count = 0
+        self.deferred_count = 0
+        self.rejected: Dict[str, int] = {}
+
+    def free_disk_bytes(self) -> Optional[int]:
+        try:
+            return shutil.disk_usage(self.disk_path).free
+        except OSError as e:
+            logger.warning(f"Could not read free space of {self.disk_path}: {str(e)}")
+            return None
+
+    def check(self, key: str, count: int = 1) -> AdmissionDecision:
+        """Admit, defer or reject count new downloads for the flow key"""
+        decision = self._decide(key, count)
+        if not decision.admitted:
+            self.rejected[decision.reason] = self.rejected.get(decision.reason, 0) + 1
+        elif decision.deferred:
+            self.deferred_count += 1
+        else:
+            self.admitted_count += 1
+        return decision
+
+    def _decide(self, key: str, count: int) -> AdmissionDecision:
+        if self.min_free_disk_bytes:
+            free = self.free_disk_bytes()
+            if free is not None and free < self.min_free_disk_bytes:
+                return AdmissionDecision(False, retry_after=DISK_RETRY_AFTER, reason="disk_full")
+
+        per_job = self.queue.mean_service_time() / self.queue.max_workers
+        depth = self.queue.depth
+        if self.max_queue_depth and depth + count > self.max_queue_depth:
+            # Long enough for the queue to work its way back under the limit
+            excess = depth + count - self.max_queue_depth
+            return AdmissionDecision(False, retry_after=_seconds(excess * per_job), reason="queue_full")
+
+        drain = self.queue.drain_time(count)
+        if self.max_drain_seconds and drain > self.max_drain_seconds:
+            return AdmissionDecision(
+                False, retry_after=_seconds(drain - self.max_drain_seconds), reason="backlog_too_long"
+            )
+
+        wait = self.queue.estimate_wait(key, count)
+        deferred = bool(self.defer_after_seconds) and wait > self.defer_after_seconds
+        return AdmissionDecision(True, deferred=deferred, estimated_wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted_count,
+            "deferred": self.deferred_count,
+            "rejected": dict(self.rejected),
+            "max_queue_depth": self.max_queue_depth or None,
+            "max_drain_seconds": self.max_drain_seconds or None,
+            "defer_after_seconds": self.defer_after_seconds or None,
+            "min_free_disk_bytes": self.min_free_disk_bytes or None,
+            "free_disk_bytes": self.free_disk_bytes()
+        }
+
+def _seconds(value: float) -> int:
+    """Whole seconds for a Retry-After header, never less than one"""
+    return max(1, math.ceil(value))
@@ -0,0 +1,377 @@
+import os
+import asyncio
+import logging
+import httpx
+import aiofiles
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any
+
+from services.bandwidth_manager import AsyncTokenBucket
+from services.segmented_downloader import (
+    Segment,
+    SegmentedDownloader,
+    SegmentedDownloadError,
+    SegmentedDownloadCancelled,
+    RangeNotSupported,
+    ProgressCallback,
+    _Checkpointer,
+    _ProgressTracker,
+    segment_retry_delay
+)
+from services.retry_policy import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+class AsyncTransferEngine:
+    """Streams resolved media URLs on the event loop instead of a thread per job.
+
+    All transfers share one pooled httpx client. At most max_transfers run at once;
+    later ones wait for a slot. Each connection holds at most one chunk in memory and
+    writes it with aiofiles before reading the next, so memory stays bounded however
+    many transfers run. Part files and checkpoints use the
+    SegmentedDownloader layout (``<dest>.part``, ``<dest>.part.json``), so a job can
+    resume under either engine.
+    """
+
+    def __init__(
+        self,
+        planner: SegmentedDownloader,
+        max_connections: int = 1000,
+        max_keepalive_connections: int = 200,
+        max_transfers: int = 1000,
+        chunk_size: int = 256 * 1024,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+        file_executor: Optional[Executor] = None
+    ):
+        self.planner = planner
+        # Threads aiofiles uses for writes; None means the loop's default executor
+        self.file_executor = file_executor
+        self.max_connections = max(1, max_connections)
+        self.max_keepalive_connections = max_keepalive_connections
+        self.max_transfers = max(1, max_transfers)
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active_transfers = 0
+        self.waiting_transfers = 0
+        self.active_connections = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self.bytes_transferred = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """The shared client, recreated if the event loop it was bound to has changed.
+        
+        A client cannot be closed from another loop, so callers that run transfers on
+        short-lived loops call aclose() before each loop ends.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            if self._client is not None:
+                logger.warning("Transfer client of a previous event loop was not closed; its connections leak")
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections
+                ),
+                # Transfers beyond the connection limit wait for a connection rather than fail
+                timeout=httpx.Timeout(self.timeout, pool=None),
+                follow_redirects=True
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Transfer slots, bound to the running event loop like the client"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_transfers)
+            self._slots_loop = loop
+        return self._slots
+
+    @asynccontextmanager
+    async def _transfer_slot(self):
+        """Hold one of the max_transfers slots, counting the transfers waiting for one"""
+        slots = self._get_slots()
+        self.waiting_transfers += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting_transfers -= 1
+        try:
+            yield
+        finally:
+            slots.release()
+
+    async def aclose(self):
+        """Close the pooled client and its connections"""
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "max_transfers": self.max_transfers,
+            "active_transfers": self.active_transfers,
+            "waiting_transfers": self.waiting_transfers,
+            "active_connections": self.active_connections,
+            "completed": self.completed_count,
+            "failed": self.failed_count,
+            "bytes_transferred": self.bytes_transferred
+        }
+
+    async def probe(self, url: str, headers: Optional[Dict[str, str]] = None):
+        """Return (total size, supports ranges) using a one-byte range request"""
+        request_headers = {**(headers or {}), "Range": "bytes=0-0"}
+        async with self._get_client().stream("GET", url, headers=request_headers) as response:
+            if response.status_code >= 400:
+                raise SegmentedDownloadError(
+                    f"HTTP {response.status_code} probing {url}",
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+            if response.status_code == 206:
+                total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                return (int(total) if total.isdigit() else None), True
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), False
+
+    async def download(
+        self,
+        url: str,
+        dest_path: str,
+        headers: Optional[Dict[str, str]] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        connection_limit: Optional[Callable[[], int]] = None,
+        on_throttle: Optional[Callable[[], None]] = None,
+        rate_limit: Optional[Callable[[], Optional[float]]] = None
+    ) -> Path:
+        """Download url to dest_path; same contract as SegmentedDownloader.download"""
+        async with self._transfer_slot():
+            dest = Path(dest_path)
+            part_path = dest.with_name(dest.name + ".part")
+            state_path = dest.with_name(dest.name + ".part.json")
+            bucket = AsyncTokenBucket(rate_limit) if rate_limit else None
+
+            self.active_transfers += 1
+            try:
+                total_size, supports_ranges = await self.probe(url, headers)
+                if total_size and supports_ranges:
+                    segments = await self._run_file_io(self.planner._load_or_plan_segments, state_path, part_path, total_size)
+                    await self._run_file_io(self.planner._preallocate, part_path, total_size)
+                    try:
+                        await self._download_segments(
+                            url, part_path, state_path, segments, total_size, headers,
+                            progress_callback, should_cancel, connection_limit, on_throttle, bucket
+                        )
+                    except RangeNotSupported:
+                        logger.info(f"Range requests rejected for {dest.name}, streaming it in one piece")
+                        state_path.unlink(missing_ok=True)
+                        await self._download_single(url, part_path, headers, total_size, progress_callback, should_cancel, bucket)
+                else:
+                    await self._download_single(url, part_path, headers, total_size, progress_callback, should_cancel, bucket)
+            except BaseException:
+                self.failed_count += 1
+                raise
+            finally:
+                self.active_transfers -= 1
+
+            await self._run_file_io(os.replace, part_path, dest)
+            state_path.unlink(missing_ok=True)
+            self.completed_count += 1
+            return dest
+
+    async def _run_file_io(self, fn: Callable, *args):
+        """Blocking filesystem work (planning, preallocation) off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self.file_executor, fn, *args)
+
+    async def _download_segments(
+        self,
+        url: str,
+        part_path: Path,
+        state_path: Path,
+        segments: List[Segment],
+        total_size: int,
+        headers: Optional[Dict[str, str]],
+        progress_callback: Optional[ProgressCallback],
+        should_cancel: Optional[Callable[[], bool]],
+        connection_limit: Optional[Callable[[], int]],
+        on_throttle: Optional[Callable[[], None]],
+        bucket: Optional[AsyncTokenBucket]
+    ):
+        """Fetch all unfinished segments with up to connection_limit() worker tasks"""
+        tracker = _ProgressTracker(total_size, sum(s.written for s in segments), progress_callback)
+        checkpointer = _AsyncCheckpointer(
+            _Checkpointer(state_path, total_size, segments, self.planner.checkpoint_interval), self._run_file_io
+        )
+        pending = [segment for segment in segments if not segment.done]
+        max_workers = min(self.planner.connections, len(pending)) or 1
+
+        def capacity() -> int:
+            return max(1, min(self.planner.connections, connection_limit() if connection_limit else self.planner.connections))
+
+        async def worker(index: int):
+            while pending:
+                # Workers above the live limit park until it rises again
+                if index >= capacity():
+                    await asyncio.sleep(0.2)
+                    continue
+                segment = pending.pop(0)
+                await self._fetch_segment_with_retries(
+                    url, part_path, segment, headers, tracker, should_cancel, on_throttle, bucket, checkpointer
+                )
+                await checkpointer.save()
+
+        tasks = [asyncio.ensure_future(worker(index)) for index in range(max_workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Keep whatever landed so the next attempt resumes from it
+            await checkpointer.save()
+            raise
+
+        tracker.report(force=True)
+
+    async def _fetch_segment_with_retries(
+        self,
+        url: str,
+        part_path: Path,
+        segment: Segment,
+        headers: Optional[Dict[str, str]],
+        tracker: _ProgressTracker,
+        should_cancel: Optional[Callable[[], bool]],
+        on_throttle: Optional[Callable[[], None]],
+        bucket: Optional[AsyncTokenBucket],
+        checkpointer: "_AsyncCheckpointer"
+    ):
+        """Fetch one segment, retrying only that segment on failure"""
+        attempt = 0
+        while True:
+            try:
+                await self._fetch_segment(url, part_path, segment, headers, tracker, should_cancel, bucket, checkpointer)
+                return
+            except (SegmentedDownloadCancelled, RangeNotSupported):
+                raise
+            except (httpx.HTTPError, SegmentedDownloadError) as e:
+                delay = segment_retry_delay(e, attempt, self.max_retries, on_throttle)
+                attempt += 1
+                logger.warning(f"Retrying segment {segment.index} in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+
+    async def _fetch_segment(
+        self,
+        url: str,
+        part_path: Path,
+        segment: Segment,
+        headers: Optional[Dict[str, str]],
+        tracker: _ProgressTracker,
+        should_cancel: Optional[Callable[[], bool]],
+        bucket: Optional[AsyncTokenBucket],
+        checkpointer: "_AsyncCheckpointer"
+    ):
+        """Stream the remaining bytes of a segment into its offset of the part file"""
+        start = segment.start + segment.written
+        request_headers = {**(headers or {}), "Range": f"bytes={start}-{segment.end}"}
+        self.active_connections += 1
+        try:
+            async with self._get_client().stream("GET", url, headers=request_headers) as response:
+                if response.status_code == 200:
+                    raise RangeNotSupported("Server ignored the range request")
+                if response.status_code != 206:
+                    raise SegmentedDownloadError(
+                        f"HTTP {response.status_code} for segment {segment.index}",
+                        status_code=response.status_code,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                    )
+
+                # Unbuffered, so every byte counted in a checkpoint has reached the OS
+                async with aiofiles.open(part_path, "r+b", buffering=0, executor=self.file_executor) as f:
+                    await f.seek(start)
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        if should_cancel and should_cancel():
+                            raise SegmentedDownloadCancelled("Download cancelled")
+                        chunk = chunk[:segment.size - segment.written]
+                        if bucket:
+                            await bucket.take(len(chunk))
+                        await f.write(chunk)
+                        segment.written += len(chunk)
+                        self.bytes_transferred += len(chunk)
+                        tracker.add(len(chunk))
+                        await checkpointer.maybe_save()
+                        if segment.done:
+                            break
+        finally:
+            self.active_connections -= 1
+
+        if not segment.done:
+            raise SegmentedDownloadError(
+                f"Segment {segment.index} ended early at {segment.written}/{segment.size} bytes"
+            )
+
+    async def _download_single(
+        self,
+        url: str,
+        part_path: Path,
+        headers: Optional[Dict[str, str]],
+        total_size: Optional[int],
+        progress_callback: Optional[ProgressCallback],
+        should_cancel: Optional[Callable[[], bool]],
+        bucket: Optional[AsyncTokenBucket]
+    ):
+        """Plain streaming download for servers without range support"""
+        tracker = _ProgressTracker(total_size or 0, 0, progress_callback)
+        self.active_connections += 1
+        try:
+            async with self._get_client().stream("GET", url, headers=headers or {}) as response:
+                if response.status_code >= 400:
+                    raise SegmentedDownloadError(
+                        f"HTTP {response.status_code} for {url}",
+                        status_code=response.status_code,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                async with aiofiles.open(part_path, "wb", executor=self.file_executor) as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        if should_cancel and should_cancel():
+                            raise SegmentedDownloadCancelled("Download cancelled")
+                        if bucket:
+                            await bucket.take(len(chunk))
+                        await f.write(chunk)
+                        self.bytes_transferred += len(chunk)
+                        tracker.add(len(chunk))
+        finally:
+            self.active_connections -= 1
+        tracker.report(force=True)
+
+class _AsyncCheckpointer:
+    """Checkpoints for transfers on the event loop: segment progress is copied on the
+    loop and written by the file executor, so saving never blocks the loop. A snapshot
+    written late only understates progress, which a resume tolerates."""
+
+    def __init__(self, checkpointer: _Checkpointer, run_file_io: Callable):
+        self.checkpointer = checkpointer
+        self.run_file_io = run_file_io
+        self._saving = False
+
+    async def maybe_save(self):
+        # Periodic saves are skipped while one is still being written
+        if self.checkpointer.due and not self._saving:
+            await self.save()
+
+    async def save(self):
+        self._saving = True
+        try:
+            await self.run_file_io(self.checkpointer.save, self.checkpointer.snapshot())
+        finally:
+            self._saving = False
@@ -0,0 +1,255 @@
+import asyncio
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+RateListener = Callable[[str, Optional[float]], None]
+
+@dataclass
+class BandwidthShare:
+    """One running job's claim on the shared link"""
+    job_id: str
+    user_id: str
+    platform: str
+    weight: float
+    rate: Optional[float] = None  # bytes/s, None means unlimited
+
+def water_fill(capacity: float, claims: Dict[str, Tuple[float, Optional[float]]]) -> Dict[str, float]:
+    """Weighted max-min fair split of capacity across {key: (weight, ceiling)}.
+
+    Claims whose fair share exceeds their ceiling are pinned at the ceiling and the
+    rest is re-split between the others, so no capacity is left idle while a claim
+    could still use it. Infinite capacity yields ceilings (or inf) for every claim.
+    """
+    allocation: Dict[str, float] = {}
+    remaining = dict(claims)
+    while remaining:
+        total_weight = sum(weight for weight, _ in remaining.values())
+        per_weight = capacity / total_weight
+        capped = [
+            key for key, (weight, ceiling) in remaining.items()
+            if ceiling is not None and ceiling <= weight * per_weight
+        ]
+        if not capped:
+            for key, (weight, _) in remaining.items():
+                allocation[key] = weight * per_weight
+            break
+        for key in capped:
+            allocation[key] = remaining.pop(key)[1]
+            capacity -= allocation[key]
+        capacity = max(capacity, 0.0)
+    return allocation
+
+class BandwidthManager:
+    """Hands out bytes-per-second shares of a global ceiling to running downloads.
+
+    Capacity is split fairly between users first (optionally weighted), then between
+    each user's jobs weighted by platform, subject to per-user and per-job ceilings.
+    Shares are recomputed whenever a job starts or finishes or the capacity changes,
+    and listeners are told about every job whose rate moved.
+    """
+
+    def __init__(
+        self,
+        total_rate: Optional[float] = None,
+        user_ceiling: Optional[float] = None,
+        job_ceiling: Optional[float] = None,
+        min_rate: float = 64 * 1024,
+        platform_weights: Optional[Dict[str, float]] = None,
+        user_weights: Optional[Dict[str, float]] = None
+    ):
+        self.total_rate = total_rate
+        self.user_ceiling = user_ceiling
+        self.job_ceiling = job_ceiling
+        self.min_rate = min_rate
+        self.platform_weights = platform_weights or {}
+        self.user_weights = user_weights or {}
+
+        self.jobs: Dict[str, BandwidthShare] = {}
+        self.rebalance_count = 0
+        self._listeners: List[RateListener] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit is not None for limit in (self.total_rate, self.user_ceiling, self.job_ceiling))
+
+    @property
+    def demand_weight(self) -> float:
+        """Sum of active user weights; what this node asks for in cluster mode"""
+        with self._lock:
+            users = {share.user_id for share in self.jobs.values()}
+            return sum(self.user_weights.get(user_id, 1.0) for user_id in users)
+
+    def add_listener(self, listener: RateListener):
+        self._listeners.append(listener)
+
+    def register_job(self, job_id: str, user_id: Optional[str], platform: str) -> Optional[float]:
+        """Admit a job to the shared link and return its starting rate"""
+        with self._lock:
+            self.jobs[job_id] = BandwidthShare(
+                job_id=job_id,
+                user_id=user_id or "anonymous",
+                platform=platform,
+                weight=self.platform_weights.get(platform, 1.0)
+            )
+            changed = self._rebalance()
+            rate = self.jobs[job_id].rate
+        self._notify(changed, skip=job_id)
+        return rate
+
+    def unregister_job(self, job_id: str):
+        """Give a finished job's share back to the others"""
+        with self._lock:
+            if self.jobs.pop(job_id, None) is None:
+                return
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def set_total_rate(self, total_rate: Optional[float]):
+        """Change the node-wide ceiling, e.g. after a cluster re-split"""
+        with self._lock:
+            if total_rate == self.total_rate:
+                return
+            self.total_rate = total_rate
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def get_rate(self, job_id: str) -> Optional[float]:
+        share = self.jobs.get(job_id)
+        return share.rate if share else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current ceilings and per-job shares, for metrics and debugging"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "total_rate": self.total_rate,
+                "user_ceiling": self.user_ceiling,
+                "job_ceiling": self.job_ceiling,
+                "allocated_rate": sum(share.rate or 0 for share in self.jobs.values()),
+                "rebalances": self.rebalance_count,
+                "jobs": [share.__dict__.copy() for share in self.jobs.values()]
+            }
+
+    def _rebalance(self) -> List[Tuple[str, Optional[float]]]:
+        """Recompute every share; caller holds the lock. Returns jobs whose rate changed"""
+        self.rebalance_count += 1
+        if not self.jobs:
+            return []
+
+        by_user: Dict[str, List[BandwidthShare]] = {}
+        for share in self.jobs.values():
+            by_user.setdefault(share.user_id, []).append(share)
+
+        # A user can never use more than the sum of their jobs' ceilings, so cap them
+        # there too and let the surplus flow to other users
+        user_claims = {}
+        for user_id, shares in by_user.items():
+            ceiling = self.user_ceiling
+            if self.job_ceiling is not None:
+                jobs_ceiling = self.job_ceiling * len(shares)
+                ceiling = jobs_ceiling if ceiling is None else min(ceiling, jobs_ceiling)
+            user_claims[user_id] = (self.user_weights.get(user_id, 1.0), ceiling)
+
+        capacity = float(self.total_rate) if self.total_rate is not None else float("inf")
+        user_rates = water_fill(capacity, user_claims)
+
+        changed = []
+        for user_id, shares in by_user.items():
+            job_rates = water_fill(
+                user_rates[user_id],
+                {share.job_id: (share.weight, self.job_ceiling) for share in shares}
+            )
+            for share in shares:
+                rate = job_rates[share.job_id]
+                rate = None if rate == float("inf") else max(self.min_rate, rate)
+                if rate != share.rate:
+                    share.rate = rate
+                    changed.append((share.job_id, rate))
+        return changed
+
+    def _notify(self, changed: List[Tuple[str, Optional[float]]], skip: Optional[str] = None):
+        for job_id, rate in changed:
+            if job_id == skip:
+                continue
+            for listener in self._listeners:
+                try:
+                    listener(job_id, rate)
+                except Exception as e:
+                    logger.warning(f"Bandwidth listener failed for {job_id}: {str(e)}")
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate is re-read on every take, so it can change live"""
+
+    def __init__(self, rate: Callable[[], Optional[float]], burst_seconds: float = 0.5):
+        self.rate = rate
+        self.burst_seconds = burst_seconds
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, count: int):
+        """Block until count bytes may be sent under the current rate"""
+        while True:
+            rate = self.rate()
+            with self.lock:
+                now = time.monotonic()
+                if not rate:
+                    self.tokens = 0.0
+                    self.updated_at = now
+                    return
+                self.tokens = min(rate * self.burst_seconds, self.tokens + (now - self.updated_at) * rate)
+                self.updated_at = now
+                # Large chunks may exceed the burst; let them through and run into debt
+                if self.tokens >= min(count, rate * self.burst_seconds):
+                    self.tokens -= count
+                    return
+                wait = (min(count, rate * self.burst_seconds) - self.tokens) / rate
+            time.sleep(min(wait, 0.5))
+
+class AsyncTokenBucket:
+    """TokenBucket for coroutines: waits with asyncio.sleep instead of blocking a thread"""
+
+    def __init__(self, rate: Callable[[], Optional[float]], burst_seconds: float = 0.5):
+        self.rate = rate
+        self.burst_seconds = burst_seconds
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+
+    async def take(self, count: int):
+        """Wait until count bytes may be sent under the current rate"""
+        while True:
+            rate = self.rate()
+            now = time.monotonic()
+            if not rate:
+                self.tokens = 0.0
+                self.updated_at = now
+                return
+            self.tokens = min(rate * self.burst_seconds, self.tokens + (now - self.updated_at) * rate)
+            self.updated_at = now
+            if self.tokens >= min(count, rate * self.burst_seconds):
+                self.tokens -= count
+                return
+            wait = (min(count, rate * self.burst_seconds) - self.tokens) / rate
+            await asyncio.sleep(min(wait, 0.5))
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse 'youtube=2,tiktok=0.5' into a weight map"""
+    weights = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        key, value = item.split('=', 1)
+        try:
+            weight = float(value)
+        except ValueError:
+            logger.warning(f"Ignoring invalid bandwidth weight: {item}")
+            continue
+        if weight > 0:
+            weights[key.strip()] = weight
+    return weights
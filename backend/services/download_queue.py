@@ -0,0 +1,323 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Any
+
+from models.video import DownloadStatus, VideoDownload
+from services.metrics import QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DownloadProcessor = Callable[[VideoDownload], Awaitable[None]]
+DoneCallback = Callable[[VideoDownload], None]
+
+# Queue-wait samples kept per user, and number of users whose samples are kept
+WAIT_SAMPLES_PER_USER = 500
+MAX_TRACKED_USERS = 1000
+# Recent job durations used to estimate how long the backlog takes to drain
+SERVICE_SAMPLES = 200
+
+# Seconds the job being processed waited for its worker, visible to the processor
+_queue_wait: ContextVar[float] = ContextVar("queue_wait", default=0.0)
+
+def current_queue_wait() -> float:
+    return _queue_wait.get()
+
+def flow_key(download: VideoDownload) -> str:
+    """Scheduling identity of a job: its user, else its batch, else one shared anonymous flow"""
+    return owner_key(download.user_id, download.batch_id)
+
+def owner_key(user_id: Optional[str], batch_id: Optional[str] = None) -> str:
+    if user_id:
+        return user_id
+    if batch_id:
+        return f"batch:{batch_id}"
+    return "anonymous"
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+@dataclass
+class _Flow:
+    items: Deque[Tuple[VideoDownload, Optional[DoneCallback], float]] = field(default_factory=deque)
+    deficit: float = 0.0
+    active: int = 0
+    served: int = 0
+    listed: bool = False
+
+class DownloadQueue:
+    """In-process download queue drained by a fixed number of workers.
+
+    Jobs are scheduled across users with deficit round robin: each pass gives a
+    user's flow ``weight`` jobs' worth of credit, so a user with 500 queued jobs
+    gets its share of the workers, not all of them. Users whose flow was empty
+    are served from a separate new-flows list ahead of the backlogged ones, so a
+    single interactive download starts almost at once even behind bulk batches.
+    A per-user concurrency cap bounds how many workers one user can hold.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        user_weights: Optional[Dict[str, float]] = None,
+        user_concurrency: Optional[int] = None,
+        user_concurrency_limits: Optional[Dict[str, int]] = None,
+        default_service_time: float = 60.0
+    ):
+        self.processor: Optional[DownloadProcessor] = None
+        self.max_workers = max(1, max_workers)
+        self.user_weights = user_weights or {}
+        self.user_concurrency = user_concurrency or None
+        self.user_concurrency_limits = user_concurrency_limits or {}
+        self._flows: Dict[str, _Flow] = {}
+        self._new_flows: Deque[str] = deque()
+        self._old_flows: Deque[str] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._waits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._service_times: Deque[float] = deque(maxlen=SERVICE_SAMPLES)
+        self.default_service_time = default_service_time
+        self._queued = 0
+        self.active_count = 0
+        self.processed_count = 0
+
+    def start(self, processor: DownloadProcessor):
+        """Spawn the worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self.processor = processor
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"download-worker-{index}")
+            for index in range(self.max_workers)
+        ]
+        logger.info(f"Download queue started with {self.max_workers} workers")
+
+    async def stop(self):
+        """Cancel all workers; queued items are dropped"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enqueue(self, download: VideoDownload, on_done: Optional[DoneCallback] = None):
+        """Queue a download for processing"""
+        if self._wakeup is None:
+            raise RuntimeError("Download queue is not running")
+        key = flow_key(download)
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow()
+        flow.items.append((download, on_done, time.monotonic()))
+        self._queued += 1
+        if not flow.listed:
+            # A user with nothing queued goes ahead of the backlogged users, with a
+            # round's worth of credit so the first job starts on the next free worker
+            flow.listed = True
+            flow.deficit = max(1.0, self.weight(key))
+            self._new_flows.append(key)
+        self._wakeup.set()
+
+    def cancel(self, download_id: str) -> Optional[VideoDownload]:
+        """Take a download that is still waiting off the queue and mark it cancelled"""
+        for key, flow in self._flows.items():
+            for entry in flow.items:
+                download, on_done, _ = entry
+                if download.download_id != download_id:
+                    continue
+                flow.items.remove(entry)
+                self._queued -= 1
+                if not flow.items and flow.listed:
+                    self._unlist(key, flow)
+                download.status = DownloadStatus.CANCELLED
+                self._finished(download, on_done)
+                self._forget_idle_flow(key)
+                return download
+        return None
+
+    @property
+    def depth(self) -> int:
+        """Number of downloads waiting for a worker"""
+        return self._queued
+
+    def weight(self, key: str) -> float:
+        return max(0.01, self.user_weights.get(key, 1.0))
+
+    def concurrency_limit(self, key: str) -> Optional[int]:
+        return self.user_concurrency_limits.get(key, self.user_concurrency)
+
+    def mean_service_time(self) -> float:
+        """Average seconds a worker spends on a job, from recent jobs"""
+        if not self._service_times:
+            return self.default_service_time
+        return sum(self._service_times) / len(self._service_times)
+
+    def drain_time(self, extra: int = 0) -> float:
+        """Estimated seconds until the queue, plus extra new jobs, has all been started"""
+        return (self._queued + extra) * self.mean_service_time() / self.max_workers
+
+    def estimate_wait(self, key: str, count: int = 1) -> float:
+        """Estimated seconds until the last of count new jobs for key gets a worker.
+
+        Deficit round robin gives each backlogged user a weighted share of the
+        workers, so a light user waits on their own backlog rather than everyone's.
+        """
+        service = self.mean_service_time()
+        ahead = self.active_count + self._queued + count - self.max_workers
+        if ahead <= 0:
+            return 0.0
+        overall = ahead * service / self.max_workers
+
+        flow = self._flows.get(key)
+        own = (len(flow.items) if flow else 0) + count
+        competing = set(self._new_flows) | set(self._old_flows) | {key}
+        total_weight = sum(self.weight(k) for k in competing)
+        fair_share = self.max_workers * self.weight(key) / total_weight
+        limit = self.concurrency_limit(key)
+        share = min(fair_share, limit) if limit else fair_share
+        own_estimate = own * service / share
+        if share < fair_share:
+            # The user's own concurrency cap is the bottleneck
+            return own_estimate
+        return min(overall, own_estimate)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue state, with queue-wait percentiles per user"""
+        users = {}
+        for key in set(self._flows) | set(self._waits):
+            flow = self._flows.get(key)
+            waits = list(self._waits.get(key, ()))
+            users[key] = {
+                "queued": len(flow.items) if flow else 0,
+                "active": flow.active if flow else 0,
+                "served": flow.served if flow else 0,
+                "weight": self.weight(key),
+                "wait_p50": percentile(waits, 0.5),
+                "wait_p95": percentile(waits, 0.95),
+                "wait_p99": percentile(waits, 0.99)
+            }
+        all_waits = [wait for waits in self._waits.values() for wait in waits]
+        return {
+            "workers": self.max_workers,
+            "active": self.active_count,
+            "queued": self.depth,
+            "processed": self.processed_count,
+            "mean_service_time": self.mean_service_time(),
+            "drain_time": self.drain_time(),
+            "wait_p50": percentile(all_waits, 0.5),
+            "wait_p95": percentile(all_waits, 0.95),
+            "wait_p99": percentile(all_waits, 0.99),
+            "users": users
+        }
+
+    def _at_cap(self, key: str, flow: _Flow) -> bool:
+        limit = self.concurrency_limit(key)
+        return limit is not None and flow.active >= limit
+
+    def _dispatch(self) -> Optional[Tuple[str, VideoDownload, Optional[DoneCallback], float]]:
+        """Pick the next job by deficit round robin, or None if nothing can run now"""
+        listed = list(self._new_flows) + list(self._old_flows)
+        # Enough visits for the lightest weight to earn a whole job's credit
+        lightest = min((self.weight(key) for key in listed), default=1.0)
+        budget = len(listed) * (int(1 / lightest) + 2)
+        while budget > 0 and (self._new_flows or self._old_flows):
+            budget -= 1
+            flows = self._new_flows if self._new_flows else self._old_flows
+            key = flows[0]
+            flow = self._flows[key]
+            if self._at_cap(key, flow):
+                # Stay in the rotation, but let other users have the worker
+                flows.popleft()
+                self._old_flows.append(key)
+                continue
+            if flow.deficit < 1:
+                # Out of credit: top up and go to the back of the backlogged users
+                flow.deficit += self.weight(key)
+                flows.popleft()
+                self._old_flows.append(key)
+                continue
+
+            download, on_done, enqueued_at = flow.items.popleft()
+            self._queued -= 1
+            if not flow.items:
+                flows.popleft()
+                flow.listed = False
+                flow.deficit = 0.0
+            if download.status == DownloadStatus.CANCELLED:
+                # Cancelled while it waited: drop it without using the flow's credit
+                self._finished(download, on_done)
+                self._forget_idle_flow(key)
+                budget += 1
+                continue
+            flow.deficit -= 1
+            return key, download, on_done, enqueued_at
+        return None
+
+    def _unlist(self, key: str, flow: _Flow):
+        for flows in (self._new_flows, self._old_flows):
+            if key in flows:
+                flows.remove(key)
+        flow.listed = False
+        flow.deficit = 0.0
+
+    @staticmethod
+    def _finished(download: VideoDownload, on_done: Optional[DoneCallback]):
+        if on_done:
+            try:
+                on_done(download)
+            except Exception as e:
+                logger.error(f"Download completion callback failed: {str(e)}")
+
+    def _record_wait(self, key: str, wait: float):
+        waits = self._waits.get(key)
+        if waits is None:
+            waits = self._waits[key] = deque(maxlen=WAIT_SAMPLES_PER_USER)
+            if len(self._waits) > MAX_TRACKED_USERS:
+                self._waits.popitem(last=False)
+        else:
+            self._waits.move_to_end(key)
+        waits.append(wait)
+
+    def _forget_idle_flow(self, key: str):
+        flow = self._flows.get(key)
+        if flow and not flow.items and not flow.active and not flow.listed:
+            del self._flows[key]
+
+    async def _worker(self, index: int):
+        """Pull downloads off the queue until cancelled"""
+        while True:
+            entry = self._dispatch()
+            if entry is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            key, download, on_done, enqueued_at = entry
+            flow = self._flows[key]
+            flow.active += 1
+            flow.served += 1
+            wait = time.monotonic() - enqueued_at
+            self._record_wait(key, wait)
+            QUEUE_WAIT_SECONDS.observe(wait)
+            _queue_wait.set(wait)
+            self.active_count += 1
+            started_at = time.monotonic()
+            try:
+                await self.processor(download)
+            except Exception as e:
+                logger.error(f"Download worker {index} failed on {download.download_id}: {str(e)}")
+            finally:
+                self._service_times.append(time.monotonic() - started_at)
+                self.active_count -= 1
+                self.processed_count += 1
+                flow.active -= 1
+                self._forget_idle_flow(key)
+                # A capped user may be able to run again
+                self._wakeup.set()
+                self._finished(download, on_done)
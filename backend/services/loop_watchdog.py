@@ -0,0 +1,135 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.metrics import LOOP_BLOCKED_SECONDS, LOOP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Frames under this directory are ours; the culprit of a block is the innermost of them
+BACKEND_ROOT = str(Path(__file__).resolve().parents[1])
+
+@dataclass
+class BlockingOffender:
+    culprit: str
+    stack: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seen: datetime = field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "culprit": self.culprit,
+            "count": self.count,
+            "total_seconds": round(self.total_seconds, 3),
+            "max_seconds": round(self.max_seconds, 3),
+            "last_seen": self.last_seen,
+            "stack": self.stack
+        }
+
+class LoopWatchdog:
+    """Measures event-loop scheduling lag and catches code that blocks the loop.
+
+    A heartbeat task on the loop wakes every ``interval`` seconds and records how
+    late it ran. A watcher thread checks the heartbeat; once the loop has been
+    silent for ``threshold`` seconds it captures the loop thread's stack, which is
+    the code blocking it. When the loop comes back the block is logged with that
+    stack and counted against its culprit, so the worst offenders can be listed.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, max_offenders: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_offenders = max_offenders
+        self.offenders: Dict[str, BlockingOffender] = {}
+        self.blocked_count = 0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    async def run(self):
+        """Heartbeat on the running loop; starts the watcher thread and runs until cancelled"""
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        watcher = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watcher.start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - expected)
+                self._beat = time.monotonic()
+                self.max_lag = max(self.max_lag, lag)
+                LOOP_LAG_SECONDS.observe(lag)
+        finally:
+            self._stop.set()
+
+    def _watch(self):
+        captured_beat = None
+        stack = culprit = None
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            if captured_beat is not None and beat != captured_beat:
+                # The loop is back: the block lasted from the last beat to this one,
+                # less the sleep the heartbeat asked for
+                self._record(max(0.0, beat - captured_beat - self.interval), culprit, stack)
+                captured_beat = None
+            if captured_beat is None and time.monotonic() - beat > self.interval + self.threshold:
+                captured_beat = beat
+                culprit, stack = self._capture()
+
+    def _capture(self):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return "unknown", ""
+        frames = traceback.extract_stack(frame)
+        ours = [entry for entry in frames if entry.filename.startswith(BACKEND_ROOT)]
+        innermost = (ours or frames)[-1]
+        culprit = f"{Path(innermost.filename).name}:{innermost.lineno} in {innermost.name}"
+        return culprit, "".join(traceback.format_list(frames))
+
+    def _record(self, seconds: float, culprit: str, stack: str):
+        LOOP_BLOCKED_SECONDS.observe(seconds)
+        logger.warning(f"Event loop blocked for {seconds:.3f}s by {culprit}:\n{stack}")
+        with self._lock:
+            self.blocked_count += 1
+            offender = self.offenders.get(culprit)
+            if offender is None:
+                if len(self.offenders) >= self.max_offenders:
+                    # Make room by dropping the mildest offender
+                    mildest = min(self.offenders.values(), key=lambda item: item.max_seconds)
+                    del self.offenders[mildest.culprit]
+                offender = self.offenders[culprit] = BlockingOffender(culprit, stack)
+            offender.count += 1
+            offender.total_seconds += seconds
+            offender.stack = stack
+            offender.last_seen = datetime.utcnow()
+            if seconds >= offender.max_seconds:
+                offender.max_seconds = seconds
+
+    def worst_offenders(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self.offenders.values(), key=lambda item: item.total_seconds, reverse=True)
+            return [offender.to_dict() for offender in ranked[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "interval": self.interval,
+            "running": self._loop_thread is not None and not self._stop.is_set(),
+            "seconds_since_heartbeat": round(time.monotonic() - self._beat, 3),
+            "max_lag": round(self.max_lag, 3),
+            "blocked_count": self.blocked_count
+        }
@@ -0,0 +1,273 @@
+import time
+import asyncio
+import bisect
+import logging
+import threading
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) shared by the pipeline histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+THROUGHPUT_BUCKETS = tuple(2 ** power * 1024 for power in range(4, 18, 2))  # 16 KiB/s .. 128 MiB/s
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+class _Metric:
+    """One metric family; children hold the values of each label combination"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **labels: str):
+        """The child for one label combination; keep it around on hot paths"""
+        key = tuple(str(value) for value in values) if values else tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _unlabelled(self):
+        return self.labels()
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(_format_sample(*sample) for sample in self.samples())
+        return lines
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = float(value)
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in list(self._children.items()):
+            yield f"{self.name}_total", dict(zip(self.labelnames, key)), child.value
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in list(self._children.items()):
+            yield self.name, dict(zip(self.labelnames, key)), child.value
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+class CallbackMetric(_Metric):
+    """A gauge or counter read from existing state at scrape time, so it costs nothing
+    until /metrics is requested. The callback returns a number, or a mapping of
+    label-value tuples to numbers."""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Union[float, Dict[LabelValues, float]]],
+                 labelnames: Sequence[str] = (), type_name: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self) -> Iterable[Sample]:
+        name = f"{self.name}_total" if self.type_name == "counter" else self.name
+        values = self.callback()
+        if not isinstance(values, dict):
+            yield name, {}, float(values or 0)
+            return
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield name, dict(zip(self.labelnames, (str(part) for part in key))), float(value or 0)
+
+class MetricsRegistry:
+    """The set of metrics exposed by /metrics, in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Re-registering a name replaces it, so reloaded modules do not duplicate families
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = (),
+                 type_name: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, type_name))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"Failed to collect metric {metric.name}: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Pipeline metrics recorded where the work happens; state that services already keep
+# (queue depth, cache counters, ...) is exposed through callbacks registered by the server
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "ytdl_extraction_seconds", "Metadata extraction latency", ["platform"]
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "ytdl_queue_wait_seconds", "Time downloads wait for a worker"
+)
+TRANSFER_SECONDS = REGISTRY.histogram(
+    "ytdl_transfer_seconds", "Download job duration, extraction through last byte", ["strategy"]
+)
+TRANSFER_BYTES = REGISTRY.counter(
+    "ytdl_transfer_bytes", "Bytes of finished downloads", ["strategy"]
+)
+TRANSFER_THROUGHPUT = REGISTRY.histogram(
+    "ytdl_transfer_throughput_bytes_per_second", "Average throughput of finished downloads", ["strategy"],
+    buckets=THROUGHPUT_BUCKETS
+)
+POSTPROCESS_SECONDS = REGISTRY.histogram(
+    "ytdl_postprocess_seconds", "Post-processing conversion time", ["action"]
+)
+DB_OPERATION_SECONDS = REGISTRY.histogram(
+    "ytdl_db_operation_seconds", "MongoDB operation latency per repository method", ["repository", "method"],
+    buckets=DB_BUCKETS
+)
+DOWNLOADS_FINISHED = REGISTRY.counter(
+    "ytdl_downloads_finished", "Download jobs by final status", ["status"]
+)
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "ytdl_event_loop_lag_seconds", "How late the event loop ran a timer", buckets=LAG_BUCKETS
+)
+LOOP_BLOCKED_SECONDS = REGISTRY.histogram(
+    "ytdl_event_loop_blocked_seconds", "How long code held the event loop past the blocking threshold",
+    buckets=LAG_BUCKETS
+)
+
+def timed_methods(repository: str, metric: Histogram = DB_OPERATION_SECONDS):
+    """Class decorator recording the latency of every public async method"""
+    def decorate(cls):
+        for attr, function in list(vars(cls).items()):
+            if attr.startswith("_") or not asyncio.iscoroutinefunction(function):
+                continue
+            setattr(cls, attr, _timed(function, metric.labels(repository, attr)))
+        return cls
+    return decorate
+
+def _timed(function, child):
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - started)
+    return wrapper
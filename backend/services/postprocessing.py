@@ -0,0 +1,225 @@
+import os
+import time
+import asyncio
+import logging
+import resource
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Any
+
+from models.video import VideoDownload, DownloadStatus
+from services.metrics import POSTPROCESS_SECONDS
+
+logger = logging.getLogger(__name__)
+
+AUDIO_FORMATS = ['mp3', 'm4a', 'wav']
+
+# Audio codec each requested format ends up with, and containers that already hold it
+TARGET_CODECS = {'m4a': 'aac', 'mp3': 'mp3', 'wav': 'pcm'}
+TARGET_CONTAINERS = {'m4a': {'m4a', 'mp4'}, 'mp3': {'mp3'}, 'wav': {'wav'}}
+
+DoneCallback = Callable[[VideoDownload], Awaitable[None]]
+ConversionResult = Tuple[str, Dict[str, Any]]
+
+def normalize_audio_codec(codec: Optional[str]) -> Optional[str]:
+    """Map yt-dlp codec strings (mp4a.40.2, pcm_s16le, ...) to a codec family"""
+    if not codec or codec == 'none':
+        return None
+    codec = codec.lower()
+    if codec.startswith(('mp4a', 'aac')):
+        return 'aac'
+    if codec.startswith('pcm'):
+        return 'pcm'
+    return codec.split('.')[0]
+
+def plan_audio_conversion(download: VideoDownload) -> str:
+    """Decide the cheapest way to turn the downloaded file into the requested audio format.
+
+    'skip'      the file already is the requested format (at most a rename)
+    'remux'     same codec in another container or next to a video stream: stream copy
+    'transcode' a different codec: decode and re-encode
+    'probe'     codec unknown; let ffprobe decide at conversion time
+    """
+    metadata = download.metadata
+    codec = normalize_audio_codec(metadata.audio_codec if metadata else None)
+    if not codec:
+        return 'probe'
+    if codec != TARGET_CODECS.get(download.format):
+        return 'transcode'
+    has_video = metadata.video_codec not in (None, 'none')
+    if not has_video and metadata.container in TARGET_CONTAINERS.get(download.format, set()):
+        return 'skip'
+    return 'remux'
+
+def needs_postprocessing(download: VideoDownload) -> bool:
+    """Whether a finished transfer still has CPU work (audio conversion) left"""
+    if download.format not in AUDIO_FORMATS:
+        return False
+    # Without metadata of the downloaded format the codec is unknown, so it is a candidate
+    return download.metadata is None or plan_audio_conversion(download) != 'skip'
+
+def finish_without_conversion(download: VideoDownload) -> str:
+    """Give an already-matching file the requested extension; no ffmpeg involved"""
+    base, ext = os.path.splitext(download.file_path)
+    target_path = f"{base}.{download.format}"
+    if ext.lstrip('.') != download.format:
+        os.replace(download.file_path, target_path)
+    download.file_path = target_path
+    download.pipeline_stats = {**(download.pipeline_stats or {}), 'audio_path': 'skip'}
+    return target_path
+
+def _cpu_seconds() -> float:
+    """CPU time of this process plus its finished children (ffmpeg/ffprobe)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def extract_audio(input_path: str, codec: str, quality: str) -> ConversionResult:
+    """Convert a downloaded file to an audio-only file; runs in a worker process.
+
+    Uses yt-dlp's own FFmpegExtractAudio, which stream-copies when ffprobe shows the
+    codec already matches and encodes otherwise. Returns the output path and the CPU
+    time spent, including ffmpeg's.
+    """
+    import yt_dlp
+    from yt_dlp.postprocessor import FFmpegExtractAudioPP
+
+    cpu_started = _cpu_seconds()
+    ext = os.path.splitext(input_path)[1].lstrip('.')
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+        postprocessor = FFmpegExtractAudioPP(ydl, preferredcodec=codec, preferredquality=quality)
+        files_to_delete, info = postprocessor.run({'filepath': input_path, 'ext': ext})
+    for path in files_to_delete:
+        if os.path.exists(path) and path != info['filepath']:
+            os.remove(path)
+    return info['filepath'], {'cpu_seconds': round(_cpu_seconds() - cpu_started, 3)}
+
+class PostProcessingStage:
+    """CPU-bound post-processing on its own queue and process pool.
+
+    Downloads hand over their finished file and leave the download queue at once,
+    so network slots and CPU workers are sized and scaled independently.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        task: Callable[[str, str, str], ConversionResult] = extract_audio
+    ):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.task = task  # module-level function so it can be sent to worker processes
+        self.on_done: Optional[DoneCallback] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.active_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.total_cpu_seconds = 0.0
+        self.action_counts: Dict[str, int] = {}
+
+    def start(self, on_done: Optional[DoneCallback] = None):
+        """Create the process pool and the worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self.on_done = on_done
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"postprocess-worker-{index}")
+            for index in range(self.max_workers)
+        ]
+        logger.info(f"Post-processing stage started with {self.max_workers} processes")
+
+    async def stop(self):
+        """Cancel the workers and shut the process pool down; queued items are dropped"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def enqueue(self, download: VideoDownload):
+        """Queue a downloaded file for post-processing"""
+        if self._queue is None:
+            raise RuntimeError("Post-processing stage is not running")
+        download.status = DownloadStatus.PROCESSING
+        self._queue.put_nowait((download, time.monotonic()))
+
+    @property
+    def depth(self) -> int:
+        """Number of files waiting for a CPU worker"""
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of stage state and average timings"""
+        finished = self.completed_count + self.failed_count
+        return {
+            "workers": self.max_workers,
+            "active": self.active_count,
+            "queued": self.depth,
+            "saturation": round(self.active_count / self.max_workers, 3),
+            "completed": self.completed_count,
+            "failed": self.failed_count,
+            "avg_wait_seconds": round(self.total_wait_seconds / finished, 3) if finished else 0.0,
+            "avg_run_seconds": round(self.total_run_seconds / finished, 3) if finished else 0.0,
+            "cpu_seconds": round(self.total_cpu_seconds, 3),
+            "actions": dict(self.action_counts)
+        }
+
+    async def _worker(self, index: int):
+        """Pull downloads off the queue until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item: Tuple[VideoDownload, float] = await self._queue.get()
+            download, enqueued_at = item
+            started = time.monotonic()
+            action = plan_audio_conversion(download)
+            self.action_counts[action] = self.action_counts.get(action, 0) + 1
+            conversion: Dict[str, Any] = {}
+            self.active_count += 1
+            try:
+                output_path, conversion = await loop.run_in_executor(
+                    self._executor,
+                    self.task,
+                    download.file_path,
+                    download.format,
+                    '320' if download.format == 'mp3' else '0'
+                )
+                download.file_path = output_path
+                if download.metadata:
+                    download.metadata.file_size = f"{os.path.getsize(output_path) / (1024*1024):.1f} MB"
+                download.status = DownloadStatus.COMPLETED
+                self.completed_count += 1
+                self.total_cpu_seconds += conversion.get('cpu_seconds', 0.0)
+            except Exception as e:
+                logger.error(f"Post-processing worker {index} failed on {download.download_id}: {str(e)}")
+                download.status = DownloadStatus.FAILED
+                download.error_message = f"Post-processing failed: {str(e)}"
+                self.failed_count += 1
+            finally:
+                finished = time.monotonic()
+                self.active_count -= 1
+                self.total_wait_seconds += started - enqueued_at
+                self.total_run_seconds += finished - started
+                POSTPROCESS_SECONDS.labels(action).observe(finished - started)
+                self._queue.task_done()
+
+            download.pipeline_stats = {
+                **(download.pipeline_stats or {}),
+                'audio_path': action,
+                'postprocess_wait_seconds': round(started - enqueued_at, 3),
+                'postprocess_seconds': round(finished - started, 3),
+                'postprocess_cpu_seconds': conversion.get('cpu_seconds')
+            }
+            if download.status == DownloadStatus.COMPLETED:
+                download.completed_at = datetime.utcnow()
+            if self.on_done:
+                try:
+                    await self.on_done(download)
+                except Exception as e:
+                    logger.error(f"Post-processing completion callback failed: {str(e)}")
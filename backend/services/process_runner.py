@@ -0,0 +1,195 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Any
+
+from models.video import VideoDownload
+
+logger = logging.getLogger(__name__)
+
+ProgressListener = Callable[[Dict[str, Any]], None]
+
+# Worker-process state, set up once per child by _init_worker
+_worker_service = None
+_worker_events = None
+
+def _init_worker(events):
+    """Per-child setup: the child reports progress on the shared events queue"""
+    global _worker_events
+    _worker_events = events
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+def _get_worker_service():
+    """One in-process downloader per child, reused for every job the child runs"""
+    global _worker_service
+    if _worker_service is None:
+        from services.video_downloader import VideoDownloaderService
+        _worker_service = VideoDownloaderService(execution_mode='thread')
+        _worker_service.progress_sink = lambda progress: _worker_events.put(progress.model_dump(mode='json'))
+    return _worker_service
+
+def run_download_job(request_data: Dict[str, Any], control) -> Dict[str, Any]:
+    """Run one download inside a worker process and return the finished record.
+
+    control is a managed dict shared with the parent: 'cancelled' and 'rate_limit'
+    are polled while the job runs.
+    """
+    service = _get_worker_service()
+    download_request = VideoDownload(**request_data)
+    download_id = download_request.download_id
+    done = threading.Event()
+
+    def watch_control():
+        applied_rate = None
+        while not done.wait(0.25):
+            try:
+                if control.get('cancelled'):
+                    service.cancel_download(download_id)
+                rate = control.get('rate_limit')
+            except (EOFError, OSError, BrokenPipeError):
+                # The parent's manager is gone: stop rather than run orphaned
+                service.cancel_download(download_id)
+                return
+            if rate != applied_rate:
+                # This child runs one job at a time, so the job's share is the whole budget
+                service.bandwidth.set_total_rate(rate)
+                applied_rate = rate
+
+    service.bandwidth.set_total_rate(control.get('rate_limit'))
+    watcher = threading.Thread(target=watch_control, name=f"control-{download_id}", daemon=True)
+    watcher.start()
+    async def download():
+        try:
+            return await service.download_video(download_request)
+        finally:
+            # The pooled transfer client is bound to this job's loop, which ends here
+            await service.async_transfer.aclose()
+
+    try:
+        result = asyncio.run(download())
+    finally:
+        done.set()
+        watcher.join()
+        service.active_downloads.pop(download_id, None)
+
+    result.pipeline_stats = {**(result.pipeline_stats or {}), 'worker_pid': os.getpid()}
+    return result.model_dump(mode='json')
+
+class ProcessDownloadRunner:
+    """Runs download jobs in a pool of worker processes.
+
+    yt-dlp's extraction, progress hooks and transfer bookkeeping then hold a child's
+    GIL instead of the API's. Progress comes back over a managed queue and
+    cancellation and bandwidth changes go out through a managed dict per job.
+    Workers are replaced after max_tasks_per_child jobs to bound memory growth.
+    """
+
+    def __init__(self, max_workers: int = 4, max_tasks_per_child: int = 20):
+        self.max_workers = max(1, max_workers)
+        self.max_tasks_per_child = max(1, max_tasks_per_child)
+        self.on_progress: Optional[ProgressListener] = None
+        self._context = multiprocessing.get_context('spawn')
+        self._manager = None
+        self._events = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pump: Optional[threading.Thread] = None
+        self._controls: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.completed_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        """Start the manager process, the worker pool and the progress pump"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._manager = self._context.Manager()
+            self._events = self._manager.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self._events,),
+                max_tasks_per_child=self.max_tasks_per_child
+            )
+            self._pump = threading.Thread(target=self._pump_events, name="process-progress", daemon=True)
+            self._pump.start()
+        logger.info(
+            f"Process download runner started with {self.max_workers} workers, "
+            f"recycled every {self.max_tasks_per_child} jobs"
+        )
+
+    def stop(self):
+        """Stop the pool; running jobs are abandoned and resume on the next start"""
+        with self._lock:
+            executor, manager, events = self._executor, self._manager, self._events
+            self._executor = self._manager = self._events = None
+        if executor is None:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        events.put(None)
+        if self._pump:
+            self._pump.join(timeout=2)
+        manager.shutdown()
+
+    async def run(self, download_request: VideoDownload, rate_limit: Optional[float] = None) -> VideoDownload:
+        """Run a download in a worker process and return its finished record"""
+        self.start()
+        download_id = download_request.download_id
+        control = self._manager.dict({'cancelled': False, 'rate_limit': rate_limit})
+        self._controls[download_id] = control
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor, run_download_job, download_request.model_dump(mode='json'), control
+            )
+        finally:
+            self._controls.pop(download_id, None)
+        self.completed_count += 1
+        return VideoDownload(**result)
+
+    def cancel(self, download_id: str) -> bool:
+        control = self._controls.get(download_id)
+        if control is None:
+            return False
+        control['cancelled'] = True
+        return True
+
+    def set_rate_limit(self, download_id: str, rate_limit: Optional[float]):
+        control = self._controls.get(download_id)
+        if control is not None:
+            control['rate_limit'] = rate_limit
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "process",
+            "workers": self.max_workers,
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "active": len(self._controls),
+            "completed": self.completed_count
+        }
+
+    def _pump_events(self):
+        """Forward progress snapshots from the workers to the listener"""
+        events = self._events
+        while True:
+            try:
+                event = events.get()
+            except (EOFError, OSError, BrokenPipeError):
+                return
+            if event is None:
+                return
+            if self.on_progress:
+                try:
+                    self.on_progress(event)
+                except Exception as e:
+                    logger.warning(f"Progress listener failed: {str(e)}")
@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+ThreadFilter = Callable[[int, str], bool]
+
+# Innermost frames of threads parked with nothing to do: an idle event loop and
+# executor threads waiting for work. Left out unless a session asks for idle stacks
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+class ProfileSession:
+    """Stack samples gathered for one profile request, in collapsed-stack form:
+    ``thread;outer (file:line);...;inner (file:line) count`` per line, the input
+    flamegraph.pl, speedscope and inferno all read."""
+
+    def __init__(
+        self,
+        name: str,
+        duration: float,
+        thread_filter: Optional[ThreadFilter] = None,
+        include_idle: bool = False
+    ):
+        self.name = name
+        self.duration = duration
+        self.thread_filter = thread_filter
+        self.include_idle = include_idle
+        self.thread_idents: Set[int] = set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = time.monotonic()
+        self.stopped_at: Optional[float] = None
+        self.done = threading.Event()
+
+    def add_thread(self, ident: Optional[int] = None):
+        """Include a thread in a session that only samples chosen threads"""
+        self.thread_idents.add(ident or threading.get_ident())
+
+    def sampling(self, function: Callable) -> Callable:
+        """Wrap function so the thread running it is sampled while it runs"""
+        def run(*args, **kwargs):
+            ident = threading.get_ident()
+            self.add_thread(ident)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.thread_idents.discard(ident)
+        return run
+
+    def wants(self, ident: int, thread_name: str) -> bool:
+        if ident in self.thread_idents:
+            return True
+        if self.thread_filter is None:
+            return not self.thread_idents
+        return self.thread_filter(ident, thread_name)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.started_at >= self.duration
+
+    @property
+    def elapsed(self) -> float:
+        return (self.stopped_at or time.monotonic()) - self.started_at
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 20) -> List[Dict[str, object]]:
+        """Frames most often on top of the stack (self time), as a share of samples"""
+        leaf_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaf_counts.values()) or 1
+        return [
+            {"frame": frame, "samples": count, "share": round(count / total, 4)}
+            for frame, count in leaf_counts.most_common(limit)
+        ]
+
+class SamplingProfiler:
+    """Statistical profiler for the live process.
+
+    One background thread reads every thread's current stack with
+    sys._current_frames() each ``interval`` seconds while any session is open,
+    so the event loop and the executor threads are profiled without tracing hooks
+    and the cost does not depend on what the code being profiled does.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_session(
+        self,
+        name: str,
+        duration: float,
+        thread_filter: Optional[ThreadFilter] = None,
+        include_idle: bool = False
+    ) -> ProfileSession:
+        session = ProfileSession(name, duration, thread_filter, include_idle)
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+                self._thread.start()
+        return session
+
+    def stop_session(self, session: ProfileSession) -> ProfileSession:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+        if session.stopped_at is None:
+            session.stopped_at = time.monotonic()
+        session.done.set()
+        return session
+
+    @property
+    def active_sessions(self) -> List[str]:
+        with self._lock:
+            return [session.name for session in self._sessions]
+
+    def _run(self):
+        sampler = threading.get_ident()
+        while True:
+            # Sample under the lock, so a stopped session's counts are final
+            with self._lock:
+                for session in [session for session in self._sessions if session.expired]:
+                    self._sessions.remove(session)
+                    session.stopped_at = time.monotonic()
+                    session.done.set()
+                if not self._sessions:
+                    self._thread = None
+                    return
+                self._sample(sampler)
+            time.sleep(self.interval)
+
+    def _sample(self, sampler: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        rendered: Dict[int, str] = {}
+        for ident, frame in sys._current_frames().items():
+            if ident == sampler:
+                continue
+            name = names.get(ident, f"thread-{ident}")
+            idle = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+            for session in self._sessions:
+                if (idle and not session.include_idle) or not session.wants(ident, name):
+                    continue
+                stack = rendered.get(ident)
+                if stack is None:
+                    stack = rendered[ident] = self._render(name, frame)
+                session.stacks[stack] += 1
+        for session in self._sessions:
+            session.samples += 1
+
+    def _render(self, thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+def write_profile(session: ProfileSession, path: Path) -> Path:
+    """Save a session's collapsed stacks for flamegraph tools"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(session.collapsed())
+    return path
+
+profiler = SamplingProfiler()
@@ -0,0 +1,137 @@
+import random
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Optional
+
+class ErrorClass(str, Enum):
+    TRANSIENT = "transient"  # network trouble, 5xx, expired media URLs: retry soon
+    THROTTLED = "throttled"  # 429 or an explicit slow-down: retry much later
+    PERMANENT = "permanent"  # private, removed, unsupported: retrying cannot help
+
+# Lower-cased message fragments of failures that retrying cannot fix
+PERMANENT_MESSAGES = (
+    'private video', 'video is private', 'video unavailable', 'has been removed', 'been terminated',
+    'no longer available', 'not available in your country', 'copyright', 'sign in to confirm your age',
+    'members-only', 'join this channel', 'unsupported url', 'requested format is not available',
+    'cannot be downloaded', 'clip starts at', 'http error 404', 'http error 410'
+)
+THROTTLE_MESSAGES = ('http error 429', 'too many requests', 'rate limit', 'rate-limit')
+TRANSIENT_MESSAGES = (
+    'timed out', 'timeout', 'connection reset', 'connection refused', 'connection aborted',
+    'remote end closed', 'temporary failure', 'name resolution', 'network is unreachable',
+    'incomplete read', 'ended early', 'http error 5', 'http error 408', 'http error 403', 'unable to download'
+)
+
+@dataclass
+class ErrorClassification:
+    error_class: ErrorClass
+    retry_after: Optional[float] = None  # seconds the server asked us to wait
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header: delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def _status_and_headers(error: BaseException):
+    """HTTP status and response headers of any of the HTTP errors our stack raises"""
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None) or getattr(error, 'code', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+    headers = getattr(error, 'headers', None) or getattr(response, 'headers', None)
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None and headers is not None:
+        try:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+        except AttributeError:
+            retry_after = None
+    return (status if isinstance(status, int) else None), retry_after
+
+def _causes(error: BaseException):
+    """The error and everything it wraps (yt-dlp keeps the original in exc_info/cause)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = wrapped or getattr(error, 'cause', None) or error.__cause__ or error.__context__
+
+def classify_error(error: BaseException) -> ErrorClassification:
+    """Decide whether a failed download is worth retrying, and how soon"""
+    retry_after = None
+    for cause in _causes(error):
+        status, cause_retry_after = _status_and_headers(cause)
+        retry_after = retry_after if retry_after is not None else cause_retry_after
+        if status == 429:
+            return ErrorClassification(ErrorClass.THROTTLED, retry_after)
+        if status == 503 and retry_after is not None:
+            return ErrorClassification(ErrorClass.THROTTLED, retry_after)
+        if status is not None and (status >= 500 or status in (403, 408)):
+            return ErrorClassification(ErrorClass.TRANSIENT, retry_after)
+        if status is not None and 400 <= status < 500:
+            return ErrorClassification(ErrorClass.PERMANENT)
+        if isinstance(cause, (ConnectionError, TimeoutError, socket.timeout, socket.gaierror)):
+            return ErrorClassification(ErrorClass.TRANSIENT, retry_after)
+
+    message = ' '.join(str(cause) for cause in _causes(error)).lower()
+    if any(fragment in message for fragment in THROTTLE_MESSAGES):
+        return ErrorClassification(ErrorClass.THROTTLED, retry_after)
+    if any(fragment in message for fragment in PERMANENT_MESSAGES):
+        return ErrorClassification(ErrorClass.PERMANENT)
+    if any(fragment in message for fragment in TRANSIENT_MESSAGES):
+        return ErrorClassification(ErrorClass.TRANSIENT, retry_after)
+    # Our own validation and programming errors will fail the same way again
+    if isinstance(error, (ValueError, TypeError, KeyError, AttributeError)):
+        return ErrorClassification(ErrorClass.PERMANENT)
+    return ErrorClassification(ErrorClass.TRANSIENT, retry_after)
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt))))
+
+class RetryPolicy:
+    """When and how long to wait before re-queueing a failed download"""
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 5.0,
+        max_delay: float = 600.0,
+        throttle_base_delay: float = 60.0,
+        max_retry_after: float = 3600.0
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttle_base_delay = throttle_base_delay
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, error_class: Optional[str], retry_count: int) -> bool:
+        if error_class not in (ErrorClass.TRANSIENT, ErrorClass.THROTTLED):
+            return False
+        return retry_count < self.max_retries
+
+    def next_delay(self, error_class: Optional[str], retry_count: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before attempt retry_count + 1"""
+        base = self.throttle_base_delay if error_class == ErrorClass.THROTTLED else self.base_delay
+        # Never below half the nominal step, so throttled retries do not bunch up at zero
+        nominal = min(self.max_delay, base * (2 ** retry_count))
+        delay = nominal / 2 + backoff_delay(retry_count, base, self.max_delay) / 2
+        if retry_after is not None:
+            # The server knows best; wait at least that long, plus jitter to spread the herd
+            delay = max(delay, min(retry_after, self.max_retry_after) + random.uniform(0, base / 2))
+        return delay
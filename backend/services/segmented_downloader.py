@@ -0,0 +1,450 @@
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.bandwidth_manager import TokenBucket
+from services.retry_policy import backoff_delay, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int, float], None]
+
+class SegmentedDownloadError(Exception):
+    """Raised when a segmented download cannot be completed"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class SegmentedDownloadCancelled(SegmentedDownloadError):
+    """Raised when the caller asks a running download to stop"""
+
+class RangeNotSupported(SegmentedDownloadError):
+    """Raised when the server ignores byte-range requests"""
+
+@dataclass
+class Segment:
+    index: int
+    start: int
+    end: int  # inclusive
+    written: int = 0
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def done(self) -> bool:
+        return self.written >= self.size
+
+class SegmentedDownloader:
+    """Downloads progressive (single-file) media over several HTTP range requests.
+
+    The target is preallocated as ``<dest>.part`` and each segment is written at its
+    own offset. Per-segment progress is checkpointed to ``<dest>.part.json`` every
+    checkpoint_interval seconds and whenever a segment completes, so an interrupted
+    download (including a killed process) resumes where it left off.
+    """
+
+    def __init__(
+        self,
+        connections: int = 8,
+        min_segment_size: int = 4 * 1024 * 1024,
+        chunk_size: int = 256 * 1024,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+        session: Optional[requests.Session] = None,
+        checkpoint_interval: float = 5.0
+    ):
+        self.connections = max(1, connections)
+        self.min_segment_size = max(64 * 1024, min_segment_size)
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.checkpoint_interval = checkpoint_interval
+        self.session = session or self._create_session(self.connections)
+
+    @staticmethod
+    def _create_session(connections: int) -> requests.Session:
+        """Session whose connection pool is large enough for all segment workers"""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=max(connections * 4, 32)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def probe(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[int], bool]:
+        """Return (total size, supports ranges) using a one-byte range request"""
+        request_headers = {**(headers or {}), "Range": "bytes=0-0"}
+        with self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                return (int(total) if total.isdigit() else None), True
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), False
+
+    def download(
+        self,
+        url: str,
+        dest_path: str,
+        headers: Optional[Dict[str, str]] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        connection_limit: Optional[Callable[[], int]] = None,
+        on_throttle: Optional[Callable[[], None]] = None,
+        rate_limit: Optional[Callable[[], Optional[float]]] = None,
+        bucket: Optional[TokenBucket] = None,
+        thread_name_prefix: str = "segment"
+    ) -> Path:
+        """Download url to dest_path, in parallel when the server allows it.
+        
+        connection_limit is consulted before each segment starts, so the number of
+        parallel connections can change mid-download (capped at self.connections).
+        on_throttle is called whenever the server answers 429 or 503. rate_limit returns
+        the current bytes/s ceiling shared by all connections (None for unlimited); pass
+        bucket instead to share one ceiling between several downloads. Segment workers
+        are named after thread_name_prefix, so a job's threads can be told apart.
+        """
+        dest = Path(dest_path)
+        part_path = dest.with_name(dest.name + ".part")
+        state_path = dest.with_name(dest.name + ".part.json")
+
+        if bucket is None and rate_limit:
+            bucket = TokenBucket(rate_limit)
+        total_size, supports_ranges = self.probe(url, headers)
+        if not total_size or not supports_ranges:
+            self._download_single(url, part_path, headers, total_size, progress_callback, should_cancel, bucket)
+        else:
+            segments = self._load_or_plan_segments(state_path, part_path, total_size)
+            self._preallocate(part_path, total_size)
+            try:
+                self._download_segments(
+                    url, part_path, state_path, segments, total_size, headers,
+                    progress_callback, should_cancel, connection_limit, on_throttle, bucket,
+                    thread_name_prefix
+                )
+            except RangeNotSupported:
+                # The caller falls back to another downloader, which would take the
+                # zero-filled full-size part file for data to resume from
+                part_path.unlink(missing_ok=True)
+                state_path.unlink(missing_ok=True)
+                raise
+
+        os.replace(part_path, dest)
+        if state_path.exists():
+            state_path.unlink()
+        return dest
+
+    def plan_segments(self, total_size: int) -> List[Segment]:
+        """Split a file into segments, several per connection so fast workers take more"""
+        segment_size = max(self.min_segment_size, -(-total_size // (self.connections * 4)))
+        segments = []
+        start = 0
+        while start < total_size:
+            end = min(start + segment_size, total_size) - 1
+            segments.append(Segment(index=len(segments), start=start, end=end))
+            start = end + 1
+        return segments
+
+    def _load_or_plan_segments(self, state_path: Path, part_path: Path, total_size: int) -> List[Segment]:
+        """Resume from a checkpoint when it matches the current file, otherwise start fresh"""
+        if state_path.exists() and part_path.exists():
+            try:
+                with open(state_path) as f:
+                    state = json.load(f)
+                if state.get("total_size") == total_size:
+                    segments = [Segment(**segment) for segment in state["segments"]]
+                    logger.info(
+                        f"Resuming {part_path.name}: "
+                        f"{sum(s.written for s in segments)}/{total_size} bytes already on disk"
+                    )
+                    return segments
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {state_path}: {str(e)}")
+        return self.plan_segments(total_size)
+
+    @staticmethod
+    def _preallocate(part_path: Path, total_size: int):
+        """Create the part file at its final size so segments can be written in place"""
+        mode = "r+b" if part_path.exists() else "wb"
+        with open(part_path, mode) as f:
+            f.truncate(total_size)
+
+    @staticmethod
+    def _save_checkpoint(state_path: Path, total_size: int, segments: List[Segment]):
+        """Atomically persist per-segment progress"""
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "total_size": total_size,
+                "segments": [segment.__dict__ for segment in segments]
+            }, f)
+        os.replace(tmp_path, state_path)
+
+    def _download_segments(
+        self,
+        url: str,
+        part_path: Path,
+        state_path: Path,
+        segments: List[Segment],
+        total_size: int,
+        headers: Optional[Dict[str, str]],
+        progress_callback: Optional[ProgressCallback],
+        should_cancel: Optional[Callable[[], bool]],
+        connection_limit: Optional[Callable[[], int]] = None,
+        on_throttle: Optional[Callable[[], None]] = None,
+        bucket: Optional[TokenBucket] = None,
+        thread_name_prefix: str = "segment"
+    ):
+        """Fetch all unfinished segments with a pool of connections"""
+        checkpointer = _Checkpointer(state_path, total_size, segments, self.checkpoint_interval)
+        abort = threading.Event()
+        gate = _ConnectionGate(lambda: min(self.connections, connection_limit() if connection_limit else self.connections))
+        tracker = _ProgressTracker(total_size, sum(s.written for s in segments), progress_callback)
+        pending = [segment for segment in segments if not segment.done]
+
+        def stop_requested() -> bool:
+            return abort.is_set() or bool(should_cancel and should_cancel())
+
+        def fetch(segment: Segment):
+            with gate:
+                if stop_requested():
+                    raise SegmentedDownloadCancelled("Download cancelled")
+                self._fetch_segment_with_retries(
+                    url, part_path, segment, headers, tracker, stop_requested, on_throttle, bucket, checkpointer
+                )
+            checkpointer.save()
+
+        workers = min(self.connections, len(pending)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as pool:
+            futures = [pool.submit(fetch, segment) for segment in pending]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Stop the other workers at their next chunk
+                abort.set()
+                for future in futures:
+                    future.cancel()
+                # Keep whatever landed so the next attempt resumes from it
+                checkpointer.save()
+                raise
+
+        tracker.report(force=True)
+
+    def _fetch_segment_with_retries(
+        self,
+        url: str,
+        part_path: Path,
+        segment: Segment,
+        headers: Optional[Dict[str, str]],
+        tracker: "_ProgressTracker",
+        should_cancel: Optional[Callable[[], bool]],
+        on_throttle: Optional[Callable[[], None]] = None,
+        bucket: Optional[TokenBucket] = None,
+        checkpointer: Optional["_Checkpointer"] = None
+    ):
+        """Fetch one segment, retrying only that segment on failure"""
+        attempt = 0
+        while True:
+            try:
+                self._fetch_segment(url, part_path, segment, headers, tracker, should_cancel, bucket, checkpointer)
+                return
+            except (SegmentedDownloadCancelled, RangeNotSupported):
+                raise
+            except (requests.RequestException, SegmentedDownloadError) as e:
+                delay = segment_retry_delay(e, attempt, self.max_retries, on_throttle)
+                attempt += 1
+                logger.warning(f"Retrying segment {segment.index} in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+
+    def _fetch_segment(
+        self,
+        url: str,
+        part_path: Path,
+        segment: Segment,
+        headers: Optional[Dict[str, str]],
+        tracker: "_ProgressTracker",
+        should_cancel: Optional[Callable[[], bool]],
+        bucket: Optional[TokenBucket] = None,
+        checkpointer: Optional["_Checkpointer"] = None
+    ):
+        """Stream the remaining bytes of a segment into its offset of the part file"""
+        start = segment.start + segment.written
+        request_headers = {**(headers or {}), "Range": f"bytes={start}-{segment.end}"}
+        with self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 200:
+                raise RangeNotSupported("Server ignored the range request")
+            if response.status_code != 206:
+                raise SegmentedDownloadError(
+                    f"HTTP {response.status_code} for segment {segment.index}",
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+
+            # Unbuffered, so every byte counted in a checkpoint has reached the OS
+            with open(part_path, "r+b", buffering=0) as f:
+                f.seek(start)
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if should_cancel and should_cancel():
+                        raise SegmentedDownloadCancelled("Download cancelled")
+                    if not chunk:
+                        continue
+                    remaining = segment.size - segment.written
+                    chunk = chunk[:remaining]
+                    if bucket:
+                        bucket.take(len(chunk))
+                    f.write(chunk)
+                    segment.written += len(chunk)
+                    tracker.add(len(chunk))
+                    if checkpointer:
+                        checkpointer.maybe_save()
+                    if segment.done:
+                        break
+
+        if not segment.done:
+            raise SegmentedDownloadError(
+                f"Segment {segment.index} ended early at {segment.written}/{segment.size} bytes"
+            )
+
+    def _download_single(
+        self,
+        url: str,
+        part_path: Path,
+        headers: Optional[Dict[str, str]],
+        total_size: Optional[int],
+        progress_callback: Optional[ProgressCallback],
+        should_cancel: Optional[Callable[[], bool]],
+        bucket: Optional[TokenBucket] = None
+    ):
+        """Plain streaming download for servers without range support"""
+        tracker = _ProgressTracker(total_size or 0, 0, progress_callback)
+        with self.session.get(url, headers=headers or {}, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if should_cancel and should_cancel():
+                        raise SegmentedDownloadCancelled("Download cancelled")
+                    if chunk:
+                        if bucket:
+                            bucket.take(len(chunk))
+                        f.write(chunk)
+                        tracker.add(len(chunk))
+        tracker.report(force=True)
+
+# Longest a segment waits in place before the failure goes to the job-level retry scheduler
+MAX_SEGMENT_RETRY_DELAY = 8.0
+
+def segment_retry_delay(
+    error: Exception, attempt: int, max_retries: int, on_throttle: Optional[Callable[[], None]] = None
+) -> float:
+    """Jittered wait before retrying a failed segment, or re-raise when it should not be retried here"""
+    status_code = getattr(error, "status_code", None)
+    retry_after = getattr(error, "retry_after", None)
+    if on_throttle and status_code in (429, 503):
+        on_throttle()
+    if attempt >= max_retries:
+        raise SegmentedDownloadError(
+            f"Segment failed after {max_retries} retries: {str(error)}",
+            status_code=status_code,
+            retry_after=retry_after
+        ) from error
+    if retry_after is not None and retry_after > MAX_SEGMENT_RETRY_DELAY:
+        # Too long to hold the connection slot; let the job be re-queued instead
+        raise SegmentedDownloadError(
+            f"Server asked to retry after {retry_after:.0f}s: {str(error)}",
+            status_code=status_code,
+            retry_after=retry_after
+        ) from error
+    return max(retry_after or 0.0, 0.25 + backoff_delay(attempt, 0.5, MAX_SEGMENT_RETRY_DELAY))
+
+class _ConnectionGate:
+    """Counting gate whose capacity is re-read on every acquire, so it can change live"""
+
+    def __init__(self, capacity: Callable[[], int]):
+        self.capacity = capacity
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            # Timed waits pick up capacity increases without an explicit notify
+            while self.active >= max(1, self.capacity()):
+                self.condition.wait(timeout=0.2)
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+class _Checkpointer:
+    """Saves per-segment progress at most every interval seconds, from any worker"""
+
+    def __init__(self, state_path: Path, total_size: int, segments: List[Segment], interval: float):
+        self.state_path = state_path
+        self.total_size = total_size
+        self.segments = segments
+        self.interval = interval
+        self.saved_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def due(self) -> bool:
+        return time.monotonic() - self.saved_at >= self.interval
+
+    def maybe_save(self):
+        if self.due:
+            self.save()
+
+    def save(self, segments: Optional[List[Segment]] = None):
+        """Persist the live segments, or a snapshot of them taken earlier"""
+        with self.lock:
+            SegmentedDownloader._save_checkpoint(self.state_path, self.total_size, segments or self.segments)
+            self.saved_at = time.monotonic()
+
+    def snapshot(self) -> List[Segment]:
+        return [Segment(**segment.__dict__) for segment in self.segments]
+
+class _ProgressTracker:
+    """Aggregates bytes from all segment workers and rate-limits progress callbacks"""
+
+    def __init__(self, total_size: int, already_done: int, callback: Optional[ProgressCallback], interval: float = 0.25):
+        self.total_size = total_size
+        self.downloaded = already_done
+        self.callback = callback
+        self.interval = interval
+        self.started_at = time.monotonic()
+        self.started_bytes = already_done
+        self.last_report = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, count: int):
+        with self.lock:
+            self.downloaded += count
+        self.report()
+
+    def report(self, force: bool = False):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started_at, 1e-6)
+        speed = (self.downloaded - self.started_bytes) / elapsed
+        self.callback(self.downloaded, self.total_size or self.downloaded, speed)
@@ -0,0 +1,93 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict
+
+from services.download_queue import percentile
+
+# Queue-wait samples kept per executor
+WAIT_SAMPLES = 500
+
+class StageExecutor(Executor):
+    """A named, separately sized thread pool for one pipeline stage.
+
+    Each stage (metadata extraction, yt-dlp transfers, disk I/O, ...) gets its own
+    threads instead of sharing the event loop's default executor, so a flood of one
+    kind of work queues behind itself and never takes threads another stage needs.
+    Tracks how busy the pool is and how long submitted calls wait for a thread.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._created_at = time.monotonic()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        submitted_at = time.monotonic()
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        def run():
+            started_at = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self._waits.append(started_at - submitted_at)
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.busy_seconds += time.monotonic() - started_at
+                    if failed:
+                        self.failed += 1
+                    else:
+                        self.completed += 1
+
+        try:
+            return self._executor.submit(run)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy and queue-wait percentiles"""
+        with self._lock:
+            waits = list(self._waits)
+            elapsed = max(time.monotonic() - self._created_at, 1e-9)
+            return {
+                "workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                # Share of threads busy right now, and averaged over the pool's lifetime
+                "saturation": round(self.active / self.max_workers, 3),
+                "utilization": round(self.busy_seconds / (elapsed * self.max_workers), 3),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_p50": percentile(waits, 0.5),
+                "wait_p95": percentile(waits, 0.95),
+                "wait_p99": percentile(waits, 0.99)
+            }
@@ -0,0 +1,229 @@
+import json
+import time
+import secrets
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from models.video import VideoDownload
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "video-downloader-api"
+
+# OTLP span status codes and the internal span kind
+STATUS_OK = 1
+STATUS_ERROR = 2
+SPAN_KIND_INTERNAL = 1
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status_code: int = STATUS_OK
+    status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON encoding (hex ids, 64-bit integers as strings)"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items() if value is not None
+            ],
+            "status": {"code": self.status_code}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class FileSpanExporter:
+    """Appends finished spans to a file as OTLP/JSON ExportTraceServiceRequest lines,
+    the format the OpenTelemetry Collector's file receiver reads. Spans are buffered
+    and written max_batch at a time, or on flush()."""
+
+    def __init__(self, path: str, max_batch: int = 64, service_name: str = SERVICE_NAME):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_batch = max(1, max_batch)
+        self.service_name = service_name
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self.exported_count = 0
+
+    def export(self, span: Span):
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self.max_batch:
+                return
+            batch, self._buffer = self._buffer, []
+        self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, spans: List[Span]):
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(json.dumps(request, separators=(",", ":")) + "\n")
+            self.exported_count += len(spans)
+        except OSError as e:
+            logger.error(f"Failed to export {len(spans)} spans to {self.path}: {str(e)}")
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+class Tracer:
+    """Creates spans that nest through the context (tasks, and executor calls made
+    with a copied context); finished spans go to the exporter, if one is set"""
+
+    def __init__(self, exporter: Optional[FileSpanExporter] = None):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        trace_id: Optional[str] = None,
+        start_ns: Optional[int] = None
+    ) -> Iterator[Span]:
+        parent = _current_span.get()
+        if parent is not None and trace_id not in (None, parent.trace_id):
+            parent = None
+        span = Span(
+            name=name,
+            trace_id=trace_id or (parent.trace_id if parent else new_trace_id()),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            start_ns=start_ns or time.time_ns(),
+            attributes=dict(attributes or {})
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status_code = STATUS_ERROR
+            span.status_message = f"{type(e).__name__}: {str(e)}"[:500]
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._export(span)
+
+    def record(self, name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """Export a span for a phase that has already happened, under the current span"""
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else new_trace_id(),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            start_ns=start_ns,
+            end_ns=end_ns,
+            attributes=dict(attributes or {})
+        )
+        self._export(span)
+        return span
+
+    def flush(self):
+        if self.exporter:
+            self.exporter.flush()
+
+    def _export(self, span: Span):
+        if self.exporter:
+            self.exporter.export(span)
+
+tracer = Tracer()
+
+def add_timing(download: VideoDownload, phase: str, seconds: float):
+    """Add to the per-phase breakdown stored on the record (summed over attempts)"""
+    timings = download.timings if download.timings is not None else {}
+    timings[phase] = round(timings.get(phase, 0.0) + seconds, 3)
+    download.timings = timings
+
+@contextmanager
+def trace_download(download: VideoDownload, name: str, already_elapsed: float = 0.0) -> Iterator[Span]:
+    """Root span for one pass of a job through the pipeline; every pass of a job
+    shares the trace id kept on the record. already_elapsed backdates the start."""
+    if not download.trace_id:
+        download.trace_id = new_trace_id()
+    start_ns = time.time_ns() - int(already_elapsed * 1e9)
+    attributes = {
+        "download.id": download.download_id,
+        "download.platform": getattr(download.platform, "value", download.platform),
+        "download.format": download.format,
+        "download.quality": download.quality,
+        "download.user_id": download.user_id,
+        "download.retry_count": download.retry_count
+    }
+    with tracer.span(name, attributes, trace_id=download.trace_id, start_ns=start_ns) as span:
+        try:
+            yield span
+        finally:
+            span.attributes.setdefault("download.status", getattr(download.status, "value", download.status))
+
+@contextmanager
+def trace_phase(download: VideoDownload, phase: str, **attributes) -> Iterator[Span]:
+    """Child span for one phase of a job, also added to the record's timing breakdown"""
+    started = time.monotonic()
+    with tracer.span(phase, attributes, trace_id=download.trace_id) as span:
+        try:
+            yield span
+        finally:
+            add_timing(download, phase, time.monotonic() - started)
+
+def record_phase(download: VideoDownload, phase: str, seconds: float, end_ns: Optional[int] = None, **attributes):
+    """Span and timing for a phase measured elsewhere, ending at end_ns (default now)"""
+    end_ns = end_ns or time.time_ns()
+    tracer.record(phase, end_ns - int(seconds * 1e9), end_ns, attributes)
+    add_timing(download, phase, seconds)
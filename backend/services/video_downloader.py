@@ -1,12 +1,40 @@
 import os
 import asyncio
 import logging
+import threading
+import time
+import shutil
+import subprocess
+import copy
+import contextvars
+import itertools
+import http.cookiejar
 import yt_dlp
 import aiofiles
-from typing import Dict, Optional, List, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, List, Any, Tuple, AsyncIterator, Iterable
+from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 from pathlib import Path
 
+from services.segmented_downloader import (
+    SegmentedDownloader,
+    SegmentedDownloadError,
+    SegmentedDownloadCancelled,
+    RangeNotSupported
+)
+from services.async_transfer import AsyncTransferEngine
+from services.adaptive_tuning import AdaptiveTuningController
+from services.bandwidth_manager import BandwidthManager, TokenBucket, parse_weights
+from services.postprocessing import AUDIO_FORMATS, needs_postprocessing, finish_without_conversion
+from services.ydl_pool import YoutubeDLPool
+from services.retry_policy import ErrorClass, backoff_delay, classify_error
+from services.process_runner import ProcessDownloadRunner
+from services.stage_executor import StageExecutor
+from services.metrics import EXTRACTION_SECONDS
+from services.tracing import trace_phase, tracer
+from services.profiler import ProfileSession, profiler, write_profile
 from models.video import (
     VideoDownload, 
     VideoMetadata, 
@@ -19,11 +47,155 @@ from models.video import (
 
 logger = logging.getLogger(__name__)
 
+def _env_rate(name: str) -> Optional[float]:
+    """Read a bytes/s limit from the environment; unset or 0 means unlimited"""
+    value = float(os.environ.get(name, '0') or 0)
+    return value if value > 0 else None
+
+# Partial-transfer files: yt-dlp's and our engines' part files and checkpoints,
+# including a checkpoint whose write was interrupted
+PARTIAL_SUFFIXES = ('.part', '.part.json', '.part.json.tmp', '.ytdl')
+
+# Extractors whose flat entries are themselves lists (e.g. the tabs of a channel)
+NESTED_PLAYLIST_IE_KEYS = {'YoutubeTab', 'YoutubePlaylist'}
+
 class VideoDownloaderService:
-    def __init__(self):
+    def __init__(
+        self,
+        execution_mode: Optional[str] = None,
+        extractor: Optional[Callable[[str, Any], Dict[str, Any]]] = None
+    ):
         self.downloads_dir = Path("downloads")
         self.downloads_dir.mkdir(exist_ok=True)
         self.active_downloads: Dict[str, DownloadProgress] = {}
+        
+        # Long-poll support: one event per download, replaced after each wake-up
+        self._progress_waiters: Dict[str, asyncio.Event] = {}
+        self._progress_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Called with every published progress snapshot (used by process workers)
+        self.progress_sink = None
+        
+        # 'thread' runs yt-dlp in the default executor; 'process' in a pool of worker
+        # processes so its Python work does not compete with the API for the GIL
+        self.execution_mode = execution_mode or os.environ.get('EXECUTION_MODE', 'thread')
+        self.process_runner: Optional[ProcessDownloadRunner] = None
+        if self.execution_mode == 'process':
+            self.process_runner = ProcessDownloadRunner(
+                max_workers=int(os.environ.get('PROCESS_WORKERS', os.environ.get('MAX_CONCURRENT_DOWNLOADS', '8'))),
+                max_tasks_per_child=int(os.environ.get('PROCESS_MAX_TASKS_PER_CHILD', '20'))
+            )
+            self.process_runner.on_progress = self._apply_remote_progress
+        
+        # One thread pool per pipeline stage instead of the loop's shared default
+        # executor, so a validation storm cannot hold up finishing downloads or the reverse
+        self.extraction_executor = StageExecutor('extraction', int(os.environ.get('EXTRACTION_THREADS', '8')))
+        self.enumeration_executor = StageExecutor('enumeration', int(os.environ.get('ENUMERATION_THREADS', '4')))
+        self.transfer_executor = StageExecutor(
+            'transfer',
+            int(os.environ.get('TRANSFER_THREADS', os.environ.get('MAX_CONCURRENT_DOWNLOADS', '8')))
+        )
+        self.disk_executor = StageExecutor('disk-io', int(os.environ.get('DISK_IO_THREADS', '4')))
+        
+        # Jobs started with profile=True are sampled for their whole run (capped), and
+        # their collapsed stacks written under PROFILE_DIR
+        self.profile_dir = Path(os.environ.get('PROFILE_DIR', 'profiles'))
+        self.job_profile_max_seconds = float(os.environ.get('PROFILE_JOB_MAX_SECONDS', '600'))
+        self._job_profiles: Dict[str, ProfileSession] = {}
+        
+        # Short-lived cache of extracted video info shared by all validation paths
+        self.info_cache_ttl = float(os.environ.get('INFO_CACHE_TTL', '300'))
+        self.info_cache_size = int(os.environ.get('INFO_CACHE_SIZE', '1000'))
+        self._info_cache: "OrderedDict[str, Tuple[float, VideoInfo]]" = OrderedDict()
+        self._info_inflight: Dict[str, asyncio.Future] = {}
+        self.info_cache_hits = 0
+        self.info_cache_misses = 0
+        
+        # Warm extraction instances, and raw extraction results handed to the download
+        # job so a validated URL is not extracted again
+        self.extraction_pool = YoutubeDLPool(
+            {
+                'quiet': True,
+                'no_warnings': True,
+                'extract_flat': False,
+                'skip_download': True,
+            },
+            max_size=int(os.environ.get('EXTRACTION_POOL_SIZE', '4'))
+        )
+        self.raw_info_cache_size = int(os.environ.get('RAW_INFO_CACHE_SIZE', '100'))
+        self._raw_info_cache: "OrderedDict[str, Tuple[float, dict, List[http.cookiejar.Cookie]]]" = OrderedDict()
+        self._raw_info_lock = threading.Lock()
+        self._job_raw_info: Dict[str, dict] = {}
+        self.raw_info_reuses = 0
+        # Optional stand-in for yt-dlp's site extractors: given a URL and the YoutubeDL
+        # running the extraction, returns the unprocessed info dict and may set cookies
+        # in its jar (used to run the pipeline offline against local media)
+        self.extractor = extractor
+        
+        # Parallel byte-range transfers for progressive (single-file) formats
+        self.segmented_enabled = os.environ.get('SEGMENTED_DOWNLOADS', 'true').lower() == 'true'
+        self.segmented_min_size = int(os.environ.get('SEGMENTED_MIN_SIZE', str(4 * 1024 * 1024)))
+        max_connections = int(os.environ.get('MAX_CONNECTIONS_PER_JOB', '16'))
+        self.segmented_downloader = SegmentedDownloader(
+            connections=max_connections,
+            min_segment_size=int(os.environ.get('SEGMENTED_SEGMENT_SIZE', str(2 * 1024 * 1024))),
+            checkpoint_interval=float(os.environ.get('CHECKPOINT_INTERVAL', '5'))
+        )
+        
+        # Once extraction has resolved a direct media URL, the bytes are streamed on the
+        # event loop rather than in a thread, so one process can run thousands of transfers
+        self.async_transfers_enabled = os.environ.get('ASYNC_TRANSFERS', 'true').lower() == 'true'
+        self.async_transfer = AsyncTransferEngine(
+            self.segmented_downloader,
+            max_connections=int(os.environ.get('ASYNC_MAX_CONNECTIONS', '1000')),
+            max_keepalive_connections=int(os.environ.get('ASYNC_MAX_KEEPALIVE', '200')),
+            max_transfers=int(os.environ.get('ASYNC_MAX_TRANSFERS', '1000')),
+            file_executor=self.disk_executor
+        )
+        
+        # Audio conversion runs in the post-processing stage, not in the download slot
+        self.postprocess_offload = os.environ.get('POSTPROCESS_OFFLOAD', 'true').lower() == 'true'
+        self._postprocess_jobs: set = set()
+        
+        # Separate video/audio adaptive streams fetched in parallel and stream-copied together
+        self.ffmpeg_path = os.environ.get('FFMPEG_PATH') or shutil.which('ffmpeg')
+        self.dash_enabled = (
+            os.environ.get('DASH_DOWNLOADS', 'true').lower() == 'true' and self.ffmpeg_path is not None
+        )
+        # Lowest requested height that switches YouTube from single-file formats to DASH
+        self.dash_min_height = int(os.environ.get('DASH_MIN_HEIGHT', '1080'))
+        
+        # Adaptive fragment concurrency / chunk size, shared across all jobs
+        self.tuning = AdaptiveTuningController(
+            connection_budget=int(os.environ.get('CONNECTION_BUDGET', '64')),
+            initial_concurrency=int(os.environ.get('INITIAL_CONNECTIONS_PER_JOB', '8')),
+            max_concurrency=max_connections
+        )
+        # Live yt-dlp params per running job, so tuning decisions apply mid-download
+        self._job_params: Dict[str, dict] = {}
+        
+        # Weighted fair shares of the uplink across users and platforms
+        self.bandwidth = BandwidthManager(
+            total_rate=_env_rate('BANDWIDTH_LIMIT'),
+            user_ceiling=_env_rate('BANDWIDTH_USER_LIMIT'),
+            job_ceiling=_env_rate('BANDWIDTH_JOB_LIMIT'),
+            platform_weights=parse_weights(os.environ.get('BANDWIDTH_PLATFORM_WEIGHTS', '')),
+            user_weights=parse_weights(os.environ.get('BANDWIDTH_USER_WEIGHTS', ''))
+        )
+        self.bandwidth.add_listener(self._apply_rate_limit)
+    
+    @property
+    def stage_executors(self) -> List[StageExecutor]:
+        return [self.extraction_executor, self.enumeration_executor, self.transfer_executor, self.disk_executor]
+    
+    def executor_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Occupancy and queue waits of each stage's thread pool"""
+        return {executor.name: executor.stats() for executor in self.stage_executors}
+    
+    def shutdown_executors(self):
+        """Stop the stage thread pools; queued calls are dropped"""
+        for executor in self.stage_executors:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def detect_platform(self, url: str) -> Optional[PlatformType]:
         """Detect the social media platform from URL"""
@@ -40,20 +212,44 @@ class VideoDownloaderService:
     
     async def get_video_info(self, url: str) -> VideoInfo:
         """Extract video information without downloading"""
+        platform = self.detect_platform(url)
+        if not platform:
+            raise ValueError("Unsupported platform")
+        
+        cached = self._get_cached_info(url)
+        if cached:
+            self.info_cache_hits += 1
+            return cached
+        self.info_cache_misses += 1
+        
+        # Share one extraction between concurrent requests for the same URL; the
+        # extraction outlives any single requester that gets cancelled
+        inflight = self._info_inflight.get(url)
+        if inflight is None:
+            loop = asyncio.get_running_loop()
+            inflight = loop.run_in_executor(self.extraction_executor, self._extract_video_info, url, platform)
+            self._info_inflight[url] = inflight
+            inflight.add_done_callback(lambda future: self._finish_info_extraction(url, future))
+        
+        return await asyncio.shield(inflight)
+    
+    def _finish_info_extraction(self, url: str, future: asyncio.Future):
+        """Cache a finished extraction and forget the in-flight future"""
+        self._info_inflight.pop(url, None)
+        if not future.cancelled() and future.exception() is None:
+            self._store_cached_info(url, future.result())
+    
+    def _extract_video_info(self, url: str, platform: PlatformType) -> VideoInfo:
+        """Run yt-dlp metadata extraction (blocking, call from an executor)"""
+        started = time.monotonic()
         try:
-            platform = self.detect_platform(url)
-            if not platform:
-                raise ValueError("Unsupported platform")
-            
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'skip_download': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
+            with self.extraction_pool.checkout(platform.value) as ydl:
+                # Keep the unprocessed result: the download job re-runs format selection
+                # on it with its own options instead of extracting again
+                ie_result = self._extract_raw_info(ydl, url)
+                if ie_result.get('_type', 'video') == 'video':
+                    self._store_raw_info(url, copy.deepcopy(ie_result), list(ydl.cookiejar))
+                info = ydl.process_ie_result(ie_result, download=False)
                 
                 # Check if video is available
                 is_downloadable = True
@@ -85,6 +281,50 @@ class VideoDownloaderService:
         except Exception as e:
             logger.error(f"Error extracting video info: {str(e)}")
             raise ValueError(f"Failed to extract video information: {str(e)}")
+        finally:
+            EXTRACTION_SECONDS.labels(platform.value).observe(time.monotonic() - started)
+    
+    def _extract_raw_info(self, ydl, url: str) -> dict:
+        """Unprocessed extraction result for url, from the plugged-in extractor when set"""
+        if self.extractor is not None:
+            return self.extractor(url, ydl)
+        return ydl.extract_info(url, download=False, process=False)
+    
+    def _get_cached_info(self, url: str) -> Optional[VideoInfo]:
+        """Return cached video info if it has not expired"""
+        entry = self._info_cache.get(url)
+        if not entry:
+            return None
+        cached_at, video_info = entry
+        if time.monotonic() - cached_at > self.info_cache_ttl:
+            self._info_cache.pop(url, None)
+            return None
+        self._info_cache.move_to_end(url)
+        return video_info
+    
+    def _store_cached_info(self, url: str, video_info: VideoInfo):
+        """Cache video info, evicting the least recently used entries"""
+        self._info_cache[url] = (time.monotonic(), video_info)
+        self._info_cache.move_to_end(url)
+        while len(self._info_cache) > self.info_cache_size:
+            self._info_cache.popitem(last=False)
+    
+    def _store_raw_info(self, url: str, ie_result: dict, cookies: List[http.cookiejar.Cookie]):
+        """Remember an unprocessed extraction result for the next download of url, with the
+        cookies the extraction left in its jar (session cookies the media URLs may need)"""
+        with self._raw_info_lock:
+            self._raw_info_cache[url] = (time.monotonic(), ie_result, [copy.copy(cookie) for cookie in cookies])
+            self._raw_info_cache.move_to_end(url)
+            while len(self._raw_info_cache) > self.raw_info_cache_size:
+                self._raw_info_cache.popitem(last=False)
+    
+    def _take_raw_info(self, url: str) -> Optional[Tuple[dict, List[http.cookiejar.Cookie]]]:
+        """Hand out a fresh extraction result and its cookies once; media URLs in it expire"""
+        with self._raw_info_lock:
+            entry = self._raw_info_cache.pop(url, None)
+        if not entry or time.monotonic() - entry[0] > self.info_cache_ttl:
+            return None
+        return entry[1], entry[2]
     
     def _extract_quality_options(self, info: dict, platform: PlatformType) -> List[QualityOption]:
         """Extract available quality options from video info"""
@@ -140,6 +380,10 @@ class VideoDownloaderService:
             if download_id in self.active_downloads:
                 progress = self.active_downloads[download_id]
                 
+                if progress.status == DownloadStatus.CANCELLED:
+                    # Raising from a hook is how yt-dlp lets callers abort a download
+                    raise yt_dlp.utils.DownloadCancelled('Download cancelled')
+                
                 if d['status'] == 'downloading':
                     progress.status = DownloadStatus.DOWNLOADING
                     
@@ -156,32 +400,184 @@ class VideoDownloaderService:
                     progress.eta = d.get('_eta_str', '')
                     progress.file_size = d.get('_total_bytes_str', '')
                     progress.current_file = d.get('filename', '')
+                    progress.downloaded_bytes = d.get('downloaded_bytes')
+                    progress.total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+                    
+                    if 'downloaded_bytes' in d and self.tuning.record_progress(download_id, d['downloaded_bytes']):
+                        self._apply_tuning(download_id)
                     
                 elif d['status'] == 'finished':
-                    progress.status = DownloadStatus.COMPLETED
+                    progress.status = (
+                        DownloadStatus.PROCESSING if download_id in self._postprocess_jobs
+                        else DownloadStatus.COMPLETED
+                    )
                     progress.progress_percent = 100.0
                     progress.current_file = d.get('filename', '')
                     
                 elif d['status'] == 'error':
                     progress.status = DownloadStatus.FAILED
                     progress.error_message = str(d.get('error', 'Unknown error'))
+                
+                self._publish_progress(download_id)
         
         return progress_hook
     
-    async def download_video(self, download_request: VideoDownload) -> VideoDownload:
-        """Download video from supported platforms with optimized speed"""
+    def _apply_tuning(self, download_id: str):
+        """Push the controller's current settings into the job's live yt-dlp params"""
+        job = self.tuning.get_job(download_id)
+        params = self._job_params.get(download_id)
+        if job and params is not None:
+            # yt-dlp reads these when it starts each file/fragment download
+            params['concurrent_fragment_downloads'] = job.concurrency
+            params['http_chunk_size'] = job.chunk_size
+    
+    def _apply_rate_limit(self, download_id: str, rate: Optional[float]):
+        """Push a re-balanced bandwidth share into the job's live yt-dlp params"""
+        if self.process_runner:
+            self.process_runner.set_rate_limit(download_id, rate)
+        params = self._job_params.get(download_id)
+        if params is not None:
+            # yt-dlp's HTTP downloader re-reads this for every chunk
+            params['ratelimit'] = rate
+    
+    def _publish_progress(self, download_id: str):
+        """Bump the progress version and wake long-poll waiters (thread-safe)"""
+        progress = self.active_downloads.get(download_id)
+        if not progress:
+            return
+        
+        with self._progress_lock:
+            progress.version += 1
+        
+        if self.progress_sink:
+            self.progress_sink(progress)
+        
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        
+        if running_loop is loop:
+            self._wake_progress_waiters(download_id)
+        else:
+            loop.call_soon_threadsafe(self._wake_progress_waiters, download_id)
+    
+    def _wake_progress_waiters(self, download_id: str):
+        """Release everyone waiting on the current progress event"""
+        event = self._progress_waiters.pop(download_id, None)
+        if event:
+            event.set()
+    
+    async def wait_for_progress(
+        self, 
+        download_id: str, 
+        since_version: int, 
+        timeout: float
+    ) -> Optional[DownloadProgress]:
+        """Wait until progress moves past since_version or the timeout expires"""
+        self._loop = asyncio.get_running_loop()
+        
+        progress = self.active_downloads.get(download_id)
+        if not progress or progress.version > since_version:
+            return progress
+        
+        event = self._progress_waiters.get(download_id)
+        if event is None:
+            event = asyncio.Event()
+            self._progress_waiters[download_id] = event
+        
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        
+        return self.active_downloads.get(download_id)
+    
+    def _init_progress(self, download_id: str):
+        """Start progress tracking, keeping versions monotonic across restarts of a job"""
+        previous = self.active_downloads.get(download_id)
+        self.active_downloads[download_id] = DownloadProgress(
+            download_id=download_id,
+            status=DownloadStatus.DOWNLOADING,
+            progress_percent=0.0,
+            version=previous.version if previous else 0
+        )
+        self._publish_progress(download_id)
+    
+    def _apply_remote_progress(self, snapshot: Dict[str, Any]):
+        """Mirror a progress snapshot sent by a worker process"""
+        download_id = snapshot.get('download_id')
+        progress = self.active_downloads.get(download_id)
+        if not progress:
+            return
+        if progress.status == DownloadStatus.CANCELLED and snapshot.get('status') == DownloadStatus.DOWNLOADING:
+            # The worker has not seen the cancellation yet
+            return
+        for field, value in snapshot.items():
+            if field not in ('download_id', 'version'):
+                setattr(progress, field, value)
+        self._publish_progress(download_id)
+    
+    async def _download_in_process(self, download_request: VideoDownload) -> VideoDownload:
+        """Run the whole job in a worker process; this process only tracks it"""
+        download_id = download_request.download_id
+        self._init_progress(download_id)
+        rate_limit = self.bandwidth.register_job(
+            download_id, download_request.user_id, download_request.platform.value
+        )
+        try:
+            # Phase timings come back on the record; the worker's own spans are not exported
+            with tracer.span('worker_process', trace_id=download_request.trace_id):
+                result = await self.process_runner.run(download_request, rate_limit)
+        except Exception as e:
+            logger.error(f"Worker process failed for {download_id}: {str(e)}")
+            result = download_request
+            result.status = DownloadStatus.FAILED
+            result.error_message = f"Worker process failed: {str(e)}"
+            result.error_class = ErrorClass.TRANSIENT.value
+        finally:
+            self.bandwidth.unregister_job(download_id)
+        
+        progress = self.active_downloads.get(download_id)
+        if progress:
+            progress.status = result.status
+            progress.error_message = result.error_message
+            if result.status == DownloadStatus.COMPLETED:
+                progress.progress_percent = 100.0
+            self._publish_progress(download_id)
+        return result
+    
+    async def download_video(
+        self, download_request: VideoDownload, on_handoff: Optional[Callable[[], None]] = None
+    ) -> VideoDownload:
+        """Download video from supported platforms with optimized speed.
+        
+        on_handoff is called once extraction has resolved a URL for the streaming
+        transfer engine; from then on the job is only bounded by the engine's limit.
+        """
         download_id = download_request.download_id
+        self._loop = asyncio.get_running_loop()
+        
+        if self.process_runner:
+            return await self._download_in_process(download_request)
         
         try:
             # Create download directory
             download_dir = self.downloads_dir / download_id
             download_dir.mkdir(exist_ok=True)
             
-            # Initialize progress tracking
-            self.active_downloads[download_id] = DownloadProgress(
-                download_id=download_id,
-                status=DownloadStatus.DOWNLOADING,
-                progress_percent=0.0
+            self._init_progress(download_id)
+            if download_request.profile:
+                self._start_job_profile(download_id)
+            
+            # Starting parallelism and chunk size come from what worked for this platform
+            tuning = self.tuning.start_job(download_id, download_request.platform.value)
+            rate_limit = self.bandwidth.register_job(
+                download_id, download_request.user_id, download_request.platform.value
             )
             
             # Optimized yt-dlp options for speed
@@ -202,18 +598,38 @@ class VideoDownloaderService:
                 'no_warnings': True,
                 'retries': 3,
                 'fragment_retries': 3,
+                # Spread yt-dlp's own retries out instead of firing them back to back
+                'retry_sleep_functions': {
+                    'http': lambda attempt: backoff_delay(attempt, 1.0, 30.0),
+                    'fragment': lambda attempt: backoff_delay(attempt, 1.0, 30.0),
+                    'extractor': lambda attempt: backoff_delay(attempt, 2.0, 30.0)
+                },
                 'skip_unavailable_fragments': True,
-                'concurrent_fragment_downloads': 8,  # Download 8 fragments concurrently
-                'http_chunk_size': 10485760,  # 10MB chunks for faster downloads
+                'concurrent_fragment_downloads': tuning.concurrency,  # Adjusted live by the tuning controller
+                'http_chunk_size': tuning.chunk_size,
                 'extractor_retries': 2,
                 'socket_timeout': 30,
                 'keepvideo': False,
-                'ratelimit': None,  # No rate limiting for max speed
+                'continuedl': True,  # Resume .part files left by an interrupted run
+                'merge_output_format': 'webm' if download_request.format == 'webm' else 'mp4',
+                'ratelimit': rate_limit,  # Fair share of the link, re-balanced as jobs come and go
                 'postprocessors': []
             }
             
-            # Add audio postprocessor for audio formats
-            if download_request.format in ['mp3', 'm4a', 'wav']:
+            # Clips: let yt-dlp fetch only the part covering the range and cut on keyframes,
+            # so nothing is re-encoded
+            if self._is_clip(download_request):
+                ydl_opts.update({
+                    'download_ranges': yt_dlp.utils.download_range_func(None, [self._clip_range(download_request)]),
+                    'force_keyframes_at_cuts': False
+                })
+            
+            # Add audio postprocessor for audio formats, unless the post-processing stage takes it.
+            # Whether it can be skipped is decided on the downloaded format, after the transfer:
+            # metadata of an earlier attempt may describe another one
+            if self.postprocess_offload and download_request.format in AUDIO_FORMATS:
+                self._postprocess_jobs.add(download_id)
+            elif download_request.format in ['mp3', 'm4a', 'wav']:
                 ydl_opts['postprocessors'].append({
                     'key': 'FFmpegExtractAudio',
                     'preferredcodec': download_request.format,
@@ -223,7 +639,8 @@ class VideoDownloaderService:
             # Platform-specific optimizations for speed
             if download_request.platform == PlatformType.YOUTUBE:
                 ydl_opts.update({
-                    'format': 'best[ext=mp4]/best',  # Prefer mp4 for faster processing
+                    # Separate adaptive streams for 1080p+, otherwise prefer one mp4 file
+                    'format': self._get_dash_selector(download_request.quality, download_request.format) or 'best[ext=mp4]/best',
                     'http_headers': {
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
                     },
@@ -257,28 +674,84 @@ class VideoDownloaderService:
                     }
                 })
             
-            # Run download in executor to avoid blocking
+            # Run extraction (and any yt-dlp transfer) in executor to avoid blocking
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self._perform_download, ydl_opts, download_request)
+            # The copied context carries the current trace span into the thread
+            profile = self._job_profiles.get(download_id)
+            perform = profile.sampling(self._perform_download) if profile else self._perform_download
+            transfer = await loop.run_in_executor(
+                self.transfer_executor, contextvars.copy_context().run, perform,
+                ydl_opts, download_request, self.async_transfers_enabled
+            )
+            if transfer is not None:
+                if on_handoff:
+                    on_handoff()
+                if profile:
+                    # The transfer runs on the event loop, which other work shares too
+                    profile.add_thread()
+                with trace_phase(download_request, 'transfer', strategy='async_stream'):
+                    await self._perform_async_transfer(transfer, download_request)
+                with trace_phase(download_request, 'finish'):
+                    await loop.run_in_executor(self.disk_executor, self._finish_download, download_request)
             
             return download_request
                 
         except Exception as e:
-            logger.error(f"Download failed for {download_id}: {str(e)}")
+            progress = self.active_downloads.get(download_id)
+            cancelled = isinstance(e, (yt_dlp.utils.DownloadCancelled, SegmentedDownloadCancelled)) or (
+                progress is not None and progress.status == DownloadStatus.CANCELLED
+            )
+            if cancelled:
+                logger.info(f"Download cancelled: {download_id}")
+            else:
+                classification = classify_error(e)
+                download_request.error_class = classification.error_class.value
+                download_request.retry_after = classification.retry_after
+                logger.error(f"Download failed for {download_id} ({classification.error_class.value}): {str(e)}")
             
-            download_request.status = DownloadStatus.FAILED
+            download_request.status = DownloadStatus.CANCELLED if cancelled else DownloadStatus.FAILED
             download_request.error_message = str(e)
             
             # Update progress
             if download_id in self.active_downloads:
-                self.active_downloads[download_id].status = DownloadStatus.FAILED
+                self.active_downloads[download_id].status = download_request.status
                 self.active_downloads[download_id].error_message = str(e)
+                self._publish_progress(download_id)
             
             return download_request
+        finally:
+            self.tuning.finish_job(download_id)
+            self.bandwidth.unregister_job(download_id)
+            self._job_params.pop(download_id, None)
+            self._postprocess_jobs.discard(download_id)
+            self._job_raw_info.pop(download_id, None)
+            if download_id in self._job_profiles:
+                await self._finish_job_profile(download_request)
+    
+    def _start_job_profile(self, download_id: str):
+        """Sample the threads this job runs on: its transfer thread and its own pools"""
+        self._job_profiles[download_id] = profiler.start_session(
+            f"job:{download_id}",
+            self.job_profile_max_seconds,
+            thread_filter=lambda ident, name: download_id in name
+        )
+    
+    async def _finish_job_profile(self, download_request: VideoDownload):
+        session = profiler.stop_session(self._job_profiles.pop(download_request.download_id))
+        path = self.profile_dir / f"{download_request.download_id}.collapsed"
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.disk_executor, write_profile, session, path)
+            download_request.profile_path = str(path)
+            logger.info(f"Profile of {download_request.download_id}: {session.samples} samples written to {path}")
+        except OSError as e:
+            logger.error(f"Failed to write profile of {download_request.download_id}: {str(e)}")
     
     def _get_format_selector(self, quality: str, platform: PlatformType, format_type: str = "mp4") -> str:
         """Get yt-dlp format selector based on quality, platform, and format"""
         # For audio formats, use audio-specific selectors
+        if format_type == 'mp3' and quality != "worst":
+            # A native mp3 stream, where offered, needs no re-encode
+            return "bestaudio[acodec=mp3]/bestaudio[ext=m4a]/bestaudio[ext=mp4]/bestaudio"
         if format_type in ['mp3', 'm4a', 'wav']:
             if quality == "best":
                 return "bestaudio[ext=m4a]/bestaudio[ext=mp4]/bestaudio"
@@ -311,6 +784,166 @@ class VideoDownloaderService:
             else:
                 return "best[ext=mp4]/best"
     
+    def _get_dash_selector(self, quality: str, format_type: str = "mp4") -> Optional[str]:
+        """Video+audio selector for qualities only offered as separate adaptive streams.
+        
+        Only an explicitly requested high resolution qualifies; "best" keeps the single
+        progressive file, so default jobs skip the parallel fetch and the ffmpeg merge.
+        """
+        if not self.dash_enabled or format_type in ['mp3', 'm4a', 'wav']:
+            return None
+        if not (quality.endswith('p') and quality[:-1].isdigit() and int(quality[:-1]) >= self.dash_min_height):
+            return None
+        
+        limit = f"[height<={quality[:-1]}]"
+        if format_type == "webm":
+            return f"bestvideo{limit}[ext=webm]+bestaudio[ext=webm]/best{limit}[ext=webm]/best{limit}/best"
+        return f"bestvideo{limit}[ext=mp4]+bestaudio[ext=m4a]/best{limit}[ext=mp4]/best{limit}/best"
+    
+    def is_playlist_url(self, url: str) -> bool:
+        """Detect playlist, channel and profile URLs"""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        path = parsed.path.lower()
+        
+        if "youtube.com" in host or "youtu.be" in host:
+            if path.startswith("/watch") or "youtu.be" in host or path.startswith("/shorts/"):
+                # A watch URL is only a playlist when there is no single video to resolve;
+                # youtu.be and /shorts/ links carry the video id in the path instead of v=
+                query = parse_qs(parsed.query)
+                has_video = "v" in query or ("youtu.be" in host and path.strip("/")) or path.startswith("/shorts/")
+                return "list" in query and not has_video
+            return path.startswith(("/playlist", "/@", "/channel/", "/c/", "/user/"))
+        elif "tiktok.com" in host:
+            return path.startswith("/@") and "/video/" not in path
+        return False
+    
+    async def iter_playlist_entries(self, url: str, buffer_size: int = 16) -> AsyncIterator[Dict[str, Any]]:
+        """Yield playlist/channel entries as yt-dlp enumerates them (flat, lazily paged).
+        
+        Entries are pulled buffer_size at a time on the enumeration pool, and only
+        when the consumer asks for more: a consumer that pauses (waiting for download
+        slots, say) holds no thread, and memory stays bounded however long the list is.
+        """
+        loop = asyncio.get_running_loop()
+        ydl = yt_dlp.YoutubeDL({
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+            'skip_download': True,
+        })
+        stop = threading.Event()
+        entries = self._walk_playlist(ydl, url, stop)
+        # A batch still running after its awaiting consumer went away must finish
+        # before the walk is closed
+        walk_lock = threading.Lock()
+        
+        def next_batch() -> List[Dict[str, Any]]:
+            with walk_lock:
+                return list(itertools.islice(entries, buffer_size))
+        
+        def close_walk():
+            stop.set()
+            with walk_lock:
+                entries.close()
+                ydl.close()
+        
+        try:
+            while True:
+                try:
+                    batch = await loop.run_in_executor(self.enumeration_executor, next_batch)
+                except Exception as e:
+                    raise ValueError(f"Failed to enumerate playlist: {str(e)}")
+                for entry in batch:
+                    yield entry
+                if len(batch) < buffer_size:
+                    return
+        finally:
+            await loop.run_in_executor(self.enumeration_executor, close_walk)
+    
+    def _walk_playlist(self, ydl, url: str, stop: threading.Event, depth: int = 0) -> Iterable[Dict[str, Any]]:
+        """Walk flat playlist entries, descending into nested playlists such as channel tabs"""
+        info = ydl.extract_info(url, download=False, process=False)
+        if info.get('_type') not in ('playlist', 'multi_video'):
+            yield self._flat_entry(info, url)
+            return
+        
+        for entry in self._iter_lazy_entries(info.get('entries') or []):
+            if stop.is_set():
+                return
+            if not entry:
+                continue
+            
+            is_nested = (
+                entry.get('_type') == 'playlist'
+                or entry.get('ie_key') in NESTED_PLAYLIST_IE_KEYS
+            )
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if is_nested and entry_url and depth < 2:
+                yield from self._walk_playlist(ydl, entry_url, stop, depth + 1)
+            elif entry_url:
+                yield self._flat_entry(entry, entry_url)
+    
+    @staticmethod
+    def _iter_lazy_entries(entries) -> Iterable[Dict[str, Any]]:
+        """Iterate entries page by page without materialising paged lists"""
+        if isinstance(entries, yt_dlp.utils.PagedList):
+            index = 0
+            while True:
+                page = entries.getslice(index, index + 50)
+                if not page:
+                    return
+                yield from page
+                index += len(page)
+        else:
+            yield from entries
+    
+    @staticmethod
+    def _flat_entry(entry: Dict[str, Any], url: str) -> Dict[str, Any]:
+        """Keep only the fields needed to queue an entry"""
+        return {
+            'id': entry.get('id'),
+            'url': entry.get('webpage_url') or url,
+            'title': entry.get('title'),
+            'ie_key': entry.get('ie_key') or entry.get('extractor_key'),
+        }
+    
+    def complete_postprocessing(self, download_request: VideoDownload):
+        """Publish the outcome of the post-processing stage to progress watchers"""
+        progress = self.active_downloads.get(download_request.download_id)
+        if progress:
+            progress.status = download_request.status
+            progress.error_message = download_request.error_message
+            if download_request.file_path:
+                progress.current_file = download_request.file_path
+            self._publish_progress(download_request.download_id)
+    
+    def partial_bytes(self, download_id: str) -> int:
+        """Bytes of partial transfer data an earlier run left in the job's directory"""
+        download_dir = self.downloads_dir / download_id
+        if not download_dir.is_dir():
+            return 0
+        return sum(f.stat().st_size for f in download_dir.glob('*.part') if f.is_file())
+    
+    def transfer_checkpoints(self) -> Dict[str, Tuple[int, Optional[int]]]:
+        """(downloaded, total) bytes of every job currently transferring"""
+        return {
+            download_id: (progress.downloaded_bytes, progress.total_bytes)
+            for download_id, progress in list(self.active_downloads.items())
+            if progress.status == DownloadStatus.DOWNLOADING and progress.downloaded_bytes
+        }
+    
+    def mark_retrying(self, download_id: str, delay: float, retry_count: int):
+        """Show a failed job as waiting for its next attempt"""
+        progress = self.active_downloads.get(download_id)
+        if progress:
+            progress.status = DownloadStatus.PENDING
+            progress.error_message = f"{progress.error_message or 'Download failed'} (retry {retry_count} in {delay:.0f}s)"
+            progress.speed = None
+            progress.eta = None
+            self._publish_progress(download_id)
+    
     def get_download_progress(self, download_id: str) -> Optional[DownloadProgress]:
         """Get current download progress"""
         return self.active_downloads.get(download_id)
@@ -319,8 +952,10 @@ class VideoDownloaderService:
         """Cancel an active download"""
         if download_id in self.active_downloads:
             self.active_downloads[download_id].status = DownloadStatus.CANCELLED
-            # Note: yt-dlp doesn't have a direct cancel mechanism
-            # In a production environment, you'd use a more sophisticated approach
+            self._publish_progress(download_id)
+            if self.process_runner:
+                self.process_runner.cancel(download_id)
+            # The progress hook and the segmented downloader see the status and abort
             return True
         return False
     
@@ -330,6 +965,7 @@ class VideoDownloaderService:
             # Remove from active downloads
             if download_id in self.active_downloads:
                 del self.active_downloads[download_id]
+            self._wake_progress_waiters(download_id)
             
             # Remove download directory
             download_dir = self.downloads_dir / download_id
@@ -337,19 +973,42 @@ class VideoDownloaderService:
                 import shutil
                 shutil.rmtree(download_dir)
             
+            # Profiles live outside the download directory
+            (self.profile_dir / f"{download_id}.collapsed").unlink(missing_ok=True)
+            
             return True
         except Exception as e:
             logger.error(f"Failed to cleanup download {download_id}: {str(e)}")
             return False
             
-    def _perform_download(self, ydl_opts: dict, download_request: VideoDownload):
-        """Perform the actual download in a separate thread"""
+    def _perform_download(
+        self, ydl_opts: dict, download_request: VideoDownload, direct_transfer: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Perform the actual download in a separate thread.
+        
+        With direct_transfer, a progressive HTTP format is not fetched here: the resolved
+        URL, headers and target filename are returned for the asyncio transfer engine.
+        """
         download_id = download_request.download_id
-        download_dir = self.downloads_dir / download_id
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Extract info first
-            info = ydl.extract_info(download_request.url, download=False)
+            self._job_params[download_id] = ydl.params
+            
+            # Extract info first, reusing the result of a recent validation when there is one
+            with trace_phase(download_request, 'extract') as span:
+                reused = self._take_raw_info(download_request.url)
+                span.set_attribute('reused_validation', reused is not None)
+                if reused is not None:
+                    # The job's own instance never saw the extraction, so it takes over
+                    # the cookies the pooled instance was given along the way
+                    ie_result, cookies = reused
+                    for cookie in cookies:
+                        ydl.cookiejar.set_cookie(cookie)
+                    self.raw_info_reuses += 1
+                else:
+                    ie_result = self._extract_raw_info(ydl, download_request.url)
+                self._job_raw_info[download_id] = ie_result
+                info = ydl.process_ie_result(copy.deepcopy(ie_result), download=False)
             
             # Check if video is accessible
             if info.get('availability') in ['private', 'premium_only', 'subscriber_only']:
@@ -366,7 +1025,11 @@ class VideoDownloaderService:
                 view_count=info.get('view_count'),
                 platform=download_request.platform,
                 format=download_request.format,
-                file_size=str(info.get('filesize_approx', '')) if info.get('filesize_approx') is not None else None
+                file_size=str(info.get('filesize_approx', '')) if info.get('filesize_approx') is not None else None,
+                video_id=info.get('id'),
+                container=info.get('ext'),
+                video_codec=info.get('vcodec'),
+                audio_codec=info.get('acodec')
             )
             
             # Update download record with metadata
@@ -374,25 +1037,353 @@ class VideoDownloaderService:
             download_request.status = DownloadStatus.DOWNLOADING
             
             # Start actual download
-            ydl.download([download_request.url])
-            
-            # Find downloaded file
-            downloaded_files = list(download_dir.glob('*'))
-            if downloaded_files:
-                main_file = max(downloaded_files, key=lambda f: f.stat().st_size)
-                download_request.file_path = str(main_file)
-                
-                # Update file size with actual size
-                actual_size = main_file.stat().st_size
-                download_request.metadata.file_size = f"{actual_size / (1024*1024):.1f} MB"
+            if direct_transfer and self._is_direct_progressive(info, download_request):
+                return {
+                    'url': info['url'],
+                    'headers': self._transfer_headers(ydl, info),
+                    'filename': ydl.prepare_filename(info),
+                    'parallel': self._can_download_segmented(info, download_request)
+                }
+            with trace_phase(download_request, 'transfer') as span:
+                if self._is_clip(download_request):
+                    span.set_attribute('strategy', 'clip')
+                    self._perform_clip_download(ydl, info, download_request)
+                elif self._can_download_dash(info, download_request):
+                    span.set_attribute('strategy', 'dash_parallel')
+                    self._perform_dash_download(ydl, info, download_request)
+                elif self._can_download_segmented(info, download_request):
+                    span.set_attribute('strategy', 'segmented')
+                    self._perform_segmented_download(ydl, info, download_request)
+                else:
+                    span.set_attribute('strategy', 'ytdlp')
+                    self._download_with_info(ydl, download_request)
+        
+        with trace_phase(download_request, 'finish'):
+            self._finish_download(download_request)
+        return None
+    
+    def _finish_download(self, download_request: VideoDownload):
+        """Record the downloaded file and hand conversions to the post-processing stage"""
+        download_id = download_request.download_id
+        download_dir = self.downloads_dir / download_id
+        
+        # Find downloaded file, ignoring partial data of abandoned attempts
+        downloaded_files = [
+            f for f in download_dir.glob('*')
+            if f.is_file() and not f.name.endswith(PARTIAL_SUFFIXES)
+        ]
+        if downloaded_files:
+            main_file = max(downloaded_files, key=lambda f: f.stat().st_size)
+            download_request.file_path = str(main_file)
             
+            # Update file size with actual size
+            actual_size = main_file.stat().st_size
+            download_request.metadata.file_size = f"{actual_size / (1024*1024):.1f} MB"
+        
+        # Bytes have landed; conversions are handed to the post-processing stage,
+        # unless the source already is the requested audio format
+        if download_id in self._postprocess_jobs and download_request.file_path and not needs_postprocessing(download_request):
+            finish_without_conversion(download_request)
+            self._postprocess_jobs.discard(download_id)
+        
+        if download_id in self._postprocess_jobs:
+            download_request.status = DownloadStatus.PROCESSING
+        else:
             download_request.status = DownloadStatus.COMPLETED
             download_request.completed_at = datetime.utcnow()
-            
-            # Update progress
-            if download_id in self.active_downloads:
-                self.active_downloads[download_id].status = DownloadStatus.COMPLETED
-                self.active_downloads[download_id].progress_percent = 100.0
+        
+        # Update progress
+        if download_id in self.active_downloads:
+            self.active_downloads[download_id].status = download_request.status
+            self.active_downloads[download_id].progress_percent = 100.0
+            self._publish_progress(download_id)
+    
+    def _download_with_info(self, ydl, download_request: VideoDownload):
+        """Let yt-dlp download from the job's extraction result, without extracting again"""
+        ie_result = self._job_raw_info.get(download_request.download_id)
+        if ie_result is None:
+            ydl.download([download_request.url])
+            return
+        ydl.process_ie_result(copy.deepcopy(ie_result), download=True)
+    
+    def _is_direct_progressive(self, info: dict, download_request: VideoDownload) -> bool:
+        """Check whether the selected format is one progressive HTTP file we can fetch ourselves"""
+        if self._is_clip(download_request):
+            return False
+        
+        # Multi-format merges, and audio extraction unless it is offloaded, need yt-dlp's postprocessors
+        if info.get('requested_formats'):
+            return False
+        if download_request.format in ['mp3', 'm4a', 'wav'] and not self.postprocess_offload:
+            return False
+        
+        return info.get('protocol') in ('http', 'https') and bool(info.get('url'))
+    
+    def _can_download_segmented(self, info: dict, download_request: VideoDownload) -> bool:
+        """Check whether the selected format is one progressive HTTP file worth splitting"""
+        if not self.segmented_enabled or not self._is_direct_progressive(info, download_request):
+            return False
+        
+        size = info.get('filesize') or info.get('filesize_approx')
+        return not size or size >= self.segmented_min_size
+    
+    @staticmethod
+    def _transfer_headers(ydl, fmt: dict, fallback: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """Request headers for fetching fmt with our own engines.
+        
+        yt-dlp strips Cookie from http_headers and keeps cookies in its jar, so the
+        ones set by the extractor or the user are added back for the format's URL.
+        """
+        headers = dict(fmt.get('http_headers') or fallback or {})
+        cookie_header = ydl.cookiejar.get_cookie_header(fmt['url'])
+        if cookie_header:
+            headers['Cookie'] = cookie_header
+        return headers or None
+    
+    def _transfer_progress_callback(self, download_id: str, filename: str):
+        """Progress callback for our own transfer engines that reports like yt-dlp"""
+        progress_hook = self.create_progress_hook(download_id)
+        
+        def on_progress(downloaded: int, total: int, speed: float):
+            eta = (total - downloaded) / speed if speed else None
+            progress_hook({
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total,
+                '_speed_str': f"{yt_dlp.utils.format_bytes(speed)}/s",
+                '_eta_str': yt_dlp.utils.formatSeconds(int(eta)) if eta is not None else '',
+                '_total_bytes_str': yt_dlp.utils.format_bytes(total),
+                'filename': filename
+            })
+        
+        return on_progress
+    
+    def _perform_segmented_download(self, ydl, info: dict, download_request: VideoDownload):
+        """Fetch a progressive format over parallel range requests, reporting like yt-dlp"""
+        download_id = download_request.download_id
+        filename = ydl.prepare_filename(info)
+        progress_hook = self.create_progress_hook(download_id)
+        on_progress = self._transfer_progress_callback(download_id, filename)
+        
+        def should_cancel() -> bool:
+            progress = self.active_downloads.get(download_id)
+            return progress is not None and progress.status == DownloadStatus.CANCELLED
+        
+        def on_throttle():
+            self.tuning.record_throttle(download_id)
+            self._apply_tuning(download_id)
+        
+        try:
+            self.segmented_downloader.download(
+                info['url'],
+                filename,
+                headers=self._transfer_headers(ydl, info),
+                progress_callback=on_progress,
+                should_cancel=should_cancel,
+                connection_limit=lambda: self.tuning.get_concurrency(download_id),
+                on_throttle=on_throttle,
+                rate_limit=lambda: self.bandwidth.get_rate(download_id),
+                thread_name_prefix=f"segment-{download_id}"
+            )
+        except RangeNotSupported:
+            logger.info(f"Range requests rejected for {download_id}, falling back to yt-dlp")
+            self._download_with_info(ydl, download_request)
+            return
+        
+        progress_hook({'status': 'finished', 'filename': filename})
+    
+    async def _perform_async_transfer(self, transfer: Dict[str, Any], download_request: VideoDownload):
+        """Stream a resolved progressive URL on the event loop, without holding a thread"""
+        download_id = download_request.download_id
+        filename = transfer['filename']
+        
+        def should_cancel() -> bool:
+            progress = self.active_downloads.get(download_id)
+            return progress is not None and progress.status == DownloadStatus.CANCELLED
+        
+        def on_throttle():
+            self.tuning.record_throttle(download_id)
+        
+        started = time.monotonic()
+        await self.async_transfer.download(
+            transfer['url'],
+            filename,
+            headers=transfer['headers'],
+            progress_callback=self._transfer_progress_callback(download_id, filename),
+            should_cancel=should_cancel,
+            # Small files and servers below the split threshold stay on one connection
+            connection_limit=(lambda: self.tuning.get_concurrency(download_id)) if transfer['parallel'] else (lambda: 1),
+            on_throttle=on_throttle,
+            rate_limit=lambda: self.bandwidth.get_rate(download_id)
+        )
+        self.create_progress_hook(download_id)({'status': 'finished', 'filename': filename})
+        download_request.pipeline_stats = {
+            'strategy': 'async_stream',
+            'parallel': transfer['parallel'],
+            'transfer_seconds': round(time.monotonic() - started, 3)
+        }
+    
+    @staticmethod
+    def _is_clip(download_request: VideoDownload) -> bool:
+        return download_request.start_time is not None or download_request.end_time is not None
+    
+    @staticmethod
+    def _clip_range(download_request: VideoDownload) -> Tuple[float, float]:
+        """(start, end) in seconds; an open end runs to the end of the video"""
+        start = download_request.start_time or 0.0
+        end = download_request.end_time if download_request.end_time is not None else float('inf')
+        return start, end
+    
+    def _perform_clip_download(self, ydl, info: dict, download_request: VideoDownload):
+        """Download only the requested time range of the video"""
+        start, end = self._clip_range(download_request)
+        duration = info.get('duration')
+        if duration and start >= duration:
+            raise ValueError(f"Clip starts at {start:g}s but the video is only {duration:g}s long")
+        
+        clip_end = min(end, duration) if duration else end
+        started = time.monotonic()
+        self._download_with_info(ydl, download_request)
+        download_request.pipeline_stats = {
+            'strategy': 'clip',
+            'clip_start': start,
+            'clip_seconds': round(clip_end - start, 3) if clip_end != float('inf') else None,
+            'source_duration': duration,
+            'transfer_seconds': round(time.monotonic() - started, 3)
+        }
+    
+    def _can_download_dash(self, info: dict, download_request: VideoDownload) -> bool:
+        """Check whether the selection is one video and one audio stream we can fetch directly"""
+        # Clips go through yt-dlp's range download; these paths always fetch whole files
+        if not self.dash_enabled or not self.segmented_enabled or self._is_clip(download_request):
+            return False
+        
+        formats = info.get('requested_formats') or []
+        if len(formats) != 2 or download_request.format in ['mp3', 'm4a', 'wav']:
+            return False
+        
+        has_video = any(fmt.get('vcodec') not in (None, 'none') for fmt in formats)
+        has_audio = any(fmt.get('acodec') not in (None, 'none') for fmt in formats)
+        return has_video and has_audio and all(
+            fmt.get('protocol') in ('http', 'https') and fmt.get('url') for fmt in formats
+        )
+    
+    def _perform_dash_download(self, ydl, info: dict, download_request: VideoDownload):
+        """Fetch the video and audio streams concurrently, then stream-copy them into one file"""
+        download_id = download_request.download_id
+        filename = ydl.prepare_filename(info)
+        base, ext = os.path.splitext(filename)
+        progress_hook = self.create_progress_hook(download_id)
+        
+        # Video first so the output's stream order matches yt-dlp's merger
+        formats = sorted(info['requested_formats'], key=lambda fmt: fmt.get('vcodec') in (None, 'none'))
+        stream_paths = [f"{base}.f{fmt['format_id']}.{fmt.get('ext') or ext.lstrip('.')}" for fmt in formats]
+        
+        lock = threading.Lock()
+        stream_progress = [(0, fmt.get('filesize') or fmt.get('filesize_approx') or 0, 0.0) for fmt in formats]
+        failed = threading.Event()
+        
+        def make_progress_callback(index: int):
+            def on_progress(downloaded: int, total: int, speed: float):
+                with lock:
+                    stream_progress[index] = (downloaded, total, speed)
+                    downloaded = sum(item[0] for item in stream_progress)
+                    total = sum(item[1] for item in stream_progress) or downloaded
+                    speed = sum(item[2] for item in stream_progress)
+                eta = (total - downloaded) / speed if speed else None
+                progress_hook({
+                    'status': 'downloading',
+                    'downloaded_bytes': downloaded,
+                    'total_bytes': total,
+                    '_speed_str': f"{yt_dlp.utils.format_bytes(speed)}/s",
+                    '_eta_str': yt_dlp.utils.formatSeconds(int(eta)) if eta is not None else '',
+                    '_total_bytes_str': yt_dlp.utils.format_bytes(total),
+                    'filename': filename
+                })
+            return on_progress
+        
+        def should_cancel() -> bool:
+            # A failed stream stops its sibling instead of letting it run to completion
+            progress = self.active_downloads.get(download_id)
+            return failed.is_set() or (progress is not None and progress.status == DownloadStatus.CANCELLED)
+        
+        def on_throttle():
+            self.tuning.record_throttle(download_id)
+            self._apply_tuning(download_id)
+        
+        # Both streams draw from one bucket so together they stay within the job's share
+        bucket = TokenBucket(lambda: self.bandwidth.get_rate(download_id))
+        
+        def fetch(index: int):
+            try:
+                self.segmented_downloader.download(
+                    formats[index]['url'],
+                    stream_paths[index],
+                    headers=self._transfer_headers(ydl, formats[index], info.get('http_headers')),
+                    progress_callback=make_progress_callback(index),
+                    should_cancel=should_cancel,
+                    # Split the job's connections between the two streams
+                    connection_limit=lambda: max(1, self.tuning.get_concurrency(download_id) // 2),
+                    on_throttle=on_throttle,
+                    bucket=bucket,
+                    thread_name_prefix=f"segment-{download_id}"
+                )
+            except BaseException:
+                failed.set()
+                raise
+        
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=len(formats), thread_name_prefix=f"dash-{download_id}") as pool:
+                for future in [pool.submit(fetch, index) for index in range(len(formats))]:
+                    future.result()
+        except RangeNotSupported:
+            logger.info(f"Range requests rejected for {download_id}, falling back to yt-dlp")
+            self._download_with_info(ydl, download_request)
+            return
+        transfer_seconds = time.monotonic() - started
+        
+        # Merge starts the moment the slower stream lands; no re-encode
+        merge_started = time.monotonic()
+        with trace_phase(download_request, 'merge'):
+            self._merge_streams(stream_paths[0], stream_paths[1], filename)
+        merge_seconds = time.monotonic() - merge_started
+        
+        # Inputs and output all exist on disk at the end of the merge
+        peak_disk_bytes = sum(os.path.getsize(path) for path in [*stream_paths, filename])
+        if not ydl.params.get('keepvideo'):
+            for path in stream_paths:
+                os.remove(path)
+        
+        download_request.pipeline_stats = {
+            'strategy': 'dash_parallel',
+            'formats': [fmt['format_id'] for fmt in formats],
+            'transfer_seconds': round(transfer_seconds, 3),
+            'merge_seconds': round(merge_seconds, 3),
+            'peak_disk_bytes': peak_disk_bytes
+        }
+        logger.info(
+            f"DASH download {download_id}: transfer {transfer_seconds:.1f}s, merge {merge_seconds:.1f}s, "
+            f"peak disk {peak_disk_bytes / (1024 * 1024):.1f} MB"
+        )
+        progress_hook({'status': 'finished', 'filename': filename})
+    
+    def _merge_streams(self, video_path: str, audio_path: str, output_path: str):
+        """Remux a video and an audio stream into one container without re-encoding"""
+        base, ext = os.path.splitext(output_path)
+        temp_path = f"{base}.temp{ext}"
+        command = [
+            self.ffmpeg_path, '-y', '-loglevel', 'error', '-nostdin',
+            '-i', video_path, '-i', audio_path,
+            '-map', '0:v:0', '-map', '1:a:0', '-c', 'copy',
+            temp_path
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise SegmentedDownloadError(f"Stream merge failed: {result.stderr.strip()[-500:]}")
+        os.replace(temp_path, output_path)
     
     def get_platform_quality_options(self, platform: PlatformType) -> List[QualityOption]:
         """Get available quality options for a platform"""
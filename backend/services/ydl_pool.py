@@ -0,0 +1,148 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Any
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Extractors each platform's URLs resolve to, initialized ahead of the first request
+PLATFORM_EXTRACTORS = {
+    'youtube': ['Youtube', 'YoutubeTab'],
+    'instagram': ['Instagram'],
+    'tiktok': ['TikTok'],
+    'facebook': ['Facebook'],
+}
+
+class YoutubeDLPool:
+    """Per-platform pools of warm YoutubeDL instances for metadata extraction.
+
+    An instance keeps its initialized extractors, cookie jar and HTTP connection
+    pool between jobs, so repeat requests to the same platform skip the setup and
+    the TLS handshakes. YoutubeDL is not thread-safe: each instance is checked out
+    by one job at a time and recycled after max_uses jobs.
+    """
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        max_size: int = 4,
+        max_uses: int = 500,
+        wait_timeout: float = 5.0,
+        factory: Callable[[Dict[str, Any]], Any] = yt_dlp.YoutubeDL
+    ):
+        self.params = params
+        self.max_size = max(1, max_size)
+        self.max_uses = max_uses
+        self.wait_timeout = wait_timeout
+        self.factory = factory
+        self._idle: Dict[str, List[Any]] = {}
+        self._uses: Dict[int, int] = {}
+        self._sizes: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self.created_count = 0
+        self.reused_count = 0
+        self.overflow_count = 0
+
+    def warm(self, keys: Iterable[str]):
+        """Create one instance per key and initialize its extractors (blocking)"""
+        for key in keys:
+            with self._condition:
+                if self._idle.get(key) or self._sizes.get(key, 0) >= self.max_size:
+                    continue
+                self._sizes[key] = self._sizes.get(key, 0) + 1
+            ydl = self._create(key)
+            with self._condition:
+                self._idle.setdefault(key, []).append(ydl)
+                self._condition.notify()
+
+    @contextmanager
+    def checkout(self, key: str) -> Iterator[Any]:
+        """Borrow an instance for key, creating one while the pool has room"""
+        ydl, pooled = self._acquire(key)
+        try:
+            yield ydl
+        finally:
+            if pooled:
+                self._release(key, ydl)
+            else:
+                ydl.close()
+
+    def close(self):
+        """Close every idle instance"""
+        with self._condition:
+            idle = [ydl for instances in self._idle.values() for ydl in instances]
+            self._idle.clear()
+            self._sizes.clear()
+        for ydl in idle:
+            self._close(ydl)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "created": self.created_count,
+                "reused": self.reused_count,
+                "overflow": self.overflow_count,
+                "idle": {key: len(instances) for key, instances in self._idle.items()},
+                "size": dict(self._sizes)
+            }
+
+    def _acquire(self, key: str):
+        deadline = time.monotonic() + self.wait_timeout
+        with self._condition:
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    self.reused_count += 1
+                    # LIFO: the most recently used instance has the warmest connections
+                    return idle.pop(), True
+                if self._sizes.get(key, 0) < self.max_size:
+                    self._sizes[key] = self._sizes.get(key, 0) + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Never stall extraction on a busy pool; use a throwaway instance
+                    self.overflow_count += 1
+                    return self.factory(self.params), False
+                self._condition.wait(timeout=remaining)
+        try:
+            return self._create(key), True
+        except BaseException:
+            with self._condition:
+                self._sizes[key] -= 1
+            raise
+
+    def _release(self, key: str, ydl: Any):
+        uses = self._uses.get(id(ydl), 0) + 1
+        with self._condition:
+            if uses >= self.max_uses:
+                self._sizes[key] = max(0, self._sizes.get(key, 0) - 1)
+                self._uses.pop(id(ydl), None)
+                retire = True
+            else:
+                self._uses[id(ydl)] = uses
+                self._idle.setdefault(key, []).append(ydl)
+                retire = False
+            self._condition.notify()
+        if retire:
+            self._close(ydl)
+
+    def _create(self, key: str) -> Any:
+        ydl = self.factory(self.params)
+        self.created_count += 1
+        for ie_key in PLATFORM_EXTRACTORS.get(key, []):
+            try:
+                ydl.get_info_extractor(ie_key)
+            except Exception as e:
+                logger.debug(f"Could not pre-initialize extractor {ie_key}: {str(e)}")
+        return ydl
+
+    def _close(self, ydl: Any):
+        self._uses.pop(id(ydl), None)
+        try:
+            ydl.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled YoutubeDL: {str(e)}")
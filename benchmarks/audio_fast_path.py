@@ -0,0 +1,82 @@
+"""CPU time of the audio post-processing paths: transcode vs stream copy vs skip.
+
+Generates a synthetic AAC source with ffmpeg, then runs each path the
+post-processing stage can take and prints the CPU seconds (including ffmpeg's)
+as JSON. Requires ffmpeg and ffprobe on PATH.
+
+    python benchmarks/audio_fast_path.py --duration 300
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from models.video import PlatformType, VideoDownload, VideoMetadata  # noqa: E402
+from services.postprocessing import extract_audio, finish_without_conversion, _cpu_seconds  # noqa: E402
+
+
+def make_source(path: Path, duration: int, with_video: bool):
+    """Synthetic AAC audio, optionally muxed next to a small video stream"""
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}"]
+    if with_video:
+        command += ["-f", "lavfi", "-i", f"testsrc=size=320x240:rate=25:duration={duration}", "-c:v", "libx264"]
+    command += ["-c:a", "aac", "-b:a", "128k", str(path)]
+    subprocess.run(command, check=True)
+
+
+def measure(name: str, run) -> dict:
+    cpu_started, wall_started = _cpu_seconds(), time.monotonic()
+    run()
+    return {
+        "path": name,
+        "cpu_seconds": round(_cpu_seconds() - cpu_started, 3),
+        "wall_seconds": round(time.monotonic() - wall_started, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=int, default=120, help="source length in seconds")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        sys.exit("ffmpeg and ffprobe are required")
+
+    workdir = Path(tempfile.mkdtemp(prefix="audio-bench-"))
+    audio_source = workdir / "source.m4a"
+    video_source = workdir / "source.mp4"
+    make_source(audio_source, args.duration, with_video=False)
+    make_source(video_source, args.duration, with_video=True)
+
+    def fresh_copy(source: Path, name: str) -> str:
+        target = workdir / name
+        shutil.copy(source, target)
+        return str(target)
+
+    def skip():
+        download = VideoDownload(
+            download_id="bench", url="https://youtube.com/watch?v=bench", platform=PlatformType.YOUTUBE,
+            quality="best", format="m4a", file_path=fresh_copy(audio_source, "skip.mp4"),
+            metadata=VideoMetadata(title="bench", platform=PlatformType.YOUTUBE,
+                                   container="mp4", video_codec="none", audio_codec="mp4a.40.2")
+        )
+        finish_without_conversion(download)
+
+    results = [
+        measure("transcode aac -> mp3 320k", lambda: extract_audio(fresh_copy(audio_source, "t.m4a"), "mp3", "320")),
+        measure("remux aac out of mp4 -> m4a", lambda: extract_audio(fresh_copy(video_source, "r.mp4"), "m4a", "0")),
+        measure("skip (already m4a)", skip),
+    ]
+    print(json.dumps({"source_seconds": args.duration, "results": results}, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""End-to-end download throughput and API latency, offline.
+
+Runs the real API and download pipeline in-process: jobs are started through
+POST /api/download/start, queued, extracted by a fake extractor, fetched from the
+local media fixture server (with optional bandwidth, latency and fault shaping)
+and finished, while a prober measures API latency. MongoDB is replaced by an
+in-memory repository. For each concurrency level prints jobs/s, MB/s, p50/p99
+time to complete and API latency as JSON, so runs can be compared.
+
+    python benchmarks/throughput.py --concurrency 1,4,16 --jobs 32 --size-mb 8
+    python benchmarks/throughput.py --bandwidth-mb 4 --latency 0.05 --faults 2 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "backend"))
+sys.path.append(str(ROOT))
+
+# The server module creates its downloads directory and Mongo client on import
+os.chdir(tempfile.mkdtemp(prefix="throughput-bench-"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "throughput_benchmark")
+
+import httpx  # noqa: E402
+import yt_dlp  # noqa: E402
+
+import server  # noqa: E402
+from models.video import DownloadStatus  # noqa: E402
+from services.admission import AdmissionController  # noqa: E402
+from services.download_queue import DownloadQueue, percentile  # noqa: E402
+from services.loop_watchdog import LoopWatchdog  # noqa: E402
+from services.video_downloader import VideoDownloaderService  # noqa: E402
+from tests.fake_extractor import FakeExtractor  # noqa: E402
+from tests.media_server import MediaServer  # noqa: E402
+
+FINAL_STATUSES = {DownloadStatus.COMPLETED, DownloadStatus.FAILED, DownloadStatus.CANCELLED}
+MB = 1024 * 1024
+
+
+class InMemoryRepository:
+    """The parts of VideoRepository the download path uses, noting when jobs finish"""
+
+    def __init__(self):
+        self.records = {}
+        self.finished_at = {}
+        self.all_finished = asyncio.Event()
+        self.expected = 0
+
+    async def create_download(self, record):
+        self.records[record.download_id] = record.model_copy()
+
+    async def update_download(self, record):
+        self.records[record.download_id] = record.model_copy()
+        if record.status in FINAL_STATUSES and record.download_id not in self.finished_at:
+            self.finished_at[record.download_id] = time.monotonic()
+            if len(self.finished_at) >= self.expected:
+                self.all_finished.set()
+
+    async def get_download_by_id(self, download_id):
+        return self.records.get(download_id)
+
+
+class NoArchive:
+    async def mark_completed(self, *args):
+        pass
+
+    async def release_pending(self, *args):
+        pass
+
+
+def latency_summary(samples) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 2) if samples else None,
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2) if samples else None,
+        "max_ms": round(max(samples) * 1000, 2) if samples else None
+    }
+
+
+async def timed_request(client, method: str, path: str, samples: list, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    samples.append(time.perf_counter() - started)
+    return response
+
+
+async def probe_api(client, repository: InMemoryRepository, latencies: dict, interval: float):
+    """Poll progress and pipeline state the way the UI does, until every job is done"""
+    while not repository.all_finished.is_set():
+        if repository.records:
+            download_id = random.choice(list(repository.records))
+            await timed_request(client, "GET", f"/api/download/progress/{download_id}", latencies["progress"])
+        await timed_request(client, "GET", "/api/system/pipeline", latencies["pipeline"])
+        await asyncio.sleep(interval)
+
+
+async def run_scenario(args, concurrency: int) -> dict:
+    media = MediaServer(
+        bandwidth=int(args.bandwidth_mb * MB) if args.bandwidth_mb else None,
+        latency=args.latency
+    ).start()
+    extractor = FakeExtractor(media, latency=args.extract_latency)
+    urls = [extractor.add_video(f"bench{index:05d}", int(args.size_mb * MB)) for index in range(args.jobs)]
+    for path in list(media.files):
+        media.failures[path] = args.faults
+
+    service = VideoDownloaderService(extractor=extractor)
+    repository = InMemoryRepository()
+    repository.expected = args.jobs
+    queue = DownloadQueue(max_workers=concurrency)
+    server.video_downloader = service
+    server.video_repository = repository
+    server.archive_repository = NoArchive()
+    server.download_queue = queue
+    server.admission_controller = AdmissionController(queue)
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+    watchdog_task = asyncio.create_task(watchdog.run())
+
+    latencies = {"start": [], "progress": [], "pipeline": []}
+    submitted_at = {}
+    queue.start(server.process_download)
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            prober = asyncio.create_task(probe_api(client, repository, latencies, args.probe_interval))
+            started = time.monotonic()
+
+            async def submit(url: str):
+                response = await timed_request(client, "POST", "/api/download/start", latencies["start"], json={
+                    "url": url, "quality": "best", "format": "mp4", "educational_purpose": True
+                })
+                response.raise_for_status()
+                submitted_at[response.json()["download_id"]] = time.monotonic()
+
+            await asyncio.gather(*[submit(url) for url in urls])
+            await asyncio.wait_for(repository.all_finished.wait(), args.timeout)
+            wall = time.monotonic() - started
+            await prober
+    finally:
+        await queue.stop()
+        watchdog_task.cancel()
+        await service.async_transfer.aclose()
+        service.shutdown_executors()
+        service.extraction_pool.close()
+        media.stop()
+
+    records = repository.records.values()
+    completed = [record for record in records if record.status == DownloadStatus.COMPLETED]
+    total_bytes = sum(os.path.getsize(record.file_path) for record in completed if record.file_path)
+    time_to_complete = [
+        repository.finished_at[download_id] - submitted
+        for download_id, submitted in submitted_at.items() if download_id in repository.finished_at
+    ]
+    strategies = {}
+    for record in completed:
+        strategy = (record.pipeline_stats or {}).get("strategy", "ytdlp")
+        strategies[strategy] = strategies.get(strategy, 0) + 1
+
+    return {
+        "concurrency": concurrency,
+        "jobs": args.jobs,
+        "completed": len(completed),
+        "failed": args.jobs - len(completed),
+        "wall_seconds": round(wall, 3),
+        "jobs_per_second": round(len(completed) / wall, 3),
+        "mb_per_second": round(total_bytes / MB / wall, 3),
+        "time_to_complete": {
+            "p50_seconds": round(percentile(time_to_complete, 0.5), 3),
+            "p99_seconds": round(percentile(time_to_complete, 0.99), 3)
+        },
+        "api_latency": {endpoint: latency_summary(samples) for endpoint, samples in latencies.items()},
+        "event_loop": {"max_lag_ms": round(watchdog.max_lag * 1000, 2), "blocked_count": watchdog.blocked_count},
+        "strategies": strategies,
+        "extractions": extractor.calls,
+        "http_requests": len(media.requests),
+        "tcp_connections": media.connections
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrent download levels")
+    parser.add_argument("--jobs", type=int, default=32, help="downloads started per scenario")
+    parser.add_argument("--size-mb", type=float, default=8, help="size of each synthetic video")
+    parser.add_argument("--bandwidth-mb", type=float, default=0, help="per-connection server bandwidth (MB/s, 0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0.0, help="server time to first byte (seconds)")
+    parser.add_argument("--faults", type=int, default=0, help="range requests per file answered 503 before succeeding")
+    parser.add_argument("--extract-latency", type=float, default=0.0, help="time each fake extraction takes (seconds)")
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="pause between API latency probes (seconds)")
+    parser.add_argument("--timeout", type=float, default=600, help="give up on a scenario after this long (seconds)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Per-job logs would swamp the run; warnings and errors still show on stderr
+    logging.getLogger().setLevel(logging.WARNING)
+    results = [asyncio.run(run_scenario(args, int(level))) for level in args.concurrency.split(",")]
+    report = {
+        "benchmark": "throughput",
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "environment": {
+            "python": platform.python_version(),
+            "yt_dlp": yt_dlp.version.__version__,
+            "cpus": os.cpu_count()
+        },
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-job YoutubeDL setup cost: a fresh instance per job vs the warm extraction pool.
+
+Runs metadata extractions against the local media fixture server, so the numbers
+cover instance construction, extractor initialization and connection set-up
+rather than any platform's latency. Prints JSON.
+
+    python benchmarks/ydl_setup.py --jobs 50
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "backend"))
+sys.path.append(str(ROOT))
+
+import yt_dlp  # noqa: E402
+
+from services.ydl_pool import PLATFORM_EXTRACTORS, YoutubeDLPool  # noqa: E402
+from tests.media_server import MediaServer, synthetic_bytes  # noqa: E402
+
+PARAMS = {'quiet': True, 'no_warnings': True, 'extract_flat': False, 'skip_download': True}
+
+
+def fresh_job(url: str):
+    with yt_dlp.YoutubeDL(PARAMS) as ydl:
+        for ie_key in PLATFORM_EXTRACTORS['youtube']:
+            ydl.get_info_extractor(ie_key)
+        ydl.extract_info(url, download=False, process=False)
+
+
+def summarize(name: str, timings, connections: int) -> dict:
+    return {
+        "mode": name,
+        "jobs": len(timings),
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p95_ms": round(sorted(timings)[int(len(timings) * 0.95) - 1] * 1000, 2),
+        "tcp_connections": connections
+    }
+
+
+def run(mode: str, jobs: int) -> dict:
+    with MediaServer() as server:
+        server.add_file("/clip.mp4", synthetic_bytes(64 * 1024))
+        # A watch page: read in full, so the connection can go back to the pool
+        url = server.add_file(
+            "/watch.html",
+            b'<html><head><title>clip</title></head><body><video src="/clip.mp4"></video></body></html>',
+            content_type="text/html"
+        )
+        pool = YoutubeDLPool(PARAMS, max_size=1)
+        pool.warm(["youtube"])
+
+        def pooled_job():
+            with pool.checkout("youtube") as ydl:
+                ydl.extract_info(url, download=False, process=False)
+
+        job = pooled_job if mode == "pooled" else lambda: fresh_job(url)
+        timings = []
+        for _ in range(jobs):
+            started = time.perf_counter()
+            job()
+            timings.append(time.perf_counter() - started)
+        pool.close()
+        return summarize(mode, timings, server.connections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=30)
+    args = parser.parse_args()
+    print(json.dumps({"results": [run("fresh", args.jobs), run("pooled", args.jobs)]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
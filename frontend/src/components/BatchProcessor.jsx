@@ -18,7 +18,7 @@ import {
   RotateCcw,
   FileText
 } from 'lucide-react';
-import { videoApi, detectPlatform } from '../services/api';
+import { videoApi, formatWait } from '../services/api';
 import { LoadingSpinner } from './LoadingSpinner';
 
 export const BatchProcessor = ({ onDownloadComplete }) => {
@@ -99,47 +99,31 @@ export const BatchProcessor = ({ onDownloadComplete }) => {
     setValidatedVideos([]);
 
     const results = [];
-    
-    for (let i = 0; i < validUrls.length; i++) {
-      const url = validUrls[i];
-      setBatchProgress({ current: i + 1, total: validUrls.length });
-      
-      try {
-        const platform = detectPlatform(url);
-        if (!platform) {
-          results.push({
-            url,
-            status: 'invalid',
-            error: 'Unsupported platform'
-          });
-          continue;
-        }
 
-        const response = await videoApi.validateUrl(url);
-        if (response.valid && response.video_info) {
-          results.push({
-            url,
-            status: 'valid',
-            platform: response.platform,
-            videoInfo: response.video_info
-          });
-        } else {
-          results.push({
-            url,
-            status: 'invalid',
-            error: 'Invalid video URL'
-          });
-        }
-      } catch (error) {
-        results.push({
-          url,
-          status: 'error',
-          error: error.message
-        });
-      }
-
-      // Small delay to prevent overwhelming the API
-      await new Promise(resolve => setTimeout(resolve, 500));
+    try {
+      // Results stream back in completion order, not submission order
+      await videoApi.validateUrls(validUrls, (result) => {
+        results.push(result.valid
+          ? {
+              url: result.url,
+              status: 'valid',
+              platform: result.platform,
+              videoInfo: result.video_info
+            }
+          : {
+              url: result.url,
+              status: result.platform ? 'error' : 'invalid',
+              error: result.error || 'Invalid video URL'
+            });
+        setBatchProgress({ current: results.length, total: validUrls.length });
+        setValidatedVideos([...results]);
+      });
+    } catch (error) {
+      toast({
+        title: "Validation Failed",
+        description: error.message,
+        variant: "destructive"
+      });
     }
 
     setValidatedVideos(results);
@@ -165,52 +149,86 @@ export const BatchProcessor = ({ onDownloadComplete }) => {
     }
 
     setBatchDownloads([]);
-    
-    for (const video of validVideos) {
-      try {
-        const downloadRequest = {
-          url: video.url,
-          quality: 'best',
-          format: 'mp4',
-          educational_purpose: true,
-          user_id: 'demo_user'
-        };
 
-        const response = await videoApi.startDownload(downloadRequest);
-        
-        const downloadInfo = {
-          id: response.download_id,
-          url: video.url,
-          title: video.videoInfo.title,
-          platform: video.platform,
+    try {
+      const response = await videoApi.startBatchDownload({
+        urls: validVideos.map(video => video.url),
+        quality: 'best',
+        format: 'mp4',
+        educational_purpose: true,
+        user_id: 'demo_user'
+      });
+
+      const titles = Object.fromEntries(validVideos.map(video => [video.url, video.videoInfo.title]));
+      setBatchDownloads([
+        ...response.accepted.map(item => ({
+          id: item.download_id,
+          url: item.url,
+          title: titles[item.url] || item.url,
+          platform: item.platform,
           status: 'started',
           progress: 0
-        };
-        
-        setBatchDownloads(prev => [...prev, downloadInfo]);
-        
-        // Notify parent
-        if (onDownloadComplete) {
-          onDownloadComplete(response.download_id);
-        }
-
-      } catch (error) {
-        setBatchDownloads(prev => [...prev, {
-          url: video.url,
-          title: video.videoInfo.title,
+        })),
+        ...response.rejected.map(item => ({
+          url: item.url,
+          title: titles[item.url] || item.url,
           status: 'failed',
-          error: error.message
-        }]);
+          error: item.error
+        }))
+      ]);
+
+      // Notify parent
+      if (onDownloadComplete) {
+        response.accepted.forEach(item => onDownloadComplete(item.download_id));
       }
 
-      // Delay between downloads
-      await new Promise(resolve => setTimeout(resolve, 1000));
+      toast({
+        title: response.status === 'deferred' ? "Batch Queued ⏳" : "Batch Download Started",
+        description: response.status === 'deferred'
+          ? `Queued ${response.accepted.length} of ${validVideos.length} videos; the last should start in ${formatWait(response.estimated_start_seconds)}`
+          : `Queued ${response.accepted.length} of ${validVideos.length} videos`,
+      });
+
+      trackBatch(response.batch_id, titles);
+    } catch (error) {
+      toast({
+        title: error.status === 429 ? "Server Busy" : "Batch Download Failed",
+        description: error.message,
+        variant: "destructive"
+      });
     }
+  };
 
-    toast({
-      title: "Batch Download Started",
-      description: `Started downloading ${validVideos.length} videos`,
-    });
+  const trackBatch = async (batchId, titles) => {
+    const deadline = Date.now() + 3600000;
+
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      try {
+        const progress = await videoApi.getBatchProgress(batchId);
+        setBatchDownloads(progress.items.map(item => ({
+          id: item.download_id,
+          url: item.url,
+          title: item.title || titles[item.url] || item.url,
+          status: !item.download_id || item.status === 'failed' || item.status === 'cancelled'
+            ? 'failed'
+            : item.status === 'completed' ? 'valid' : 'started',
+          progress: item.progress_percent,
+          error: item.error_message
+        })));
+
+        if (progress.finished) {
+          toast({
+            title: "Batch Finished",
+            description: `${progress.completed} completed, ${progress.failed + progress.rejected} failed`,
+          });
+          return;
+        }
+      } catch (error) {
+        console.error('Failed to get batch progress:', error);
+        return;
+      }
+    }
   };
 
   const resetBatch = () => {
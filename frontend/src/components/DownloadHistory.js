@@ -185,6 +185,7 @@ const DownloadHistory = ({ refreshTrigger }) => {
     switch (status) {
       case 'completed': return <CheckCircle className="w-4 h-4 text-green-500" />;
       case 'downloading': return <Clock className="w-4 h-4 text-blue-500 animate-spin" />;
+      case 'processing': return <Clock className="w-4 h-4 text-purple-500 animate-spin" />;
       case 'failed': return <AlertCircle className="w-4 h-4 text-red-500" />;
       case 'cancelled': return <AlertCircle className="w-4 h-4 text-gray-500" />;
       case 'pending': return <Clock className="w-4 h-4 text-gray-500" />;
@@ -418,6 +419,7 @@ const DownloadHistory = ({ refreshTrigger }) => {
                   <SelectItem value="all">All Status</SelectItem>
                   <SelectItem value="completed">Completed</SelectItem>
                   <SelectItem value="downloading">Downloading</SelectItem>
+                  <SelectItem value="processing">Processing</SelectItem>
                   <SelectItem value="failed">Failed</SelectItem>
                   <SelectItem value="pending">Pending</SelectItem>
                   <SelectItem value="cancelled">Cancelled</SelectItem>
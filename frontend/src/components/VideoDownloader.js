@@ -35,7 +35,7 @@ import {
   TrendingUp,
   Activity
 } from 'lucide-react';
-import { videoApi, detectPlatform, formatDuration, formatDate } from '../services/api';
+import { videoApi, detectPlatform, formatDuration, formatDate, formatWait } from '../services/api';
 import { ProfessionalHeader } from './ProfessionalHeader';
 import { BatchProcessor } from './BatchProcessor';
 import { VideoPreviewCarousel } from './VideoPreviewCarousel';
@@ -207,7 +207,8 @@ const VideoDownloader = ({ onDownloadComplete }) => {
         duration: targetVideo.duration,
         format: selectedFormat,
         quality: selectedQuality,
-        startTime: Date.now()
+        startTime: Date.now(),
+        estimatedStartAt: response.status === 'deferred' ? Date.parse(response.estimated_start_at) : null
       };
 
       setCurrentDownloads(prev => [newDownload, ...prev]);
@@ -222,14 +223,17 @@ const VideoDownloader = ({ onDownloadComplete }) => {
         setSelectedQuality('best');
       }
 
-      toast({
+      toast(response.status === 'deferred' ? {
+        title: "Download Queued ⏳",
+        description: `"${targetVideo.title}" should start in ${formatWait(response.estimated_start_seconds)}`,
+      } : {
         title: "Download Started! 🚀",
         description: `Downloading "${targetVideo.title}"`,
       });
 
     } catch (error) {
       toast({
-        title: "Download Failed",
+        title: error.status === 429 ? "Server Busy" : "Download Failed",
         description: error.message,
         variant: "destructive"
       });
@@ -237,9 +241,14 @@ const VideoDownloader = ({ onDownloadComplete }) => {
   };
 
   const pollProgress = async (downloadId) => {
-    const pollInterval = setInterval(async () => {
+    // Long-poll: the server holds each request until the progress version changes
+    const deadline = Date.now() + 600000;
+    let version = -1;
+
+    while (Date.now() < deadline) {
       try {
-        const progressData = await videoApi.getProgress(downloadId);
+        const progressData = await videoApi.getProgress(downloadId, version);
+        version = progressData.version ?? version;
         
         setCurrentDownloads(prev => prev.map(download => 
           download.download_id === downloadId 
@@ -256,7 +265,6 @@ const VideoDownloader = ({ onDownloadComplete }) => {
         
         // Stop polling if completed or failed
         if (progressData.status === 'completed' || progressData.status === 'failed') {
-          clearInterval(pollInterval);
           
           if (progressData.status === 'completed') {
             // Automatically start file download
@@ -294,18 +302,19 @@ const VideoDownloader = ({ onDownloadComplete }) => {
               variant: "destructive"
             });
           }
+          return;
+        }
+
+        // Finished jobs served from history never bump their version
+        if (!progressData.version) {
+          await new Promise(resolve => setTimeout(resolve, 1000));
         }
         
       } catch (error) {
         console.error('Failed to get progress:', error);
-        clearInterval(pollInterval);
+        return;
       }
-    }, 1000); // Faster polling - every 1 second
-
-    // Cleanup interval after 10 minutes
-    setTimeout(() => {
-      clearInterval(pollInterval);
-    }, 600000);
+    }
   };
 
   const downloadFileDirectly = async (downloadId) => {
@@ -433,6 +442,7 @@ const VideoDownloader = ({ onDownloadComplete }) => {
     switch (status) {
       case 'completed': return <CheckCircle className="w-4 h-4 text-green-400" />;
       case 'downloading': return <Loader2 className="w-4 h-4 text-blue-400 animate-spin" />;
+      case 'processing': return <Loader2 className="w-4 h-4 text-purple-400 animate-spin" />;
       case 'failed': return <AlertCircle className="w-4 h-4 text-red-400" />;
       case 'cancelled': return <X className="w-4 h-4 text-gray-400" />;
       case 'pending': return <Clock className="w-4 h-4 text-yellow-400" />;
@@ -821,6 +831,13 @@ const VideoDownloader = ({ onDownloadComplete }) => {
                     </div>
                   )}
                   
+                  {download.status === 'pending' && download.estimatedStartAt && (
+                    <div className="flex items-center gap-2 text-sm text-yellow-300">
+                      <Clock className="w-4 h-4" />
+                      Queued, expected to start {formatWait((download.estimatedStartAt - Date.now()) / 1000)} from now
+                    </div>
+                  )}
+                  
                   {download.status === 'failed' && download.error_message && (
                     <div className="mt-3 p-3 bg-red-900/30 border border-red-500/30 rounded-lg">
                       <div className="flex items-center gap-2 text-red-300 text-sm">
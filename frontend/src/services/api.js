@@ -36,6 +36,15 @@ api.interceptors.response.use(
   }
 );
 
+// Error carrying the server's Retry-After (seconds) when it refused work with 429
+const requestError = (error, fallback) => {
+  const wrapped = new Error(error.response?.data?.detail || fallback);
+  const retryAfter = parseInt(error.response?.headers?.['retry-after'], 10);
+  wrapped.status = error.response?.status;
+  wrapped.retryAfter = Number.isNaN(retryAfter) ? null : retryAfter;
+  return wrapped;
+};
+
 // Video API functions
 export const videoApi = {
   // Validate video URL and get basic info
@@ -48,6 +57,38 @@ export const videoApi = {
     }
   },
 
+  // Validate many URLs; onResult fires for each NDJSON line as the server streams it
+  validateUrls: async (urls, onResult) => {
+    const response = await fetch(`${API_BASE}/video/validate/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ urls }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || 'Failed to validate URLs');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+
+      const lines = buffered.split('\n');
+      buffered = lines.pop();
+      lines.filter(line => line.trim()).forEach(line => onResult(JSON.parse(line)));
+    }
+
+    if (buffered.trim()) {
+      onResult(JSON.parse(buffered));
+    }
+  },
+
   // Get quality options for a platform
   getQualityOptions: async (platform) => {
     try {
@@ -65,14 +106,49 @@ export const videoApi = {
       const response = await api.post('/download/start', downloadRequest);
       return response.data;
     } catch (error) {
-      throw new Error(error.response?.data?.detail || 'Failed to start download');
+      throw requestError(error, 'Failed to start download');
+    }
+  },
+
+  // Queue many downloads server-side in one request
+  startBatchDownload: async (batchRequest) => {
+    try {
+      const response = await api.post('/download/batch', batchRequest);
+      return response.data;
+    } catch (error) {
+      throw requestError(error, 'Failed to start batch download');
+    }
+  },
+
+  // Expand a playlist or channel server-side; entries are queued as they are found
+  startPlaylistDownload: async (playlistRequest) => {
+    try {
+      const response = await api.post('/download/playlist', playlistRequest);
+      return response.data;
+    } catch (error) {
+      throw requestError(error, 'Failed to start playlist download');
     }
   },
 
-  // Get download progress
-  getProgress: async (downloadId) => {
+  // Get aggregate and per-item batch progress
+  getBatchProgress: async (batchId) => {
     try {
-      const response = await api.get(`/download/progress/${downloadId}`);
+      const response = await api.get(`/download/batch/${batchId}`);
+      return response.data;
+    } catch (error) {
+      throw new Error(error.response?.data?.detail || 'Failed to get batch progress');
+    }
+  },
+
+  // Get download progress (long-polls until the version moves past sinceVersion)
+  getProgress: async (downloadId, sinceVersion = null, waitSeconds = 25) => {
+    try {
+      const config = {};
+      if (sinceVersion !== null) {
+        config.params = { since_version: sinceVersion, timeout: waitSeconds };
+        config.timeout = (waitSeconds + 10) * 1000;
+      }
+      const response = await api.get(`/download/progress/${downloadId}`, config);
       return response.data;
     } catch (error) {
       throw new Error(error.response?.data?.detail || 'Failed to get progress');
@@ -205,6 +281,15 @@ export const formatDuration = (seconds) => {
   return `${mins}:${secs.toString().padStart(2, '0')}`;
 };
 
+// Format a queue-wait estimate in seconds, e.g. "about 3 min"
+export const formatWait = (seconds) => {
+  if (!seconds || seconds < 60) return 'less than a minute';
+  if (seconds < 3600) return `about ${Math.round(seconds / 60)} min`;
+  const hours = Math.floor(seconds / 3600);
+  const mins = Math.round((seconds % 3600) / 60);
+  return mins ? `about ${hours} h ${mins} min` : `about ${hours} h`;
+};
+
 // Format date
 export const formatDate = (dateString) => {
   return new Date(dateString).toLocaleDateString('en-US', {
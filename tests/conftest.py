@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level packages (models, services, database)
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """A VideoDownloaderService working in tmp_path, with its thread and extraction pools shut down afterwards"""
+    from services.video_downloader import VideoDownloaderService
+
+    monkeypatch.chdir(tmp_path)
+    service = VideoDownloaderService()
+    yield service
+    service.shutdown_executors()
+    service.extraction_pool.close()
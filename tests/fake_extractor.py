@@ -0,0 +1,89 @@
+"""Offline stand-in for yt-dlp's site extractors, serving formats from a MediaServer."""
+import http.cookiejar
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from tests.media_server import MediaServer, synthetic_bytes
+
+
+class FakeExtractor:
+    """Plugged into VideoDownloaderService(extractor=...): resolves YouTube watch URLs
+    of registered videos to unprocessed info dicts whose formats point at the media
+    server, so format selection, transfer and finishing run as they would for real.
+    Videos added with a cookie are only served to requests carrying it, and the
+    extractor sets it in the YoutubeDL's jar, like sites that hand out a session
+    cookie while extracting"""
+
+    def __init__(self, server: MediaServer, latency: float = 0.0):
+        self.server = server
+        self.latency = latency  # seconds each extraction takes, standing in for the site's API
+        self.videos: Dict[str, Dict[str, Any]] = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add_video(
+        self, video_id: str, size: int, title: Optional[str] = None, height: int = 720,
+        cookie: Optional[str] = None, audio_only: bool = False
+    ) -> str:
+        """Serve a synthetic mp4 (an m4a with audio_only) for video_id and return its watch URL"""
+        content = synthetic_bytes(size, seed=len(self.videos))
+        path = f"/media/{video_id}.mp4"
+        if cookie:
+            self.server.required_cookies[path] = cookie
+        self.videos[video_id] = {
+            "title": title or f"Benchmark clip {video_id}",
+            "url": self.server.add_file(path, content),
+            "size": size,
+            "height": height,
+            "cookie": cookie,
+            "audio_only": audio_only
+        }
+        return f"https://www.youtube.com/watch?v={video_id}"
+
+    def _set_cookie(self, ydl, cookie: str):
+        name, value = cookie.split("=", 1)
+        host = self.server.url("/").split("/")[2].split(":")[0]
+        ydl.cookiejar.set_cookie(http.cookiejar.Cookie(
+            0, name, value, None, False, host, True, False, "/", True, False, None, False, None, None, {}
+        ))
+
+    def __call__(self, url: str, ydl=None) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        video_id = parse_qs(urlparse(url).query).get("v", [""])[0]
+        video = self.videos.get(video_id)
+        if video is None:
+            raise ValueError(f"Video unavailable: {video_id}")
+        if video["cookie"] and ydl is not None:
+            self._set_cookie(ydl, video["cookie"])
+        return {
+            "_type": "video",
+            "id": video_id,
+            "title": video["title"],
+            "duration": 60,
+            "uploader": "benchmark",
+            "webpage_url": url,
+            "extractor": "youtube",
+            "extractor_key": "Youtube",
+            "formats": [self._format(video)]
+        }
+
+    @staticmethod
+    def _format(video: Dict[str, Any]) -> Dict[str, Any]:
+        if video["audio_only"]:
+            return {"format_id": "140", "url": video["url"], "ext": "m4a", "vcodec": "none",
+                    "acodec": "mp4a.40.2", "filesize": video["size"]}
+        return {
+            "format_id": "18",
+            "url": video["url"],
+            "ext": "mp4",
+            "width": video["height"] * 16 // 9,
+            "height": video["height"],
+            "vcodec": "avc1.42001E",
+            "acodec": "mp4a.40.2",
+            "filesize": video["size"]
+        }
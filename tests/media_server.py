@@ -0,0 +1,153 @@
+"""Local HTTP server serving synthetic media for offline download tests."""
+import re
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+def synthetic_bytes(size: int, seed: int = 0) -> bytes:
+    """Deterministic, position-dependent content so misplaced bytes are detectable"""
+    pattern = bytes((seed + index * 7) % 251 for index in range(251 * 16))
+    repeats = size // len(pattern) + 1
+    return (pattern * repeats)[:size]
+
+
+class MediaServer:
+    """Threaded HTTP server with byte-range support, per-connection bandwidth and
+    latency shaping, per-path fault injection and cookie-protected paths"""
+
+    def __init__(
+        self,
+        supports_ranges: bool = True,
+        bandwidth: Optional[int] = None,
+        latency: float = 0.0
+    ):
+        self.files: Dict[str, bytes] = {}
+        self.content_types: Dict[str, str] = {}
+        self.supports_ranges = supports_ranges
+        self.bandwidth = bandwidth  # bytes per second per connection
+        self.latency = latency  # seconds before the first byte
+        # path -> number of range requests that should fail with 503 before succeeding
+        self.failures: Dict[str, int] = {}
+        # path -> "name=value" cookie a request must carry, else it is answered 403
+        self.required_cookies: Dict[str, str] = {}
+        self.requests: List[Tuple[str, Optional[str]]] = []
+        self.active_requests = 0
+        self.connections = 0  # TCP connections accepted, to observe keep-alive reuse
+        self.peak_active_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def add_file(self, path: str, content: bytes, content_type: str = "video/mp4") -> str:
+        self.files[path] = content
+        self.content_types[path] = content_type
+        return self.url(path)
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def start(self) -> "MediaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MediaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                content = server.files.get(self.path)
+                range_header = self.headers.get("Range")
+                with server._lock:
+                    server.requests.append((self.path, range_header))
+                    server.active_requests += 1
+                    server.peak_active_requests = max(server.peak_active_requests, server.active_requests)
+                try:
+                    self._respond(content, range_header)
+                finally:
+                    with server._lock:
+                        server.active_requests -= 1
+
+            def _respond(self, content: Optional[bytes], range_header: Optional[str]):
+                if content is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                required_cookie = server.required_cookies.get(self.path)
+                cookies = [value.strip() for value in self.headers.get("Cookie", "").split(";")]
+                if required_cookie and required_cookie not in cookies:
+                    self.send_response(403)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                match = RANGE_PATTERN.match(range_header or "")
+                if match and server.supports_ranges:
+                    with server._lock:
+                        remaining_failures = server.failures.get(self.path, 0)
+                        if remaining_failures and range_header != "bytes=0-0":
+                            server.failures[self.path] = remaining_failures - 1
+                    if remaining_failures and range_header != "bytes=0-0":
+                        self.send_response(503)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else len(content) - 1
+                    end = min(end, len(content) - 1)
+                    body = content[start:end + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+                else:
+                    body = content
+                    self.send_response(200)
+
+                self.send_header("Content-Type", server.content_types.get(self.path, "video/mp4"))
+                self.send_header("Content-Length", str(len(body)))
+                if server.supports_ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+                if server.latency:
+                    time.sleep(server.latency)
+                self._write_shaped(body)
+
+            def _write_shaped(self, body: bytes):
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                    return
+                chunk_size = 16 * 1024
+                for offset in range(0, len(body), chunk_size):
+                    chunk = body[offset:offset + chunk_size]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / server.bandwidth)
+
+        return Handler
@@ -0,0 +1,79 @@
+from services.adaptive_tuning import AdaptiveTuningController
+
+MB = 1024 * 1024
+
+
+def feed(controller, job_id, rates, start=0.0, window=2.0):
+    """Feed one window per rate (bytes/s); returns the concurrency after each window"""
+    downloaded = 0
+    now = start
+    history = []
+    for rate in rates:
+        now += window
+        downloaded += int(rate * window)
+        controller.record_progress(job_id, downloaded, now=now)
+        history.append(controller.get_job(job_id).concurrency)
+    return history
+
+
+def test_additive_increase_while_throughput_scales_then_hold():
+    controller = AdaptiveTuningController(initial_concurrency=2, max_concurrency=8)
+    controller.start_job("a", "youtube", now=0.0)
+
+    history = feed(controller, "a", [2 * MB, 3 * MB, 4 * MB, 4 * MB, 4 * MB])
+
+    assert history[:3] == [3, 4, 5]
+    assert history[3] == history[4] == 5
+    assert controller.decision_counts["increase"] == 3
+    assert controller.decision_counts["hold"] >= 1
+
+
+def test_multiplicative_decrease_on_throughput_collapse_and_throttle():
+    controller = AdaptiveTuningController(initial_concurrency=8)
+    controller.start_job("a", "youtube", now=0.0)
+
+    feed(controller, "a", [8 * MB, 2 * MB])
+    job = controller.get_job("a")
+    assert job.concurrency < 8
+    assert job.last_decision == "decrease"
+
+    before = (job.concurrency, job.chunk_size)
+    controller.record_throttle("a")
+    assert job.concurrency <= max(1, before[0] // 2)
+    assert job.chunk_size == max(controller.min_chunk_size, before[1] // 2)
+
+
+def test_global_budget_caps_new_jobs_and_increases():
+    controller = AdaptiveTuningController(connection_budget=10, initial_concurrency=8)
+    first = controller.start_job("a", "youtube", now=0.0)
+    second = controller.start_job("b", "youtube", now=0.0)
+
+    assert first.concurrency == 8
+    assert second.concurrency == 2
+
+    # No spare connections: growth goes into chunk size instead
+    chunk_before = second.chunk_size
+    feed(controller, "b", [1 * MB, 2 * MB])
+    assert controller.connections_in_use == 10
+    assert second.chunk_size > chunk_before
+
+
+def test_finished_jobs_seed_the_next_start_for_their_platform():
+    controller = AdaptiveTuningController(initial_concurrency=8)
+    controller.start_job("a", "tiktok", now=0.0)
+    feed(controller, "a", [8 * MB, 1 * MB])
+    learned = controller.get_job("a").concurrency
+    controller.finish_job("a")
+
+    assert controller.connections_in_use == 0
+    assert controller.start_job("b", "tiktok", now=0.0).concurrency == round((learned + learned) / 2)
+    assert controller.start_job("c", "youtube", now=0.0).concurrency == 8
+
+
+def test_new_file_resets_the_window():
+    controller = AdaptiveTuningController()
+    controller.start_job("a", "youtube", now=0.0)
+    controller.record_progress("a", 50 * MB, now=1.0)
+
+    # Byte counter restarted for the audio stream: no decision from a negative delta
+    assert controller.record_progress("a", 1 * MB, now=3.0) is False
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from models.video import VideoDownloadRequest
+from services.admission import AdmissionController
+from services.download_queue import DownloadQueue
+from tests.test_download_queue import make_download
+
+
+def backlogged_queue(jobs, user_id="bulk", workers=2, service_time=10.0):
+    """A running queue whose workers are all busy, with jobs waiting behind them"""
+    queue = DownloadQueue(max_workers=workers, default_service_time=service_time)
+    queue.start(lambda download: asyncio.Event().wait())
+    for index in range(jobs):
+        queue.enqueue(make_download(index, user_id=user_id))
+    return queue
+
+
+def test_deep_queues_are_refused_with_a_drain_based_retry_after(tmp_path):
+    async def scenario():
+        queue = backlogged_queue(12)
+        await asyncio.sleep(0)
+        controller = AdmissionController(queue, max_queue_depth=10, max_drain_seconds=50, disk_path=str(tmp_path))
+        full = controller.check("someone")
+        queue.max_workers = 4
+        too_long = AdmissionController(queue, max_drain_seconds=20, disk_path=str(tmp_path)).check("someone", 3)
+        await queue.stop()
+        return full, too_long
+
+    full, too_long = asyncio.run(scenario())
+    # 10 waiting (2 picked up), +1 is one over: one job at 10s / 2 workers
+    assert not full.admitted and full.reason == "queue_full" and full.retry_after == 5
+    # 13 jobs at 2.5s each is 32.5s of backlog, 12.5s over the limit
+    assert not too_long.admitted and too_long.reason == "backlog_too_long" and too_long.retry_after == 13
+
+
+def test_light_users_are_deferred_on_their_own_share_not_the_whole_backlog(tmp_path):
+    async def scenario():
+        queue = backlogged_queue(40)
+        await asyncio.sleep(0)
+        controller = AdmissionController(queue, defer_after_seconds=30, disk_path=str(tmp_path))
+        bulk, light = controller.check("bulk"), controller.check("light")
+        await queue.stop()
+        return bulk, light, controller.stats()
+
+    bulk, light, stats = asyncio.run(scenario())
+    assert bulk.admitted and bulk.deferred and bulk.estimated_wait == pytest.approx(195)
+    # Half the workers once "light" is backlogged too: one job at 10s / 1 worker
+    assert light.admitted and not light.deferred and light.estimated_wait == pytest.approx(10)
+    assert stats["deferred"] == 1 and stats["admitted"] == 1
+
+
+def test_low_disk_refuses_work(tmp_path):
+    controller = AdmissionController(DownloadQueue(), min_free_disk_bytes=1 << 60, disk_path=str(tmp_path))
+    decision = controller.check("someone")
+    assert not decision.admitted and decision.reason == "disk_full" and decision.retry_after > 0
+
+
+class FakeRepository:
+    def __init__(self):
+        self.created = []
+
+    async def create_download(self, record):
+        self.created.append(record)
+
+
+class FakeQueue:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, record, on_done=None):
+        self.enqueued.append(record)
+
+
+def test_start_download_returns_429_with_retry_after(monkeypatch, tmp_path):
+    repository, queue = FakeRepository(), FakeQueue()
+    monkeypatch.setattr(server, "video_repository", repository)
+    monkeypatch.setattr(server, "download_queue", queue)
+    monkeypatch.setattr(server, "admission_controller",
+                        AdmissionController(DownloadQueue(), min_free_disk_bytes=1 << 60, disk_path=str(tmp_path)))
+    request = VideoDownloadRequest(url="https://www.youtube.com/watch?v=x", educational_purpose=True)
+
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(server.start_download(request))
+
+    assert refused.value.status_code == 429
+    assert refused.value.headers["Retry-After"] == "300"
+    assert not repository.created and not queue.enqueued
+
+    monkeypatch.setattr(server, "admission_controller", AdmissionController(DownloadQueue(), disk_path=str(tmp_path)))
+    response = asyncio.run(server.start_download(request))
+    assert response["status"] == "started" and response["estimated_start_seconds"] == 0
+    assert len(queue.enqueued) == 1
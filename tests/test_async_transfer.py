@@ -0,0 +1,267 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import server
+from models.video import DownloadStatus, PlatformType, VideoDownload
+from services.async_transfer import AsyncTransferEngine
+from services.download_queue import DownloadQueue
+from services.segmented_downloader import SegmentedDownloader, SegmentedDownloadError
+from services.video_downloader import VideoDownloaderService
+from tests.fake_extractor import FakeExtractor
+from tests.media_server import MediaServer, synthetic_bytes
+
+SIZE = 3 * 1024 * 1024 + 123
+
+
+def make_engine(**overrides):
+    planner = SegmentedDownloader(connections=4, min_segment_size=64 * 1024)
+    options = dict(chunk_size=16 * 1024, max_retries=2)
+    options.update(overrides)
+    return AsyncTransferEngine(planner, **options)
+
+
+def test_segments_are_fetched_concurrently(tmp_path):
+    content = synthetic_bytes(SIZE)
+    progress = []
+    engine = make_engine()
+
+    with MediaServer(bandwidth=4 * 1024 * 1024) as server:
+        url = server.add_file("/video.mp4", content)
+        dest = asyncio.run(engine.download(
+            url, str(tmp_path / "video.mp4"),
+            progress_callback=lambda done, total, speed: progress.append((done, total))
+        ))
+        peak = server.peak_active_requests
+
+    assert dest.read_bytes() == content
+    assert not (tmp_path / "video.mp4.part.json").exists()
+    assert progress[-1] == (SIZE, SIZE)
+    assert peak > 1
+    assert engine.stats()["completed"] == 1 and engine.stats()["active_transfers"] == 0
+
+
+def test_checkpoints_are_written_off_the_event_loop(tmp_path, monkeypatch):
+    save_threads = []
+    save_checkpoint = SegmentedDownloader._save_checkpoint
+
+    def recording_save(state_path, total_size, segments):
+        save_threads.append(threading.current_thread().name)
+        save_checkpoint(state_path, total_size, segments)
+
+    monkeypatch.setattr(SegmentedDownloader, "_save_checkpoint", staticmethod(recording_save))
+    with MediaServer() as server:
+        url = server.add_file("/video.mp4", synthetic_bytes(SIZE))
+        asyncio.run(make_engine().download(url, str(tmp_path / "video.mp4")))
+
+    assert save_threads
+    assert threading.main_thread().name not in save_threads
+
+
+def test_servers_without_ranges_are_streamed(tmp_path):
+    content = synthetic_bytes(SIZE)
+
+    with MediaServer(supports_ranges=False) as server:
+        url = server.add_file("/video.mp4", content)
+        dest = asyncio.run(make_engine().download(url, str(tmp_path / "video.mp4")))
+
+    assert dest.read_bytes() == content
+
+
+def test_resumes_from_a_segmented_checkpoint(tmp_path):
+    content = synthetic_bytes(SIZE)
+    dest = tmp_path / "video.mp4"
+
+    with MediaServer() as server:
+        url = server.add_file("/video.mp4", content)
+        # A previous attempt under the threaded engine got the first segment down
+        planner = SegmentedDownloader(connections=4, min_segment_size=64 * 1024)
+        segments = planner.plan_segments(SIZE)
+        segments[0].written = segments[0].size
+        planner._preallocate(dest.with_name("video.mp4.part"), SIZE)
+        with open(dest.with_name("video.mp4.part"), "r+b") as f:
+            f.write(content[:segments[0].size])
+        planner._save_checkpoint(dest.with_name("video.mp4.part.json"), SIZE, segments)
+
+        asyncio.run(AsyncTransferEngine(planner).download(url, str(dest)))
+        ranges = [range_header for _, range_header in server.requests]
+
+    assert dest.read_bytes() == content
+    assert f"bytes=0-{segments[0].end}" not in ranges
+
+
+def test_failures_keep_a_checkpoint(tmp_path):
+    with MediaServer() as server:
+        url = server.add_file("/video.mp4", synthetic_bytes(SIZE))
+        server.failures["/video.mp4"] = 100
+
+        with pytest.raises(SegmentedDownloadError):
+            asyncio.run(make_engine().download(url, str(tmp_path / "video.mp4")))
+
+    state = json.loads((tmp_path / "video.mp4.part.json").read_text())
+    assert state["total_size"] == SIZE
+
+
+def test_many_transfers_share_one_loop(tmp_path):
+    jobs = 200
+    engine = make_engine(max_connections=jobs)
+    threads_before = threading.active_count()
+
+    with MediaServer(latency=0.2) as server:
+        contents = {f"/v{index}.mp4": synthetic_bytes(32 * 1024, seed=index) for index in range(jobs)}
+        urls = {path: server.add_file(path, content) for path, content in contents.items()}
+
+        async def run_all():
+            peak = 0
+
+            async def watch():
+                nonlocal peak
+                while True:
+                    peak = max(peak, engine.stats()["active_transfers"])
+                    await asyncio.sleep(0.01)
+
+            watcher = asyncio.ensure_future(watch())
+            await asyncio.gather(*(
+                engine.download(url, str(tmp_path / path.lstrip("/"))) for path, url in urls.items()
+            ))
+            watcher.cancel()
+            await engine.aclose()
+            return peak
+
+        peak = asyncio.run(run_all())
+
+    assert peak == jobs
+    for path, content in contents.items():
+        assert (tmp_path / path.lstrip("/")).read_bytes() == content
+    # No thread per transfer: only the file-write executor and the test server grew
+    assert threading.active_count() - threads_before < jobs
+
+
+def test_transfers_beyond_the_limit_wait_for_a_slot(tmp_path):
+    engine = make_engine(max_transfers=2)
+
+    with MediaServer(latency=0.1) as server_:
+        urls = [server_.add_file(f"/v{index}.mp4", synthetic_bytes(64 * 1024, seed=index)) for index in range(5)]
+
+        async def run_all():
+            peak = waiting = 0
+
+            async def watch():
+                nonlocal peak, waiting
+                while True:
+                    peak = max(peak, engine.stats()["active_transfers"])
+                    waiting = max(waiting, engine.stats()["waiting_transfers"])
+                    await asyncio.sleep(0.01)
+
+            watcher = asyncio.ensure_future(watch())
+            await asyncio.gather(*(engine.download(url, str(tmp_path / f"v{index}.mp4")) for index, url in enumerate(urls)))
+            watcher.cancel()
+            await engine.aclose()
+            return peak, waiting
+
+        peak, waiting = asyncio.run(run_all())
+
+    assert peak == 2 and waiting == 3
+    assert engine.stats()["completed"] == 5
+
+
+class RecordingRepository:
+    def __init__(self):
+        self.records = {}
+
+    async def update_download(self, record):
+        self.records[record.download_id] = record
+
+
+def test_streaming_jobs_give_their_queue_worker_back(service, monkeypatch):
+    repository = RecordingRepository()
+    monkeypatch.setattr(server, "video_downloader", service)
+    monkeypatch.setattr(server, "video_repository", repository)
+
+    with MediaServer(bandwidth=1024 * 1024) as media:
+        service.extractor = FakeExtractor(media)
+        records = [
+            VideoDownload(download_id=f"dl_stream{index}", url=service.extractor.add_video(f"stream{index}", 1024 * 1024),
+                          platform=PlatformType.YOUTUBE, quality="best", format="mp4")
+            for index in range(3)
+        ]
+
+        async def scenario():
+            queue = DownloadQueue(max_workers=1)
+            queue.start(server.process_download)
+            for record in records:
+                queue.enqueue(record)
+            peak = 0
+            while not all(record.status == DownloadStatus.COMPLETED for record in repository.records.values()) \
+                    or len(repository.records) < len(records):
+                peak = max(peak, service.async_transfer.stats()["active_transfers"])
+                await asyncio.sleep(0.01)
+            await queue.stop()
+            await service.async_transfer.aclose()
+            return peak
+
+        peak = asyncio.run(asyncio.wait_for(scenario(), 30))
+
+    # One queue worker, yet every job streamed at once: each gave the worker back
+    # as soon as its URL was resolved
+    assert peak == len(records)
+
+
+def test_service_streams_resolved_urls_on_the_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = synthetic_bytes(SIZE)
+
+    with MediaServer() as server:
+        url = server.add_file("/clip.mp4", content)
+        service = VideoDownloaderService()
+        request = VideoDownload(download_id="dl_async", url=url, platform=PlatformType.TIKTOK,
+                                quality="best", format="mp4")
+        result = asyncio.run(service.download_video(request))
+
+    assert result.error_message is None
+    assert open(result.file_path, "rb").read() == content
+    assert result.pipeline_stats["strategy"] == "async_stream"
+    assert service.async_transfer.stats()["completed"] == 1
+
+
+def test_plugged_in_extractor_runs_the_pipeline_offline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with MediaServer() as server:
+        extractor = FakeExtractor(server)
+        url = extractor.add_video("offline01", SIZE)
+        service = VideoDownloaderService(extractor=extractor)
+        request = VideoDownload(download_id="dl_offline", url=url, platform=PlatformType.YOUTUBE,
+                                quality="best", format="mp4")
+
+        async def scenario():
+            info = await service.get_video_info(url)
+            return info, await service.download_video(request)
+
+        info, result = asyncio.run(scenario())
+        service.shutdown_executors()
+
+    assert info.title == "Benchmark clip offline01" and info.is_downloadable
+    assert result.error_message is None
+    assert open(result.file_path, "rb").read() == server.files["/media/offline01.mp4"]
+    assert result.pipeline_stats["strategy"] == "async_stream"
+    # The download reused the validation's extraction
+    assert extractor.calls == 1
+
+
+@pytest.mark.parametrize("async_transfers", [True, False])
+def test_cookies_set_during_extraction_reach_the_transfer(service, async_transfers):
+    with MediaServer() as server:
+        extractor = FakeExtractor(server)
+        url = extractor.add_video("cookie01", SIZE, cookie="session=abc")
+        service.extractor = extractor
+        service.async_transfers_enabled = async_transfers
+        service.segmented_min_size = 0
+        request = VideoDownload(download_id="dl_cookie", url=url, platform=PlatformType.YOUTUBE,
+                                quality="best", format="mp4")
+        result = asyncio.run(service.download_video(request))
+
+    assert result.error_message is None
+    assert open(result.file_path, "rb").read() == server.files["/media/cookie01.mp4"]
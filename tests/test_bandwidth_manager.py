@@ -0,0 +1,78 @@
+import time
+
+from services.bandwidth_manager import BandwidthManager, TokenBucket, water_fill
+from services.segmented_downloader import SegmentedDownloader
+from tests.media_server import MediaServer, synthetic_bytes
+
+MB = 1024 * 1024
+
+
+def test_water_fill_redistributes_capped_claims():
+    allocation = water_fill(10 * MB, {"a": (1, 1 * MB), "b": (1, None), "c": (2, None)})
+
+    assert allocation["a"] == 1 * MB
+    assert allocation["b"] == 3 * MB
+    assert allocation["c"] == 6 * MB
+
+
+def test_users_share_fairly_regardless_of_job_count():
+    manager = BandwidthManager(total_rate=12 * MB, min_rate=0)
+    for index in range(5):
+        manager.register_job(f"bulk-{index}", "bulk-user", "youtube")
+    manager.register_job("small", "other-user", "tiktok")
+
+    # The single job of the second user gets half the link, not a sixth
+    assert manager.get_rate("small") == 6 * MB
+    assert sum(manager.get_rate(f"bulk-{index}") for index in range(5)) == 6 * MB
+
+
+def test_shares_rebalance_and_notify_as_jobs_come_and_go():
+    manager = BandwidthManager(
+        total_rate=8 * MB, job_ceiling=6 * MB, min_rate=0, platform_weights={"youtube": 3}
+    )
+    changes = []
+    manager.add_listener(lambda job_id, rate: changes.append((job_id, rate)))
+
+    assert manager.register_job("a", "u1", "youtube") == 6 * MB
+    manager.register_job("b", "u1", "tiktok")
+    assert (manager.get_rate("a"), manager.get_rate("b")) == (6 * MB, 2 * MB)
+
+    manager.unregister_job("a")
+    assert manager.get_rate("b") == 6 * MB
+    assert ("b", 6 * MB) in changes
+
+
+def test_unlimited_without_any_ceiling():
+    manager = BandwidthManager()
+
+    assert not manager.enabled
+    assert manager.register_job("a", None, "youtube") is None
+
+
+def test_token_bucket_enforces_the_current_rate():
+    rate = [512 * 1024]
+    bucket = TokenBucket(lambda: rate[0], burst_seconds=0.1)
+    started = time.monotonic()
+    for _ in range(16):
+        bucket.take(16 * 1024)
+    # 256 KB at 512 KB/s, minus the initial burst allowance
+    assert time.monotonic() - started >= 0.35
+
+
+def test_small_job_is_not_starved_by_a_large_one(tmp_path):
+    manager = BandwidthManager(total_rate=4 * MB, min_rate=0)
+    downloader = SegmentedDownloader(connections=4, min_segment_size=64 * 1024, chunk_size=16 * 1024)
+    small = synthetic_bytes(512 * 1024)
+
+    with MediaServer() as server:
+        small_url = server.add_file("/small.mp4", small)
+        manager.register_job("large", "bulk-user", "youtube")
+        manager.register_job("small", "other-user", "youtube")
+
+        started = time.monotonic()
+        downloader.download(small_url, str(tmp_path / "small.mp4"), rate_limit=lambda: manager.get_rate("small"))
+        elapsed = time.monotonic() - started
+
+    # Half of 4 MB/s: 512 KB should take roughly a quarter second, not the whole link's backlog
+    assert (tmp_path / "small.mp4").read_bytes() == small
+    assert 0.1 <= elapsed < 1.5
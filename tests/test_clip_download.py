@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from models.video import PlatformType, VideoDownload, VideoDownloadRequest
+
+PROGRESSIVE_INFO = {"protocol": "https", "url": "https://cdn.example/v.mp4", "filesize": 50 * 1024 * 1024}
+
+
+class FakeYDL:
+    def __init__(self):
+        self.downloaded = []
+
+    def download(self, urls):
+        self.downloaded.extend(urls)
+
+
+def make_clip(start=None, end=None):
+    return VideoDownload(download_id="dl_clip", url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+                         quality="720p", format="mp4", start_time=start, end_time=end)
+
+
+def test_request_rejects_inverted_ranges():
+    with pytest.raises(ValidationError):
+        VideoDownloadRequest(url="https://youtube.com/watch?v=x", start_time=30, end_time=10)
+    with pytest.raises(ValidationError):
+        VideoDownloadRequest(url="https://youtube.com/watch?v=x", start_time=-1)
+
+    request = VideoDownloadRequest(url="https://youtube.com/watch?v=x", start_time=10, end_time=40)
+    assert (request.start_time, request.end_time) == (10, 40)
+
+
+def test_clips_use_range_download_without_reencoding(service):
+    captured = {}
+    service._perform_download = lambda ydl_opts, request, *args: captured.update(ydl_opts)
+
+    asyncio.run(service.download_video(make_clip(10, 40)))
+
+    ranges = list(captured["download_ranges"]({"duration": 120}, None))
+    assert ranges == [{"start_time": 10, "end_time": 40}]
+    assert captured["force_keyframes_at_cuts"] is False
+
+
+def test_clips_bypass_whole_file_transfers(service):
+    assert service._can_download_segmented(PROGRESSIVE_INFO, make_clip())
+    assert not service._can_download_segmented(PROGRESSIVE_INFO, make_clip(10, 40))
+    assert not service._can_download_dash({"requested_formats": [PROGRESSIVE_INFO] * 2}, make_clip(end=5))
+
+
+def test_clip_stats_and_bounds(service):
+    ydl = FakeYDL()
+    request = make_clip(start=100)
+
+    service._perform_clip_download(ydl, {"duration": 130}, request)
+
+    assert ydl.downloaded == [request.url]
+    assert request.pipeline_stats["strategy"] == "clip"
+    assert request.pipeline_stats["clip_seconds"] == 30
+
+    with pytest.raises(ValueError):
+        service._perform_clip_download(FakeYDL(), {"duration": 90}, make_clip(start=100))
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+from models.video import DownloadStatus, PlatformType, VideoDownload
+from services.segmented_downloader import SegmentedDownloadCancelled, SegmentedDownloader
+from tests.media_server import MediaServer, synthetic_bytes
+
+SIZE = 2 * 1024 * 1024
+
+
+def test_checkpoints_cover_segments_in_flight(tmp_path):
+    content = synthetic_bytes(SIZE)
+    dest = tmp_path / "video.mp4"
+    downloader = SegmentedDownloader(connections=1, min_segment_size=SIZE, chunk_size=16 * 1024,
+                                     checkpoint_interval=0)
+    seen = []
+
+    with MediaServer(bandwidth=1024 * 1024) as server_:
+        url = server_.add_file("/video.mp4", content)
+
+        # The "crash" happens part-way through the only segment
+        with pytest.raises(SegmentedDownloadCancelled):
+            downloader.download(url, str(dest), progress_callback=lambda done, total, speed: seen.append(done),
+                                should_cancel=lambda: bool(seen) and seen[-1] >= SIZE // 2)
+        state = json.loads(dest.with_name("video.mp4.part.json").read_text())
+        written = state["segments"][0]["written"]
+
+        downloader.download(url, str(dest))
+        resumed_ranges = [range_header for _, range_header in server_.requests[-1:]]
+
+    assert SIZE // 2 <= written < SIZE
+    assert resumed_ranges == [f"bytes={written}-{SIZE - 1}"]
+    assert dest.read_bytes() == content
+
+
+def test_interrupted_checkpoint_writes_are_not_taken_for_the_output(service):
+    download_dir = service.downloads_dir / "dl_crashed"
+    download_dir.mkdir(parents=True)
+    (download_dir / "video.mp4.part").write_bytes(b"\0" * 1024)
+    # The process died between writing the checkpoint and renaming it into place
+    (download_dir / "video.mp4.part.json.tmp").write_bytes(b"{" * 4096)
+    record = VideoDownload(download_id="dl_crashed", url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+                           quality="best", format="mp4")
+
+    service._finish_download(record)
+
+    assert record.file_path is None
+
+
+class FakeVideoRepository:
+    def __init__(self, records, contested=()):
+        self.records = records
+        self.contested = set(contested)
+        self.updated = []
+        self.excluded = None
+
+    async def get_interrupted_downloads(self, live_node_ids):
+        self.excluded = set(live_node_ids)
+        return [record for record in self.records if record.node_id not in self.excluded]
+
+    async def claim_download(self, download_id, previous_node_id, node_id):
+        return download_id not in self.contested
+
+    async def update_download(self, record):
+        self.updated.append((record.download_id, record.status))
+
+
+class FakeNodes:
+    async def get_live_node_ids(self, max_age_seconds):
+        return {"node-b", server.NODE_ID}
+
+
+class FakeArchive:
+    async def release_pending(self, download_id):
+        pass
+
+
+class FakeQueue:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, record, on_done=None):
+        self.enqueued.append(record)
+
+
+class FakeStage:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, record):
+        self.enqueued.append(record)
+
+
+def make_record(download_id, status, node_id="node-a", **fields):
+    return VideoDownload(download_id=download_id, url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+                         quality="best", format="mp4", status=status, node_id=node_id, **fields)
+
+
+@pytest.fixture
+def recovery(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "song.webm"
+    source.write_bytes(b"media")
+    records = [
+        make_record("dl_running", DownloadStatus.DOWNLOADING),
+        make_record("dl_queued", DownloadStatus.PENDING, node_id=None),
+        make_record("dl_converting", DownloadStatus.PROCESSING, file_path=str(source)),
+        make_record("dl_lost", DownloadStatus.PROCESSING, file_path=str(tmp_path / "gone.webm")),
+        make_record("dl_crashloop", DownloadStatus.DOWNLOADING, recovery_count=server.MAX_RECOVERY_ATTEMPTS),
+        make_record("dl_taken", DownloadStatus.DOWNLOADING),
+        make_record("dl_alive", DownloadStatus.DOWNLOADING, node_id="node-b"),
+    ]
+    repository = FakeVideoRepository(records, contested={"dl_taken"})
+    queue, stage = FakeQueue(), FakeStage()
+    monkeypatch.setattr(server, "video_repository", repository)
+    monkeypatch.setattr(server, "node_repository", FakeNodes())
+    monkeypatch.setattr(server, "archive_repository", FakeArchive())
+    monkeypatch.setattr(server, "download_queue", queue)
+    monkeypatch.setattr(server, "postprocessing_stage", stage)
+    return repository, queue, stage
+
+
+def test_orphaned_jobs_are_resumed_or_failed(recovery):
+    repository, queue, stage = recovery
+
+    asyncio.run(server.recover_interrupted_downloads())
+
+    assert [record.download_id for record in queue.enqueued] == ["dl_running", "dl_queued"]
+    assert all(record.status == DownloadStatus.PENDING and record.recovery_count == 1 for record in queue.enqueued)
+    assert all(record.node_id == server.NODE_ID for record in queue.enqueued)
+    assert [record.download_id for record in stage.enqueued] == ["dl_converting"]
+    assert ("dl_lost", DownloadStatus.FAILED) in repository.updated
+    assert ("dl_crashloop", DownloadStatus.FAILED) in repository.updated
+    assert "dl_taken" not in {download_id for download_id, _ in repository.updated}
+    # Live nodes, this one included, keep their jobs
+    assert repository.excluded == {"node-b", server.NODE_ID}
+
+
+def test_startup_recovery_takes_this_nodes_own_leftovers(recovery):
+    repository, _, _ = recovery
+
+    asyncio.run(server.recover_interrupted_downloads(include_own=True))
+
+    assert repository.excluded == {"node-b"}
@@ -0,0 +1,106 @@
+import http.cookiejar
+import os
+
+import pytest
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+from models.video import DownloadProgress, DownloadStatus, PlatformType, VideoDownload
+from tests.media_server import MediaServer, synthetic_bytes
+
+VIDEO_SIZE = 6 * 1024 * 1024
+AUDIO_SIZE = 1024 * 1024
+
+
+class FakeYDL:
+    def __init__(self, filename):
+        self.filename = filename
+        self.params = {}
+        self.cookiejar = YoutubeDLCookieJar()
+
+    def prepare_filename(self, info):
+        return self.filename
+
+
+@pytest.fixture
+def service(service):
+    service.dash_enabled = True
+    service.merged = []
+
+    def fake_merge(video_path, audio_path, output_path):
+        # Stand-in for the ffmpeg stream copy: concatenate so the result is checkable
+        with open(output_path, "wb") as out:
+            for path in (video_path, audio_path):
+                with open(path, "rb") as f:
+                    out.write(f.read())
+        service.merged.append((video_path, audio_path))
+
+    service._merge_streams = fake_merge
+    return service
+
+
+def make_info(server, video, audio):
+    return {
+        "requested_formats": [
+            # Audio listed first to check the video stream still becomes input 0
+            {"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a",
+             "protocol": "https", "url": server.add_file("/audio.m4a", audio), "filesize": len(audio)},
+            {"format_id": "137", "ext": "mp4", "vcodec": "avc1", "acodec": "none",
+             "protocol": "https", "url": server.add_file("/video.mp4", video), "filesize": len(video)},
+        ]
+    }
+
+
+def test_streams_download_concurrently_and_merge(service, tmp_path):
+    video, audio = synthetic_bytes(VIDEO_SIZE, seed=1), synthetic_bytes(AUDIO_SIZE, seed=2)
+    request = VideoDownload(download_id="dl_dash", url="https://youtube.com/watch?v=x",
+                            platform=PlatformType.YOUTUBE, quality="1080p", format="mp4")
+    service.active_downloads["dl_dash"] = DownloadProgress(download_id="dl_dash", status=DownloadStatus.DOWNLOADING)
+    output = tmp_path / "clip.mp4"
+
+    with MediaServer(bandwidth=8 * 1024 * 1024) as server:
+        info = make_info(server, video, audio)
+        assert service._can_download_dash(info, request)
+        service.tuning.start_job("dl_dash", "youtube")
+        service._perform_dash_download(FakeYDL(str(output)), info, request)
+        paths = {path for path, _ in server.requests if _ != "bytes=0-0"}
+
+    assert output.read_bytes() == video + audio
+    assert service.merged[0][0].endswith(".f137.mp4")
+    assert paths == {"/audio.m4a", "/video.mp4"}
+    assert not [name for name in os.listdir(tmp_path) if ".f1" in name]
+
+    stats = request.pipeline_stats
+    assert stats["strategy"] == "dash_parallel"
+    assert stats["peak_disk_bytes"] == 2 * (VIDEO_SIZE + AUDIO_SIZE)
+    assert stats["merge_seconds"] >= 0
+    # Audio rides along with the video instead of adding its own transfer time
+    assert stats["transfer_seconds"] < (VIDEO_SIZE + AUDIO_SIZE) / (8 * 1024 * 1024)
+    assert service.active_downloads["dl_dash"].status == DownloadStatus.COMPLETED
+
+
+def test_streams_carry_the_cookies_from_the_jar(service, tmp_path):
+    request = VideoDownload(download_id="dl_dash_cookie", url="https://youtube.com/watch?v=x",
+                            platform=PlatformType.YOUTUBE, quality="1080p", format="mp4")
+    ydl = FakeYDL(str(tmp_path / "clip.mp4"))
+    ydl.cookiejar.set_cookie(http.cookiejar.Cookie(
+        0, "session", "abc", None, False, "127.0.0.1", True, False, "/", True, False, None, False, None, None, {}
+    ))
+
+    with MediaServer() as server:
+        info = make_info(server, b"v" * AUDIO_SIZE, b"a" * AUDIO_SIZE)
+        server.required_cookies.update({"/audio.m4a": "session=abc", "/video.mp4": "session=abc"})
+        service.tuning.start_job("dl_dash_cookie", "youtube")
+        service._perform_dash_download(ydl, info, request)
+
+    assert (tmp_path / "clip.mp4").read_bytes() == b"v" * AUDIO_SIZE + b"a" * AUDIO_SIZE
+
+
+def test_dash_selector_only_for_high_resolutions(service):
+    assert service._get_dash_selector("1080p").startswith("bestvideo[height<=1080][ext=mp4]+bestaudio")
+    assert service._get_dash_selector("1440p", "webm").startswith("bestvideo[height<=1440][ext=webm]+bestaudio[ext=webm]")
+    assert service._get_dash_selector("best") is None
+    assert service._get_dash_selector("720p") is None
+    assert service._get_dash_selector("best", "mp3") is None
+
+    service.dash_enabled = False
+    assert service._get_dash_selector("1080p") is None
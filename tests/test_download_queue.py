@@ -0,0 +1,180 @@
+import asyncio
+
+import server
+from models.video import DownloadStatus, VideoDownload, PlatformType
+from services.download_queue import DownloadQueue
+
+
+def make_download(index: int, user_id: str = None) -> VideoDownload:
+    return VideoDownload(
+        download_id=f"dl_{index}",
+        url=f"https://www.youtube.com/watch?v={index}",
+        platform=PlatformType.YOUTUBE,
+        quality="best",
+        format="mp4",
+        user_id=user_id
+    )
+
+
+def test_workers_bound_concurrency_and_drain_everything():
+    async def scenario():
+        queue = DownloadQueue(max_workers=3)
+        running = 0
+        peak = 0
+        finished = []
+
+        async def processor(download):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        queue.start(processor)
+        for index in range(20):
+            queue.enqueue(make_download(index), on_done=lambda d: finished.append(d.download_id))
+        while len(finished) < 20:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return peak, finished
+
+    peak, finished = asyncio.run(scenario())
+    assert peak == 3
+    assert sorted(finished) == sorted(f"dl_{i}" for i in range(20))
+
+
+def test_processor_errors_do_not_kill_workers():
+    async def scenario():
+        queue = DownloadQueue(max_workers=1)
+        finished = []
+
+        async def processor(download):
+            if download.download_id == "dl_0":
+                raise RuntimeError("boom")
+
+        queue.start(processor)
+        for index in range(3):
+            queue.enqueue(make_download(index), on_done=lambda d: finished.append(d.download_id))
+        while len(finished) < 3:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return finished
+
+    assert asyncio.run(scenario()) == ["dl_0", "dl_1", "dl_2"]
+
+
+def run_jobs(queue, jobs, job_seconds=0.01, late_jobs=(), late_after=0.0):
+    """Run jobs through queue; returns (start order, peak concurrency per user)"""
+    async def scenario():
+        started = []
+        running = {}
+        peaks = {}
+        finished = []
+
+        async def processor(download):
+            started.append(download)
+            running[download.user_id] = running.get(download.user_id, 0) + 1
+            peaks[download.user_id] = max(peaks.get(download.user_id, 0), running[download.user_id])
+            await asyncio.sleep(job_seconds)
+            running[download.user_id] -= 1
+
+        queue.start(processor)
+        for download in jobs:
+            queue.enqueue(download, on_done=finished.append)
+        if late_jobs:
+            await asyncio.sleep(late_after)
+            for download in late_jobs:
+                queue.enqueue(download, on_done=finished.append)
+        while len(finished) < len(jobs) + len(late_jobs):
+            await asyncio.sleep(0.005)
+        await queue.stop()
+        return started, peaks
+
+    return asyncio.run(scenario())
+
+
+def test_interactive_user_is_not_stuck_behind_a_bulk_backlog():
+    queue = DownloadQueue(max_workers=2)
+    bulk = [make_download(index, user_id="bulk") for index in range(60)]
+    single = make_download(999, user_id="interactive")
+
+    started, _ = run_jobs(queue, bulk, late_jobs=[single], late_after=0.05)
+
+    # About 10 bulk jobs have started by then; it goes next, not after the other 50
+    assert started.index(single) <= 14
+    assert queue.stats()["users"]["interactive"]["wait_p99"] < 0.03
+    assert queue.stats()["users"]["bulk"]["wait_p99"] > 0.1
+
+
+def test_workers_are_shared_by_weight():
+    queue = DownloadQueue(max_workers=1, user_weights={"heavy": 2})
+    jobs = []
+    for index in range(30):
+        jobs.append(make_download(index, user_id="heavy"))
+        jobs.append(make_download(100 + index, user_id="light"))
+
+    started, _ = run_jobs(queue, jobs, job_seconds=0.001)
+
+    first_half = [download.user_id for download in started[:30]]
+    assert first_half.count("heavy") == 20 and first_half.count("light") == 10
+
+
+def test_per_user_concurrency_cap():
+    queue = DownloadQueue(max_workers=4, user_concurrency=3, user_concurrency_limits={"bulk": 1})
+    jobs = [make_download(index, user_id="bulk") for index in range(8)]
+    jobs += [make_download(100 + index, user_id="other") for index in range(8)]
+
+    _, peaks = run_jobs(queue, jobs)
+
+    assert peaks == {"bulk": 1, "other": 3}
+    stats = queue.stats()
+    assert stats["queued"] == 0 and stats["users"]["bulk"]["wait_p50"] is not None
+
+
+def test_cancelled_queued_job_never_starts(monkeypatch):
+    class FakeRepository:
+        def __init__(self, records):
+            self.records = {record.download_id: record for record in records}
+
+        async def get_download_by_id(self, download_id):
+            return self.records.get(download_id)
+
+        async def update_download(self, record):
+            self.records[record.download_id] = record
+
+    async def no_archive(record):
+        pass
+
+    async def scenario():
+        queue = DownloadQueue(max_workers=1)
+        release = asyncio.Event()
+        started, done = [], []
+
+        async def processor(download):
+            started.append(download.download_id)
+            await release.wait()
+
+        running, waiting, other = make_download(1), make_download(2), make_download(3)
+        monkeypatch.setattr(server, "download_queue", queue)
+        monkeypatch.setattr(server, "video_repository", FakeRepository([running, waiting.model_copy(), other]))
+        monkeypatch.setattr(server, "update_download_archive", no_archive)
+        queue.start(processor)
+        for download in (running, waiting, other):
+            queue.enqueue(download, on_done=lambda d: done.append(d.download_id))
+        await asyncio.sleep(0.01)
+
+        response = await server.cancel_download("dl_2")
+        assert queue.depth == 1
+        # A record marked cancelled some other way is dropped when its turn comes
+        other.status = DownloadStatus.CANCELLED
+        release.set()
+        while len(done) < 3:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return response, started, done, server.video_repository.records["dl_2"]
+
+    response, started, done, record = asyncio.run(scenario())
+    assert response["message"] == "Download cancelled successfully"
+    assert started == ["dl_1"]
+    assert sorted(done) == ["dl_1", "dl_2", "dl_3"]
+    assert record.status == DownloadStatus.CANCELLED
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from models.video import VideoInfo
+
+URL = "https://www.youtube.com/watch?v=abc"
+
+
+@pytest.fixture
+def service(service):
+    service.calls = 0
+    lock = threading.Lock()
+
+    def fake_extract(url, platform):
+        with lock:
+            service.calls += 1
+        time.sleep(0.05)
+        return VideoInfo(title=url, platform=platform)
+
+    service._extract_video_info = fake_extract
+    return service
+
+
+def test_concurrent_requests_share_one_extraction(service):
+    async def scenario():
+        return await asyncio.gather(*[service.get_video_info(URL) for _ in range(5)])
+
+    results = asyncio.run(scenario())
+    assert service.calls == 1
+    assert all(info.title == URL for info in results)
+
+
+def test_cached_info_is_reused_until_it_expires(service):
+    async def scenario():
+        await service.get_video_info(URL)
+        await service.get_video_info(URL)
+        service.info_cache_ttl = 0
+        await service.get_video_info(URL)
+
+    asyncio.run(scenario())
+    assert service.calls == 2
+    assert service.info_cache_hits == 1
+
+
+def test_cache_evicts_least_recently_used(service):
+    service.info_cache_size = 2
+
+    async def scenario():
+        for video in ("a", "b", "c"):
+            await service.get_video_info(f"https://youtu.be/{video}")
+
+    asyncio.run(scenario())
+    assert list(service._info_cache) == ["https://youtu.be/b", "https://youtu.be/c"]
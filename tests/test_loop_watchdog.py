@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+import server
+from models.video import VideoInfo
+from services.loop_watchdog import LoopWatchdog
+
+
+async def watched(watchdog, work):
+    task = asyncio.create_task(watchdog.run())
+    await asyncio.sleep(0.05)
+    try:
+        await work()
+        # Give the heartbeat a turn so a block at the very end is closed and recorded
+        await asyncio.sleep(watchdog.interval * 3)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+def test_blocking_calls_are_caught_with_their_stack(monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+    monkeypatch.setattr(server, "loop_watchdog", watchdog)
+
+    async def handler_with_sync_call():
+        time.sleep(0.3)
+
+    async def work():
+        await handler_with_sync_call()
+        await asyncio.sleep(0.05)
+        await handler_with_sync_call()
+
+    asyncio.run(watched(watchdog, work))
+    report = asyncio.run(server.get_event_loop_blocking())
+
+    assert report["blocked_count"] == 2
+    offender = report["offenders"][0]
+    assert offender["culprit"].startswith("test_loop_watchdog.py:") and "handler_with_sync_call" in offender["culprit"]
+    assert offender["count"] == 2 and 0.2 <= offender["max_seconds"] < 0.6
+    assert "time.sleep(0.3)" in offender["stack"]
+    assert report["max_lag"] >= 0.2
+
+
+def test_info_extraction_does_not_block_the_loop(service):
+    def slow_extract(url, platform):
+        time.sleep(0.3)
+        return VideoInfo(title=url, platform=platform)
+
+    service._extract_video_info = slow_extract
+    watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+
+    async def work():
+        await service.get_video_info("https://www.youtube.com/watch?v=abc")
+
+    asyncio.run(watched(watchdog, work))
+    assert watchdog.blocked_count == 0, watchdog.worst_offenders()
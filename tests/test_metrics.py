@@ -0,0 +1,56 @@
+import asyncio
+
+import server
+from services.metrics import MetricsRegistry, timed_methods
+
+
+def test_histograms_and_counters_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("job_seconds", "Job latency", ["platform"], buckets=(0.1, 1))
+    finished = registry.counter("jobs_finished", "Finished jobs", ["status"])
+    registry.callback("jobs_queued", "Queued jobs", lambda: 7)
+
+    child = latency.labels("youtube")
+    for value in (0.05, 0.5, 3):
+        child.observe(value)
+    finished.labels("failed").inc()
+    finished.labels(status="failed").inc(2)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE job_seconds histogram" in lines
+    assert 'job_seconds_bucket{platform="youtube",le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{platform="youtube",le="1"} 2' in lines
+    assert 'job_seconds_bucket{platform="youtube",le="+Inf"} 3' in lines
+    assert 'job_seconds_count{platform="youtube"} 3' in lines
+    assert 'jobs_finished_total{status="failed"} 3' in lines
+    assert "jobs_queued 7" in lines
+
+
+def test_repository_methods_are_timed():
+    registry = MetricsRegistry()
+    operations = registry.histogram("db_seconds", "DB latency", ["repository", "method"])
+
+    @timed_methods("video", operations)
+    class Repository:
+        async def get_download_by_id(self, download_id):
+            await asyncio.sleep(0.01)
+            return download_id
+
+        async def _helper(self):
+            pass
+
+    assert asyncio.run(Repository().get_download_by_id("dl_1")) == "dl_1"
+    rendered = registry.render()
+    assert 'db_seconds_count{repository="video",method="get_download_by_id"} 1' in rendered
+    assert "_helper" not in rendered
+
+
+def test_metrics_endpoint_exposes_pipeline_state():
+    response = asyncio.run(server.get_metrics())
+    body = response.body.decode()
+
+    assert response.media_type.startswith("text/plain; version=0.0.4")
+    for family in ("ytdl_downloads_queued", "ytdl_executor_active", "ytdl_info_cache_lookups_total",
+                   "ytdl_queue_wait_seconds", "ytdl_db_operation_seconds"):
+        assert family in body
+    assert 'ytdl_executor_active{stage="extraction"} 0' in body
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from contextlib import aclosing
+
+
+class FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL with canned flat extraction results"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def extract_info(self, url, download=False, process=True):
+        return self.results[url]
+
+
+def test_walk_descends_into_channel_tabs(service):
+    ydl = FakeYoutubeDL({
+        "https://www.youtube.com/@chan": {
+            "_type": "playlist",
+            "entries": iter([
+                {"_type": "url", "ie_key": "YoutubeTab", "url": "https://www.youtube.com/@chan/videos"},
+            ])
+        },
+        "https://www.youtube.com/@chan/videos": {
+            "_type": "playlist",
+            "entries": iter([
+                {"_type": "url", "ie_key": "Youtube", "id": "a", "url": "https://www.youtube.com/watch?v=a"},
+                None,
+                {"_type": "url", "ie_key": "Youtube", "id": "b", "url": "https://www.youtube.com/watch?v=b"},
+            ])
+        },
+    })
+
+    entries = list(service._walk_playlist(ydl, "https://www.youtube.com/@chan", threading.Event()))
+    assert [entry["id"] for entry in entries] == ["a", "b"]
+    assert entries[0]["url"] == "https://www.youtube.com/watch?v=a"
+
+
+def test_enumeration_is_lazy_and_stops_with_the_consumer(service):
+    produced = []
+
+    def endless_walk(ydl, url, stop, depth=0):
+        index = 0
+        while not stop.is_set():
+            produced.append(index)
+            yield {"id": str(index), "url": f"https://www.youtube.com/watch?v={index}"}
+            index += 1
+
+    service._walk_playlist = endless_walk
+
+    async def scenario():
+        received = []
+        async with aclosing(service.iter_playlist_entries("https://www.youtube.com/@chan", buffer_size=4)) as entries:
+            async for entry in entries:
+                received.append(entry["id"])
+                if len(received) == 10:
+                    break
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == [str(i) for i in range(10)]
+    # Only a buffer's worth of entries beyond what was consumed is ever enumerated
+    assert len(produced) <= 10 + 4 + 2
+
+
+def test_playlist_url_detection(service):
+    assert service.is_playlist_url("https://www.youtube.com/playlist?list=PL123")
+    assert service.is_playlist_url("https://www.youtube.com/@somechannel/videos")
+    assert service.is_playlist_url("https://www.tiktok.com/@someone")
+    assert not service.is_playlist_url("https://www.youtube.com/watch?v=abc&list=PL123")
+    assert not service.is_playlist_url("https://youtu.be/abc?list=PL123")
+    assert not service.is_playlist_url("https://www.youtube.com/shorts/abc?list=PL123")
+    assert not service.is_playlist_url("https://www.tiktok.com/@someone/video/123")
+
+
+def test_paused_consumer_holds_no_enumeration_thread(service):
+    def walk(ydl, url, stop, depth=0):
+        for index in range(100):
+            yield {"id": str(index), "url": f"https://www.youtube.com/watch?v={index}"}
+
+    service._walk_playlist = walk
+
+    async def scenario():
+        async with aclosing(service.iter_playlist_entries("https://www.youtube.com/@chan", buffer_size=4)) as entries:
+            first = await anext(entries)
+            # The consumer is waiting on something else, e.g. download slots
+            await asyncio.sleep(0.05)
+            return first, service.enumeration_executor.stats()
+
+    first, stats = asyncio.run(scenario())
+    assert first["id"] == "0"
+    assert stats["active"] == 0 and stats["queued"] == 0
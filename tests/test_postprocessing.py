@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+
+from models.video import DownloadStatus, PlatformType, VideoDownload, VideoMetadata
+from services.postprocessing import (
+    PostProcessingStage,
+    finish_without_conversion,
+    needs_postprocessing,
+    plan_audio_conversion,
+)
+from tests.fake_extractor import FakeExtractor
+from tests.media_server import MediaServer
+
+
+def fake_convert(input_path, codec, quality):
+    """Burn a little CPU and write the 'converted' file; runs in a worker process"""
+    deadline = time.monotonic() + 0.2
+    while time.monotonic() < deadline:
+        pass
+    output_path = os.path.splitext(input_path)[0] + f".{codec}"
+    with open(output_path, "w") as f:
+        f.write(f"{os.getpid()}")
+    os.remove(input_path)
+    return output_path, {"cpu_seconds": 0.2}
+
+
+def failing_convert(input_path, codec, quality):
+    raise RuntimeError("ffprobe not found")
+
+
+def make_download(tmp_path, index):
+    source = tmp_path / f"clip{index}.webm"
+    source.write_bytes(b"media")
+    return VideoDownload(
+        download_id=f"dl_{index}", url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+        quality="best", format="mp3", file_path=str(source)
+    )
+
+
+def run_stage(stage, downloads):
+    finished = []
+
+    async def on_done(download):
+        finished.append(download)
+
+    async def scenario():
+        stage.start(on_done)
+        for download in downloads:
+            stage.enqueue(download)
+            assert download.status == DownloadStatus.PROCESSING
+        while len(finished) < len(downloads):
+            await asyncio.sleep(0.01)
+        await stage.stop()
+
+    asyncio.run(scenario())
+    return finished
+
+
+def test_conversions_run_in_parallel_worker_processes(tmp_path):
+    stage = PostProcessingStage(max_workers=4, task=fake_convert)
+    downloads = [make_download(tmp_path, index) for index in range(4)]
+
+    started = time.monotonic()
+    finished = run_stage(stage, downloads)
+    elapsed = time.monotonic() - started
+
+    assert all(download.status == DownloadStatus.COMPLETED for download in finished)
+    assert all(download.file_path.endswith(".mp3") for download in finished)
+    pids = {open(download.file_path).read() for download in finished}
+    assert str(os.getpid()) not in pids
+    # Four 0.2s conversions in parallel, plus process start-up
+    assert elapsed < 0.8 + 1.0
+
+    stats = stage.stats()
+    assert stats["completed"] == 4 and stats["queued"] == 0 and stats["active"] == 0
+    assert stats["avg_run_seconds"] >= 0.2
+    assert "postprocess_seconds" in finished[0].pipeline_stats
+    assert stats["actions"] == {"probe": 4}
+
+
+def test_failed_conversion_marks_the_download_failed(tmp_path):
+    stage = PostProcessingStage(max_workers=1, task=failing_convert)
+
+    finished = run_stage(stage, [make_download(tmp_path, 0)])
+
+    assert finished[0].status == DownloadStatus.FAILED
+    assert "ffprobe not found" in finished[0].error_message
+    assert stage.stats()["failed"] == 1
+
+
+def with_source(download, container, video_codec, audio_codec):
+    download.metadata = VideoMetadata(
+        title="clip", platform=PlatformType.YOUTUBE,
+        container=container, video_codec=video_codec, audio_codec=audio_codec
+    )
+    return download
+
+
+def test_conversion_plan_avoids_transcoding_matching_sources(tmp_path):
+    download = make_download(tmp_path, 0)
+    download.format = "m4a"
+
+    assert plan_audio_conversion(with_source(download, "m4a", "none", "mp4a.40.2")) == "skip"
+    assert plan_audio_conversion(with_source(download, "mp4", "avc1.64001F", "mp4a.40.2")) == "remux"
+    assert plan_audio_conversion(with_source(download, "webm", "none", "opus")) == "transcode"
+    assert plan_audio_conversion(with_source(download, "m4a", None, None)) == "probe"
+
+    download.format = "mp3"
+    assert plan_audio_conversion(with_source(download, "mp3", "none", "mp3")) == "skip"
+    assert plan_audio_conversion(with_source(download, "m4a", "none", "mp4a.40.2")) == "transcode"
+
+
+def test_matching_source_skips_the_stage(tmp_path):
+    download = with_source(make_download(tmp_path, 0), "mp4", "none", "mp4a.40.5")
+    download.format = "m4a"
+
+    assert not needs_postprocessing(download)
+    path = finish_without_conversion(download)
+
+    assert path.endswith("clip0.m4a") and os.path.exists(path)
+    assert download.pipeline_stats["audio_path"] == "skip"
+
+
+def test_retried_audio_job_is_planned_on_the_format_it_downloads(service):
+    with MediaServer() as server:
+        extractor = FakeExtractor(server)
+        url = extractor.add_video("audio01", 256 * 1024, audio_only=True)
+        service.extractor = extractor
+        download = VideoDownload(download_id="dl_retried", url=url, platform=PlatformType.YOUTUBE,
+                                 quality="best", format="mp3")
+        # The failed first attempt had resolved a native mp3 stream, which needs no conversion
+        download.metadata = VideoMetadata(title="clip", platform=PlatformType.YOUTUBE, container="mp3",
+                                          video_codec="none", audio_codec="mp3")
+        assert not needs_postprocessing(download)
+
+        result = asyncio.run(service.download_video(download))
+
+    # This attempt got an m4a, which the post-processing stage transcodes
+    assert result.error_message is None
+    assert result.status == DownloadStatus.PROCESSING
+    assert result.file_path.endswith(".m4a")
+
@@ -0,0 +1,92 @@
+import asyncio
+import queue
+import threading
+
+import pytest
+
+from models.video import DownloadStatus, PlatformType, VideoDownload
+from services import process_runner
+from services.process_runner import ProcessDownloadRunner
+from tests.media_server import MediaServer, synthetic_bytes
+
+
+def make_request(url, index=0):
+    return VideoDownload(download_id=f"dl_proc{index}", url=url, platform=PlatformType.TIKTOK,
+                         quality="best", format="mp4")
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = ProcessDownloadRunner(max_workers=1, max_tasks_per_child=1)
+    yield runner
+    runner.stop()
+
+
+def test_job_runs_in_worker_and_reports_progress(runner):
+    content = synthetic_bytes(3 * 1024 * 1024)
+    events = []
+    runner.on_progress = events.append
+
+    with MediaServer() as server:
+        url = server.add_file("/clip.mp4", content)
+        result = asyncio.run(runner.run(make_request(url)))
+
+    assert result.status == DownloadStatus.COMPLETED
+    assert open(result.file_path, "rb").read() == content
+    assert any(event["download_id"] == "dl_proc0" for event in events)
+    assert runner.stats()["completed"] == 1
+
+
+def test_workers_are_recycled(runner):
+    with MediaServer() as server:
+        url = server.add_file("/clip.mp4", synthetic_bytes(256 * 1024))
+
+        async def run_two():
+            first = await runner.run(make_request(url, 1))
+            second = await runner.run(make_request(url, 2))
+            return first, second
+
+        first, second = asyncio.run(run_two())
+
+    assert first.status == second.status == DownloadStatus.COMPLETED
+    assert first.pipeline_stats["worker_pid"] != second.pipeline_stats["worker_pid"]
+
+
+def test_cancellation_reaches_the_worker(runner):
+    started = threading.Event()
+
+    def on_progress(event):
+        if event.get("progress_percent"):
+            started.set()
+
+    runner.on_progress = on_progress
+
+    with MediaServer(bandwidth=256 * 1024) as server:
+        url = server.add_file("/clip.mp4", synthetic_bytes(8 * 1024 * 1024))
+
+        async def run_and_cancel():
+            job = asyncio.ensure_future(runner.run(make_request(url)))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 60)
+            runner.cancel("dl_proc0")
+            return await job
+
+        result = asyncio.run(run_and_cancel())
+
+    assert result.status == DownloadStatus.CANCELLED
+
+
+def test_worker_jobs_close_the_transfer_client_with_their_loop(service, monkeypatch):
+    events = queue.Queue()
+    service.progress_sink = lambda progress: events.put(progress)
+    monkeypatch.setattr(process_runner, "_worker_service", service)
+    monkeypatch.setattr(process_runner, "_worker_events", events)
+
+    with MediaServer() as server:
+        for index in range(2):
+            url = server.add_file(f"/clip{index}.mp4", synthetic_bytes(256 * 1024, seed=index))
+            result = process_runner.run_download_job(make_request(url, index).model_dump(mode="json"), {})
+            assert result["status"] == DownloadStatus.COMPLETED
+            assert result["pipeline_stats"]["strategy"] == "async_stream"
+            # Each job's asyncio.run loop is gone; its client and sockets must be too
+            assert service.async_transfer._client is None
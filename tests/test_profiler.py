@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from models.video import PlatformType, VideoDownload, VideoDownloadRequest
+from services.admission import AdmissionController
+from services.download_queue import DownloadQueue
+from services.profiler import SamplingProfiler
+from services.segmented_downloader import SegmentedDownloader
+from tests.fake_extractor import FakeExtractor
+from tests.media_server import MediaServer
+
+
+def spin(seconds):
+    deadline = time.monotonic() + seconds
+    total = 0
+    while time.monotonic() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def busy_thread(seconds, name="busy-worker"):
+    thread = threading.Thread(target=spin, args=(seconds,), name=name)
+    thread.start()
+    return thread
+
+
+def test_sessions_sample_only_the_threads_they_ask_for():
+    profiler = SamplingProfiler(interval=0.002)
+    thread = busy_thread(0.3)
+    busy = profiler.start_session("busy", 0.2, thread_filter=lambda ident, name: name.startswith("busy"))
+    everything = profiler.start_session("all", 0.2, include_idle=True)
+    busy.done.wait(2)
+    everything.done.wait(2)
+    thread.join()
+
+    lines = busy.collapsed().splitlines()
+    assert busy.samples > 10 and lines
+    assert all(line.startswith("busy-worker;") for line in lines)
+    assert any("spin (test_profiler.py" in line for line in lines)
+    assert any(line.startswith("MainThread;") for line in everything.collapsed().splitlines())
+    assert busy.top_functions()[0]["share"] > 0
+
+
+def test_admin_profile_requires_the_token_and_reports_hot_frames(monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException) as disabled:
+        server.require_admin("anything")
+    assert disabled.value.status_code == 403
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    with pytest.raises(HTTPException) as denied:
+        server.require_admin("wrong")
+    assert denied.value.status_code == 401
+    server.require_admin("secret")
+
+    thread = busy_thread(0.5)
+    report = asyncio.run(server.profile_process(duration=0.3, threads="busy", format="json"))
+    thread.join()
+
+    assert report["samples"] > 0
+    assert any("spin" in entry["frame"] for entry in report["top_functions"])
+
+
+def test_profiled_job_writes_its_collapsed_stacks(service):
+    def perform_download(ydl_opts, record, direct_transfer):
+        spin(0.2)
+
+    service._perform_download = perform_download
+    record = VideoDownload(download_id="dl_profiled", url="https://www.youtube.com/watch?v=x",
+                           platform=PlatformType.YOUTUBE, quality="best", format="mp4", profile=True)
+
+    asyncio.run(service.download_video(record))
+
+    assert record.profile_path == str(Path("profiles") / "dl_profiled.collapsed")
+    stacks = Path(record.profile_path).read_text()
+    assert "spin (test_profiler.py" in stacks and stacks.startswith("transfer")
+
+    # Deleting the download takes its profile with it
+    assert service.cleanup_download("dl_profiled")
+    assert not Path(record.profile_path).exists()
+
+
+def test_only_admins_can_profile_a_download(monkeypatch, tmp_path):
+    created = []
+
+    class FakeRepository:
+        async def create_download(self, record):
+            created.append(record)
+
+    class FakeQueue:
+        def enqueue(self, record, on_done=None):
+            pass
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(server, "video_repository", FakeRepository())
+    monkeypatch.setattr(server, "download_queue", FakeQueue())
+    monkeypatch.setattr(server, "admission_controller", AdmissionController(DownloadQueue(), disk_path=str(tmp_path)))
+    request = VideoDownloadRequest(url="https://www.youtube.com/watch?v=x", profile=True)
+
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(server.start_download(request, x_admin_token=None))
+    assert denied.value.status_code == 401 and not created
+
+    asyncio.run(server.start_download(request, x_admin_token="secret"))
+    assert created[0].profile
+
+
+def test_segment_workers_are_named_after_their_job(service, monkeypatch):
+    thread_names = set()
+    fetch_segment = SegmentedDownloader._fetch_segment_with_retries
+
+    def recording_fetch(self, *args):
+        thread_names.add(threading.current_thread().name)
+        return fetch_segment(self, *args)
+
+    monkeypatch.setattr(SegmentedDownloader, "_fetch_segment_with_retries", recording_fetch)
+    with MediaServer() as media:
+        service.extractor = FakeExtractor(media)
+        url = service.extractor.add_video("segments01", 2 * 1024 * 1024)
+        # Keep the transfer on the threaded segmented path rather than the event loop
+        service.async_transfers_enabled = False
+        service.segmented_min_size = 0
+        service.segmented_downloader.min_segment_size = 256 * 1024
+        record = VideoDownload(download_id="dl_segments", url=url, platform=PlatformType.YOUTUBE,
+                               quality="best", format="mp4")
+        result = asyncio.run(service.download_video(record))
+
+    assert result.error_message is None
+    assert thread_names and all("dl_segments" in name for name in thread_names)
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from models.video import DownloadProgress, DownloadStatus
+
+
+@pytest.fixture
+def service(service):
+    service.active_downloads["dl_1"] = DownloadProgress(
+        download_id="dl_1",
+        status=DownloadStatus.DOWNLOADING
+    )
+    return service
+
+
+def test_returns_immediately_when_version_is_newer(service):
+    async def scenario():
+        service._loop = asyncio.get_running_loop()
+        service._publish_progress("dl_1")
+        started = time.monotonic()
+        progress = await service.wait_for_progress("dl_1", since_version=0, timeout=5)
+        return progress, time.monotonic() - started
+
+    progress, elapsed = asyncio.run(scenario())
+    assert progress.version == 1
+    assert elapsed < 0.5
+
+
+def test_wakes_on_update_from_worker_thread(service):
+    hook = service.create_progress_hook("dl_1")
+
+    async def scenario():
+        service._loop = asyncio.get_running_loop()
+        timer = threading.Timer(0.1, hook, args=({
+            "status": "downloading",
+            "downloaded_bytes": 50,
+            "total_bytes": 100
+        },))
+        timer.start()
+        started = time.monotonic()
+        progress = await service.wait_for_progress("dl_1", since_version=0, timeout=5)
+        timer.join()
+        return progress, time.monotonic() - started
+
+    progress, elapsed = asyncio.run(scenario())
+    assert progress.version == 1
+    assert progress.progress_percent == 50.0
+    assert elapsed < 2
+
+
+def test_times_out_without_changes(service):
+    async def scenario():
+        return await service.wait_for_progress("dl_1", since_version=0, timeout=0.1)
+
+    progress = asyncio.run(scenario())
+    assert progress.version == 0
+
+
+def test_versions_are_monotonic_across_updates(service):
+    hook = service.create_progress_hook("dl_1")
+    versions = []
+    for downloaded in (10, 20, 30):
+        hook({"status": "downloading", "downloaded_bytes": downloaded, "total_bytes": 100})
+        versions.append(service.get_download_progress("dl_1").version)
+
+    assert versions == sorted(versions)
+    assert len(set(versions)) == 3
@@ -0,0 +1,201 @@
+import asyncio
+import io
+import socket
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import yt_dlp
+from yt_dlp.networking.common import Response
+from yt_dlp.networking.exceptions import HTTPError
+
+import server
+from models.video import DownloadStatus, PlatformType, VideoDownload
+from services.retry_policy import ErrorClass, RetryPolicy, classify_error, parse_retry_after
+from services.segmented_downloader import SegmentedDownloadError
+
+
+def http_error(status, headers=None):
+    response = Response(io.BytesIO(b""), "https://cdn.example/v.mp4", headers or {}, status=status)
+    try:
+        raise HTTPError(response)
+    except HTTPError as e:
+        # yt-dlp reports failures as DownloadError wrapping the original exception
+        return yt_dlp.utils.DownloadError(f"ERROR: {e}", exc_info=(type(e), e, None))
+
+
+def test_errors_are_classified():
+    throttled = classify_error(http_error(429, {"Retry-After": "120"}))
+    assert throttled.error_class == ErrorClass.THROTTLED and throttled.retry_after == 120
+
+    assert classify_error(http_error(503)).error_class == ErrorClass.TRANSIENT
+    assert classify_error(http_error(404)).error_class == ErrorClass.PERMANENT
+    assert classify_error(socket.timeout("timed out")).error_class == ErrorClass.TRANSIENT
+    assert classify_error(yt_dlp.utils.ExtractorError("Private video. Sign in", expected=True)).error_class \
+        == ErrorClass.PERMANENT
+    assert classify_error(ValueError("Video is private and cannot be downloaded")).error_class == ErrorClass.PERMANENT
+
+    segment = classify_error(SegmentedDownloadError("HTTP 429 for segment 3", status_code=429, retry_after=30))
+    assert segment.error_class == ErrorClass.THROTTLED and segment.retry_after == 30
+
+
+def test_retry_after_accepts_http_dates():
+    when = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 80 < parse_retry_after(format_datetime(when, usegmt=True)) <= 90
+    assert parse_retry_after("soon") is None
+
+
+def test_delays_back_off_with_jitter_and_honor_retry_after():
+    policy = RetryPolicy(max_retries=3, base_delay=1, max_delay=100, throttle_base_delay=10)
+
+    delays = [policy.next_delay(ErrorClass.TRANSIENT, attempt) for attempt in range(4)]
+    for attempt, delay in enumerate(delays):
+        assert 2 ** attempt / 2 <= delay <= 2 ** attempt
+    assert len({round(policy.next_delay(ErrorClass.TRANSIENT, 3), 6) for _ in range(20)}) > 1
+
+    assert policy.next_delay(ErrorClass.THROTTLED, 0) >= 5
+    assert policy.next_delay(ErrorClass.TRANSIENT, 0, retry_after=40) >= 40
+
+    assert policy.should_retry(ErrorClass.TRANSIENT, 2)
+    assert not policy.should_retry(ErrorClass.TRANSIENT, 3)
+    assert not policy.should_retry(ErrorClass.PERMANENT, 0)
+
+
+class FakeRepository:
+    def __init__(self):
+        self.statuses = []
+
+    async def update_download(self, record):
+        self.statuses.append(record.status)
+
+
+class FlakyDownloader:
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+        self.retrying = []
+
+    async def download_video(self, record, on_handoff=None):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            record.status = DownloadStatus.FAILED
+            record.error_message = "HTTP Error 503: Service Unavailable"
+            record.error_class = ErrorClass.TRANSIENT.value
+        else:
+            record.status = DownloadStatus.COMPLETED
+        return record
+
+    def mark_retrying(self, download_id, delay, retry_count):
+        self.retrying.append(retry_count)
+
+    def get_download_progress(self, download_id):
+        return None
+
+
+class InlineQueue:
+    def __init__(self):
+        self.pending = []
+
+    def enqueue(self, record, on_done=None):
+        self.pending.append(record)
+
+    def cancel(self, download_id):
+        return None
+
+
+@pytest.fixture
+def retrying_server(monkeypatch):
+    repository, queue = FakeRepository(), InlineQueue()
+    monkeypatch.setattr(server, "video_repository", repository)
+    monkeypatch.setattr(server, "download_queue", queue)
+    monkeypatch.setattr(server, "retry_policy", RetryPolicy(max_retries=2, base_delay=0.01, max_delay=0.05))
+
+    async def no_archive(record):
+        pass
+
+    monkeypatch.setattr(server, "update_download_archive", no_archive)
+    return repository, queue
+
+
+def run_until_idle(queue, record):
+    async def drive():
+        await server.process_download(record)
+        while True:
+            await asyncio.sleep(0.1)
+            if not queue.pending:
+                return
+            await server.process_download(queue.pending.pop(0))
+
+    asyncio.run(drive())
+
+
+def make_record():
+    return VideoDownload(download_id="dl_retry", url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+                         quality="best", format="mp4")
+
+
+def test_transient_failures_are_requeued_until_they_succeed(retrying_server, monkeypatch):
+    repository, queue = retrying_server
+    downloader = FlakyDownloader(failures=2)
+    monkeypatch.setattr(server, "video_downloader", downloader)
+    record = make_record()
+
+    run_until_idle(queue, record)
+
+    assert downloader.attempts == 3
+    assert downloader.retrying == [1, 2]
+    assert record.status == DownloadStatus.COMPLETED and record.retry_count == 2
+    assert repository.statuses[-1] == DownloadStatus.COMPLETED
+
+
+def test_retries_stop_at_the_limit(retrying_server, monkeypatch):
+    repository, queue = retrying_server
+    downloader = FlakyDownloader(failures=10)
+    monkeypatch.setattr(server, "video_downloader", downloader)
+    record = make_record()
+
+    run_until_idle(queue, record)
+
+    assert downloader.attempts == 3
+    assert record.status == DownloadStatus.FAILED and record.error_class == ErrorClass.TRANSIENT
+
+
+class CancellingDownloader:
+    def cancel_download(self, download_id):
+        return True
+
+
+class RecordStore:
+    def __init__(self, record):
+        self.record = record
+
+    async def get_download_by_id(self, download_id):
+        return self.record.model_copy()
+
+    async def update_download(self, record):
+        self.record = record
+
+
+class ReleasingArchive:
+    def __init__(self):
+        self.released = []
+
+    async def release_pending(self, download_id):
+        self.released.append(download_id)
+
+
+@pytest.mark.parametrize("status, released", [(DownloadStatus.PENDING, True), (DownloadStatus.DOWNLOADING, False)])
+def test_cancelling_between_attempts_releases_the_archive_claim(monkeypatch, status, released):
+    record = make_record()
+    record.batch_id, record.status = "batch_sub", status
+    store, archive, queue = RecordStore(record), ReleasingArchive(), InlineQueue()
+    monkeypatch.setattr(server, "video_downloader", CancellingDownloader())
+    monkeypatch.setattr(server, "video_repository", store)
+    monkeypatch.setattr(server, "archive_repository", archive)
+    monkeypatch.setattr(server, "download_queue", queue)
+
+    asyncio.run(server.cancel_download("dl_retry"))
+
+    assert store.record.status == DownloadStatus.CANCELLED
+    # A running attempt releases the claim itself when it sees the cancellation
+    assert archive.released == (["dl_retry"] if released else [])
@@ -0,0 +1,131 @@
+import json
+import time
+
+import pytest
+
+from services.segmented_downloader import RangeNotSupported, SegmentedDownloader, SegmentedDownloadError
+from tests.media_server import MediaServer, synthetic_bytes
+
+SIZE = 3 * 1024 * 1024 + 123
+
+
+@pytest.fixture
+def media_server():
+    with MediaServer() as server:
+        yield server
+
+
+@pytest.fixture
+def slow_media_server():
+    # 4 MB/s per connection, so a single stream cannot saturate the loopback link
+    with MediaServer(bandwidth=4 * 1024 * 1024, latency=0.01) as server:
+        yield server
+
+
+def make_downloader(**overrides):
+    options = dict(connections=4, min_segment_size=64 * 1024, chunk_size=16 * 1024, max_retries=2)
+    options.update(overrides)
+    return SegmentedDownloader(**options)
+
+
+def test_segments_land_at_their_offsets(slow_media_server, tmp_path):
+    content = synthetic_bytes(SIZE)
+    url = slow_media_server.add_file("/video.mp4", content)
+    progress = []
+
+    dest = make_downloader().download(
+        url, str(tmp_path / "video.mp4"),
+        progress_callback=lambda done, total, speed: progress.append((done, total))
+    )
+
+    assert dest.read_bytes() == content
+    assert not (tmp_path / "video.mp4.part").exists()
+    assert not (tmp_path / "video.mp4.part.json").exists()
+    assert progress[-1] == (SIZE, SIZE)
+    assert slow_media_server.peak_active_requests > 1
+
+
+def test_parallel_segments_beat_a_single_connection(tmp_path):
+    content = synthetic_bytes(SIZE)
+
+    def throughput(connections):
+        with MediaServer(bandwidth=4 * 1024 * 1024, latency=0.01) as server:
+            url = server.add_file("/video.mp4", content)
+            started = time.monotonic()
+            make_downloader(connections=connections).download(url, str(tmp_path / f"v{connections}.mp4"))
+            return SIZE / (time.monotonic() - started)
+
+    # One connection is capped near 4 MB/s; four should be well over twice that
+    assert throughput(4) > 2 * throughput(1)
+
+
+def test_failed_segments_are_retried_individually(media_server, tmp_path):
+    content = synthetic_bytes(SIZE)
+    url = media_server.add_file("/flaky.mp4", content)
+    media_server.failures["/flaky.mp4"] = 2
+
+    dest = make_downloader().download(url, str(tmp_path / "flaky.mp4"))
+
+    assert dest.read_bytes() == content
+    statuses = [range_header for path, range_header in media_server.requests if path == "/flaky.mp4"]
+    # probe + every segment once + two retries
+    segments = len(make_downloader().plan_segments(SIZE))
+    assert len(statuses) == 1 + segments + 2
+
+
+def test_gives_up_after_max_retries_and_keeps_a_checkpoint(media_server, tmp_path):
+    url = media_server.add_file("/broken.mp4", synthetic_bytes(SIZE))
+    media_server.failures["/broken.mp4"] = 10 ** 6
+
+    with pytest.raises(SegmentedDownloadError):
+        make_downloader(max_retries=1).download(url, str(tmp_path / "broken.mp4"))
+
+    assert (tmp_path / "broken.mp4.part.json").exists()
+
+
+def test_resumes_from_checkpoint(media_server, tmp_path):
+    content = synthetic_bytes(SIZE)
+    url = media_server.add_file("/resume.mp4", content)
+    downloader = make_downloader()
+    segments = downloader.plan_segments(SIZE)
+
+    # Simulate a crash after the first half of the segments landed
+    part_path = tmp_path / "resume.mp4.part"
+    with open(part_path, "wb") as f:
+        f.truncate(SIZE)
+        for segment in segments[: len(segments) // 2]:
+            f.seek(segment.start)
+            f.write(content[segment.start:segment.end + 1])
+            segment.written = segment.size
+    with open(tmp_path / "resume.mp4.part.json", "w") as f:
+        json.dump({"total_size": SIZE, "segments": [segment.__dict__ for segment in segments]}, f)
+
+    dest = downloader.download(url, str(tmp_path / "resume.mp4"))
+
+    assert dest.read_bytes() == content
+    fetched = [range_header for path, range_header in media_server.requests if range_header != "bytes=0-0"]
+    assert len(fetched) == len(segments) - len(segments) // 2
+
+
+def test_falls_back_to_one_stream_without_range_support(tmp_path):
+    content = synthetic_bytes(256 * 1024)
+    with MediaServer(supports_ranges=False) as server:
+        url = server.add_file("/plain.mp4", content)
+        dest = make_downloader().download(url, str(tmp_path / "plain.mp4"))
+
+    assert dest.read_bytes() == content
+
+
+def test_rejected_ranges_leave_no_partial_files_for_the_fallback(tmp_path):
+    content = synthetic_bytes(SIZE)
+    downloader = make_downloader()
+    # The probe saw range support, but the segment requests are answered with 200
+    downloader.probe = lambda url, headers=None: (SIZE, True)
+
+    with MediaServer(supports_ranges=False) as server:
+        url = server.add_file("/video.mp4", content)
+        with pytest.raises(RangeNotSupported):
+            downloader.download(url, str(tmp_path / "video.mp4"))
+
+    assert not (tmp_path / "video.mp4.part").exists()
+    assert not (tmp_path / "video.mp4.part.json").exists()
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from models.video import VideoInfo
+from services.stage_executor import StageExecutor
+from services.video_downloader import VideoDownloaderService
+
+
+def test_saturated_stage_reports_itself_and_queues_behind_itself():
+    executor = StageExecutor("extraction", max_workers=2)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def block():
+        started.release()
+        release.wait()
+
+    futures = [executor.submit(block) for _ in range(5)]
+    started.acquire()
+    started.acquire()
+    stats = executor.stats()
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    executor.shutdown()
+
+    assert stats["active"] == 2 and stats["queued"] == 3 and stats["saturation"] == 1.0
+    final = executor.stats()
+    assert final["completed"] == 5 and final["queued"] == 0 and final["wait_p99"] >= 0
+
+
+def test_validation_storm_does_not_block_other_stages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EXTRACTION_THREADS", "2")
+    service = VideoDownloaderService()
+    release = threading.Event()
+    threads = []
+
+    def slow_extract(url, platform):
+        threads.append(threading.current_thread().name)
+        release.wait()
+        return VideoInfo(title=url, platform=platform)
+
+    service._extract_video_info = slow_extract
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        storm = [asyncio.ensure_future(service.get_video_info(f"https://youtube.com/watch?v={i}")) for i in range(20)]
+        await asyncio.sleep(0.1)
+        # Extraction is saturated, yet disk and transfer work still get threads at once
+        finished = await asyncio.wait_for(asyncio.gather(
+            loop.run_in_executor(service.disk_executor, lambda: "disk"),
+            loop.run_in_executor(service.transfer_executor, lambda: "transfer")
+        ), timeout=1)
+        stats = service.executor_stats()
+        release.set()
+        await asyncio.gather(*storm)
+        return finished, stats
+
+    finished, stats = asyncio.run(scenario())
+    service.shutdown_executors()
+
+    assert finished == ["disk", "transfer"]
+    assert stats["extraction"]["saturation"] == 1.0 and stats["extraction"]["queued"] == 18
+    assert all(name.startswith("extraction") for name in threads)
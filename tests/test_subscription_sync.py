@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from models.video import BatchDownload, DownloadStatus, PlatformType, Subscription, VideoDownload
+
+
+class FakeArchive:
+    def __init__(self, known, scope="sub_1"):
+        self.known = {(scope, video_id) for video_id in known}
+        self.lookups = []
+        self.completed = []
+
+    async def contains(self, scope, platform, video_id):
+        self.lookups.append(video_id)
+        return (scope, video_id) in self.known
+
+    async def add_pending(self, scope, platform, video_id, download_id):
+        if (scope, video_id) in self.known:
+            return False
+        self.known.add((scope, video_id))
+        return True
+
+    async def mark_completed(self, download_id):
+        self.completed.append(download_id)
+
+    async def release_pending(self, download_id):
+        pass
+
+
+class FakeRepository:
+    def __init__(self):
+        self.created = []
+
+    async def create_download(self, record):
+        self.created.append(record)
+
+    async def increment_total(self, batch_id, count=1):
+        pass
+
+    async def finish_expansion(self, batch_id, error=None):
+        self.error = error
+
+
+class FakeQueue:
+    def enqueue(self, record, on_done=None):
+        if on_done:
+            on_done(record)
+
+
+@pytest.fixture
+def channel(monkeypatch):
+    # Newest upload first, as channel video tabs are listed
+    uploads = [f"v{index}" for index in range(10, 0, -1)]
+    pulled = []
+
+    async def fake_entries(url, buffer_size=16):
+        for video_id in uploads:
+            pulled.append(video_id)
+            yield {"id": video_id, "url": f"https://www.youtube.com/watch?v={video_id}"}
+
+    repository = FakeRepository()
+    monkeypatch.setattr(server.video_downloader, "iter_playlist_entries", fake_entries)
+    monkeypatch.setattr(server, "video_repository", repository)
+    monkeypatch.setattr(server, "batch_repository", repository)
+    monkeypatch.setattr(server, "download_queue", FakeQueue())
+    return pulled, repository
+
+
+def make_batch():
+    return BatchDownload(
+        batch_id="batch_1",
+        quality="best",
+        format="mp4",
+        source_url="https://www.youtube.com/@chan/videos",
+        expanding=True
+    )
+
+
+def test_sync_only_queues_new_uploads_and_stops_early(channel, monkeypatch):
+    pulled, repository = channel
+    archive = FakeArchive(known=[f"v{index}" for index in range(1, 8)])
+    monkeypatch.setattr(server, "archive_repository", archive)
+
+    queued = asyncio.run(server.expand_playlist(make_batch(), break_on_existing=2, archive_scope="sub_1"))
+
+    assert queued == 3
+    assert [record.url.split("v=")[1] for record in repository.created] == ["v10", "v9", "v8"]
+    # v7 and v6 are known in a row, so v5..v1 are never enumerated
+    assert pulled == ["v10", "v9", "v8", "v7", "v6"]
+
+
+def test_plain_playlist_expansion_ignores_the_archive(channel, monkeypatch):
+    pulled, repository = channel
+    archive = FakeArchive(known=["v10"])
+    monkeypatch.setattr(server, "archive_repository", archive)
+
+    queued = asyncio.run(server.expand_playlist(make_batch(), max_items=4))
+
+    assert queued == 4
+    assert archive.lookups == []
+
+
+def test_another_subscriptions_archive_does_not_hide_videos(channel, monkeypatch):
+    pulled, repository = channel
+    archive = FakeArchive(known=[f"v{index}" for index in range(1, 11)], scope="sub_other")
+    monkeypatch.setattr(server, "archive_repository", archive)
+
+    queued = asyncio.run(server.expand_playlist(make_batch(), break_on_existing=2, archive_scope="sub_1"))
+
+    assert queued == 10
+
+
+def test_only_subscription_downloads_are_archived(monkeypatch):
+    archive = FakeArchive(known=[])
+    monkeypatch.setattr(server, "archive_repository", archive)
+    one_off = VideoDownload(download_id="dl_one_off", url="https://www.youtube.com/watch?v=v1",
+                            platform=PlatformType.YOUTUBE, quality="best", format="mp4",
+                            status=DownloadStatus.COMPLETED)
+    synced = one_off.model_copy(update={"download_id": "dl_synced", "batch_id": "batch_1"})
+
+    asyncio.run(server.update_download_archive(one_off))
+    asyncio.run(server.update_download_archive(synced))
+
+    assert archive.completed == ["dl_synced"]
+
+
+def test_manual_sync_is_refused_while_one_is_running(monkeypatch):
+    class BusySubscriptions:
+        async def get_subscription_by_id(self, subscription_id):
+            return Subscription(subscription_id=subscription_id, url="https://www.youtube.com/@chan",
+                                platform=PlatformType.YOUTUBE, quality="best", format="mp4")
+
+        async def begin_sync(self, subscription_id, now, stale_before):
+            return None
+
+    monkeypatch.setattr(server, "subscription_repository", BusySubscriptions())
+
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(server.sync_subscription_now("sub_1"))
+    assert refused.value.status_code == 409
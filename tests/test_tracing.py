@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import json
+import time
+
+import pytest
+
+import server
+from models.video import DownloadStatus, PlatformType, VideoDownload
+from services.download_queue import DownloadQueue
+from services.tracing import FileSpanExporter, trace_phase, tracer
+
+
+class FakeRepository:
+    def __init__(self):
+        self.records = {}
+
+    async def update_download(self, record):
+        await asyncio.sleep(0.005)
+        self.records[record.download_id] = record
+
+    async def get_download_by_id(self, download_id):
+        return self.records.get(download_id)
+
+
+class SlowDownloader:
+    async def download_video(self, record, on_handoff=None):
+        loop = asyncio.get_running_loop()
+        with trace_phase(record, "transfer", strategy="async_stream"):
+            await asyncio.sleep(0.05)
+        # Phases run in executor threads nest under the caller when the context is copied
+        await loop.run_in_executor(None, contextvars.copy_context().run, self.finish, record)
+        record.status = DownloadStatus.COMPLETED
+        return record
+
+    def finish(self, record):
+        with trace_phase(record, "finish"):
+            time.sleep(0.01)
+
+
+@pytest.fixture
+def traced_server(monkeypatch, tmp_path):
+    repository = FakeRepository()
+    monkeypatch.setattr(server, "video_repository", repository)
+    monkeypatch.setattr(server, "video_downloader", SlowDownloader())
+
+    async def no_archive(record):
+        pass
+
+    monkeypatch.setattr(server, "update_download_archive", no_archive)
+    exporter = FileSpanExporter(str(tmp_path / "spans.jsonl"))
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    return repository, exporter
+
+
+def exported_spans(exporter):
+    exporter.flush()
+    spans = []
+    for line in exporter.path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return {span["name"]: span for span in spans}, spans
+
+
+def test_phases_are_traced_and_timed_on_the_record(traced_server):
+    repository, exporter = traced_server
+    record = VideoDownload(download_id="dl_traced", url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+                           quality="best", format="mp4")
+
+    async def scenario():
+        queue = DownloadQueue(max_workers=1)
+        done = asyncio.Event()
+        queue.start(server.process_download)
+        # Hold the only worker so the traced job has to wait for it
+        queue.enqueue(VideoDownload(download_id="dl_ahead", url=record.url, platform=record.platform,
+                                    quality="best", format="mp4"))
+        queue.enqueue(record, on_done=lambda _: done.set())
+        await done.wait()
+        await queue.stop()
+        return await server.get_download_metadata("dl_traced")
+
+    metadata = asyncio.run(scenario())
+    _, spans = exported_spans(exporter)
+    ours = [span for span in spans if span["traceId"] == record.trace_id]
+
+    assert {span["name"] for span in ours} == {"download", "queue_wait", "db_write", "transfer", "finish"}
+    root = next(span for span in ours if span["name"] == "download")
+    assert all(span["parentSpanId"] == root["spanId"] for span in ours if span is not root)
+    queue_wait = next(span for span in ours if span["name"] == "queue_wait")
+    assert queue_wait["startTimeUnixNano"] == root["startTimeUnixNano"]
+    attributes = {item["key"]: item["value"] for item in root["attributes"]}
+    assert attributes["download.status"] == {"stringValue": "completed"}
+
+    timings = metadata["timings"]
+    assert metadata["trace_id"] == record.trace_id
+    assert timings["queue_wait"] >= 0.04 and timings["transfer"] >= 0.05 and timings["finish"] >= 0.01
+    assert timings["db_write"] >= 0.01  # the status write and the final write
+
+
+def test_failed_phases_mark_the_span_as_an_error(tmp_path, monkeypatch):
+    exporter = FileSpanExporter(str(tmp_path / "spans.jsonl"))
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    record = VideoDownload(download_id="dl_err", url="https://youtube.com/watch?v=x", platform=PlatformType.YOUTUBE,
+                           quality="best", format="mp4")
+
+    with pytest.raises(ValueError):
+        with trace_phase(record, "extract"):
+            raise ValueError("Private video")
+
+    by_name, _ = exported_spans(exporter)
+    assert by_name["extract"]["status"] == {"code": 2, "message": "ValueError: Private video"}
+    assert "extract" in record.timings
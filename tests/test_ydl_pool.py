@@ -0,0 +1,126 @@
+import asyncio
+import threading
+
+import pytest
+
+from models.video import PlatformType, VideoDownload
+from services.video_downloader import VideoDownloaderService
+from services.ydl_pool import YoutubeDLPool
+from tests.fake_extractor import FakeExtractor
+from tests.media_server import MediaServer, synthetic_bytes
+
+
+class FakeYDL:
+    instances = 0
+
+    def __init__(self, params):
+        FakeYDL.instances += 1
+        self.params = params
+        self.closed = False
+
+    def get_info_extractor(self, ie_key):
+        return ie_key
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_instances():
+    FakeYDL.instances = 0
+
+
+def test_instances_are_reused_per_platform():
+    pool = YoutubeDLPool({}, max_size=2, factory=FakeYDL)
+
+    with pool.checkout("youtube") as first:
+        pass
+    with pool.checkout("youtube") as second:
+        pass
+    with pool.checkout("tiktok") as other:
+        pass
+
+    assert first is second
+    assert other is not first
+    assert pool.stats()["created"] == 2 and pool.stats()["reused"] == 1
+
+
+def test_checkout_is_exclusive_and_bounded():
+    pool = YoutubeDLPool({}, max_size=2, wait_timeout=0.1, factory=FakeYDL)
+    held = []
+    release = threading.Event()
+
+    def hold():
+        with pool.checkout("youtube") as ydl:
+            held.append(ydl)
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while len(held) < 2:
+        pass
+
+    # Pool is exhausted: a throwaway instance is used and closed afterwards
+    with pool.checkout("youtube") as extra:
+        assert extra not in held
+    assert extra.closed
+    assert pool.stats()["overflow"] == 1
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert held[0] is not held[1]
+    assert pool.stats()["idle"]["youtube"] == 2
+
+
+def test_instances_are_recycled_after_max_uses():
+    pool = YoutubeDLPool({}, max_size=1, max_uses=2, factory=FakeYDL)
+    pool.warm(["youtube"])
+
+    seen = []
+    for _ in range(3):
+        with pool.checkout("youtube") as ydl:
+            seen.append(ydl)
+
+    assert seen[0] is seen[1] is not seen[2]
+    assert seen[0].closed
+
+
+def test_validated_url_is_not_extracted_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = synthetic_bytes(5 * 1024 * 1024)
+
+    with MediaServer() as server:
+        url = server.add_file("/clip.mp4", content)
+        service = VideoDownloaderService()
+        service._extract_video_info(url, PlatformType.TIKTOK)
+        request = VideoDownload(download_id="dl_pool", url=url, platform=PlatformType.TIKTOK,
+                                quality="best", format="mp4")
+
+        result = asyncio.run(service.download_video(request))
+
+        # Only the validation hit the page; the download went straight to byte ranges
+        plain_requests = [path for path, range_header in server.requests if range_header is None]
+
+    assert result.error_message is None
+    assert open(result.file_path, "rb").read() == content
+    assert plain_requests == ["/clip.mp4"]
+    assert service.raw_info_reuses == 1
+
+
+def test_reused_extraction_keeps_the_cookies_it_was_given(service):
+    with MediaServer() as server:
+        extractor = FakeExtractor(server)
+        url = extractor.add_video("session01", 1024 * 1024, cookie="session=abc")
+        service.extractor = extractor
+        # Validation on a pooled instance is where the site hands out its session cookie
+        asyncio.run(service.get_video_info(url))
+        request = VideoDownload(download_id="dl_session", url=url, platform=PlatformType.YOUTUBE,
+                                quality="best", format="mp4")
+
+        result = asyncio.run(service.download_video(request))
+
+    assert extractor.calls == 1 and service.raw_info_reuses == 1
+    assert result.error_message is None
+    assert open(result.file_path, "rb").read() == server.files["/media/session01.mp4"]